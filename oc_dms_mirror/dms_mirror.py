@@ -2,6 +2,13 @@
 
 import argparse
 import ast
+import heapq
+import signal
+import contextlib
+import copy
+import fcntl
+import hashlib
+import itertools
 import os
 import time
 import json
@@ -9,7 +16,11 @@ import tempfile
 import multiprocessing
 import posixpath
 import re
+import shutil
 import structlog
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from enum import Enum
 
 from oc_checksumsq.checksums_interface import ChecksumsQueueClient
@@ -21,6 +32,19 @@ from oc_cdtapi import NexusAPI, DmsAPI, PgAPI, PgQAPI, VaultAPI
 from oc_cdtapi.API import HttpAPIError
 from oc_logging import setup_json_logging
 from requests.exceptions import ConnectionError
+from urllib3.exceptions import IncompleteRead
+
+from . import errors, http_pool
+from .gav_index import GavIndex
+from .journal import Journal
+from .lease import Lease, LeaseHeld, FileLeaseBackend
+from .metrics import metrics, serve_metrics
+from .traffic import Recorder
+from .throttling import TokenBucket, TransferSlots, ThrottledFile, InflightBudget, AdaptiveLimiter
+from .transfer import transfer_errors, get_content_size, probe_size, download_ranges, SpoolManager, upload_view
+
+# message queue clients are not thread-safe, while artifacts of a webhook are processed concurrently
+_register_lock = threading.Lock()
 
 class DmsMirror:
     """
@@ -31,21 +55,79 @@ class DmsMirror:
         Basic initialization
         """
         self.__errors = (ConnectionError, HttpAPIError, KeyError)
+        self.__transfer_errors = transfer_errors
         self._dms_client = None
         self._mvn_client = None
         self._pg_client = None
         self._psql_mq_client = None
         self._queue_client = None
-        self.__process_name = "?"
+        self._lease_backend = None
+        self._templates = dict()
+        self._gav_index = None
+        # priority lane for host-wide transfer slots: REST service sets 'high' for live events
+        self.transfer_priority = "low"
+        # versions seen by the last processing of each component, for daemon polling intervals
+        self._known_versions = dict()
+        # versions mirrored by daemon polls of each component, not scanned again
+        self._polled_versions = dict()
+        # progress journal of a batch run, 'None' for daemon and REST service
+        self._journal = None
+        # artifacts listings being fetched ahead: (component, version) => future
+        self._prefetched = dict()
+        # abort thresholds of --error-threshold, parsed once arguments are set
+        self._error_thresholds = dict()
+        # calls per second of --dms-rate by endpoint class and their buckets, created on first use
+        self._dms_rates = dict()
+        self._dms_buckets = dict()
+        # component processed by each thread, daemon threads share the instance
+        self.__process_names = dict()
+        # summary of the last run, reported by 'main'
+        self.summary = dict()
 
         self.logger = structlog.get_logger()
 
+    @property
+    def __process_name(self):
+        return self.__process_names.get(threading.get_ident(), "?")
+
+    @__process_name.setter
+    def __process_name(self, value):
+        self.__process_names[threading.get_ident()] = value
+
+    def _with_process_name(self, function):
+        """
+        Wrap a function to be called in a worker thread, so it logs as the calling thread does
+        :param function: callable
+        :return: callable setting the process name of the calling thread before the call
+        """
+        _name = self.__process_name
+
+        def _call(*args, **kwargs):
+            self.__process_name = _name
+            return function(*args, **kwargs)
+
+        return _call
+
     def __log_msg(self, message):
         """
         Log a message for multiprocessing: append process name
         """
         return ': '.join([f"[{self.__process_name}]", message])
 
+    @property
+    def lease_backend(self):
+        if not self._lease_backend:
+            self._lease_backend = self._get_lease_backend()
+
+        return self._lease_backend
+
+    @property
+    def gav_index(self):
+        if not self._gav_index:
+            self._gav_index = self._build_gav_index()
+
+        return self._gav_index
+
     @property
     def queue_client(self):
         if not self._queue_client:
@@ -92,7 +174,7 @@ class DmsMirror:
                 user=self._args.psql_api_user,
                 auth=self._args.psql_api_password)
 
-        return _pg_client
+        return self._pooled(_pg_client, "psql")
 
     def _get_psql_mq_client(self):
         """
@@ -115,9 +197,9 @@ class DmsMirror:
         """
 
         if self._args.dms_api_version == 3:
-            return DmsAPI.DmsAPIv3(root=self._args.dms_url,
-                                   user=self._args.dms_user,
-                                   auth=self._args.dms_password)
+            return self._pooled(DmsAPI.DmsAPIv3(root=self._args.dms_url,
+                                                user=self._args.dms_user,
+                                                auth=self._args.dms_password), "dms")
 
 
         if self._args.dms_crs_url:
@@ -134,15 +216,44 @@ class DmsMirror:
         self.logger.debug(self.__log_msg(f"DMS_CRS_URL: [{_dms_client.crs_root}]"))
         # do not log headers since token may be displayed there!
 
-        return _dms_client
+        return self._pooled(_dms_client, "dms")
 
     def _get_mvn_client(self):
         """
         Return NexusAPI instance
         """
-        return NexusAPI.NexusAPI(root=self._args.mvn_url, user=self._args.mvn_user, auth=self._args.mvn_password,
-                                 readonly=False, anonymous=False, upload_repo=self._args.mvn_upload_repo,
-                                 download_repo=self._args.mvn_download_repo)
+        return self._pooled(NexusAPI.NexusAPI(
+            root=self._args.mvn_url, user=self._args.mvn_user, auth=self._args.mvn_password,
+            readonly=False, anonymous=False, upload_repo=self._args.mvn_upload_repo,
+            download_repo=self._args.mvn_download_repo), "mvn")
+
+    def _pooled(self, client, backend):
+        """
+        Make HTTP API client use keep-alive connection pools shared by all clients of the backend in the process,
+        and record its traffic if --traffic-record is set
+        :param oc_cdtapi.API.HttpAPI client:
+        :param str backend: backend name for connections statistics and traffic records
+        :return: the same client
+        """
+        http_pool.mount(client.web, backend, self._args.http_pool_connections, self._args.http_pool_maxsize)
+
+        if self._args.traffic_record:
+            Recorder(self._args.traffic_record).attach(client.web, backend)
+
+        return client
+
+    def _get_lease_backend(self):
+        """
+        Return lease backend configured, 'None' if leases are disabled
+        Files of leases expired are removed first
+        :return lease.FileLeaseBackend:
+        """
+        if self._args.lease_backend != "file":
+            return None
+
+        _backend = FileLeaseBackend(self._args.lease_dir)
+        self.logger.debug(self.__log_msg(f"Expired lease files removed: [{_backend.collect()}]"))
+        return _backend
 
     def _get_queue_client(self):
         # Set AMQP Credentials to be taken from VaultAPI
@@ -160,8 +271,13 @@ class DmsMirror:
         :return: 'None' on success, raised exception on failure
         """
         event_type = payload.get('type')
+        _handlers = {
+                self.DmsEventType.PUBLISH_COMPONENT_VERSION.value: self._process_publish_event,
+                self.DmsEventType.REGISTER_COMPONENT_VERSION_ARTIFACT.value: self._process_register_artifact_event,
+                self.DmsEventType.DELETE_COMPONENT_VERSION_ARTIFACT.value: self._process_delete_artifact_event,
+                self.DmsEventType.REVOKE_COMPONENT_VERSION.value: self._process_revoke_event}
 
-        if event_type != self.DmsEventType.PUBLISH_COMPONENT_VERSION.value:
+        if event_type not in _handlers:
             _err_msg = f"Event type is {event_type}, skipping"
             self.logger.error(self.__log_msg(_err_msg))
             raise Exception(_err_msg)
@@ -175,13 +291,165 @@ class DmsMirror:
         if not component or not version:
             raise ValueError(f"Missing required fields: component={component}, version={version}")
 
+        metrics.inc("events_total", type=event_type)
+        try:
+            _handlers[event_type](payload, component, version)
+        except Exception:
+            metrics.inc("event_errors_total", type=event_type)
+            raise
+
+    def _process_publish_event(self, payload, component, version):
+        """
+        Copy all artifacts of a version published
+        :param dict payload: webhook payload
+        :param str component: DmsComponentID
+        :param str version: component version
+        """
         if self._args.auto_register_component:
             self.register_component(payload)
 
+        # a version revoked may be published again
+        if version in self.load_component_state(component).get("revoked_versions", list()):
+            self.update_component_state(component, lambda x: x.update(
+                revoked_versions=list(filter(lambda _v: _v != version, x.get("revoked_versions", list())))))
+
         artifacts =  payload.get('artifacts')
+        self.process_artifacts(artifacts, component, version)
 
-        for artifact in artifacts:
-            self.process_artifact(artifact, component, version)
+    def _get_event_artifacts(self, payload):
+        """
+        Return artifacts of an artifact-level event
+        :param dict payload: webhook payload with 'artifact' or 'artifacts'
+        :return list:
+        """
+        artifacts = payload.get('artifacts') or list(filter(None, [payload.get('artifact')]))
+        if not artifacts or not all(map(lambda x: isinstance(x, dict), artifacts)):
+            raise ValueError("Missing or invalid artifact in payload")
+
+        return artifacts
+
+    def _process_register_artifact_event(self, payload, component, version):
+        """
+        Copy artifacts added to a version
+        :param dict payload: webhook payload
+        :param str component: DmsComponentID
+        :param str version: component version
+        """
+        artifacts = self._get_event_artifacts(payload)
+
+        if self._args.auto_register_component:
+            self.register_component(payload)
+
+        _keys = list(map(self._get_artifact_key, artifacts))
+        if set(_keys) & set(self.load_component_state(component).get("deleted_artifacts", dict()).get(version, list())):
+            self.update_component_state(component, lambda x: self._set_deleted_artifacts(
+                x, version, lambda _deleted: list(filter(lambda _k: _k not in _keys, _deleted))))
+
+        self.process_artifacts(artifacts, component, version)
+
+    def _process_delete_artifact_event(self, payload, component, version):
+        """
+        Remember artifacts deleted from a version, so batch runs do not copy them again
+        Copies already made are kept
+        :param dict payload: webhook payload
+        :param str component: DmsComponentID
+        :param str version: component version
+        """
+        _keys = list(map(self._get_artifact_key, self._get_event_artifacts(payload)))
+        self.logger.info(self.__log_msg(f"[{component}:{version}]: artifacts deleted: {_keys}"))
+
+        if not self.update_component_state(component, lambda x: self._set_deleted_artifacts(
+                x, version, lambda _deleted: sorted(set(_deleted + _keys)))):
+            self.logger.warning(self.__log_msg("State directory is not configured, deletion is not remembered"))
+
+    def _process_revoke_event(self, payload, component, version):
+        """
+        Remember a version revoked, so batch runs do not scan it again
+        Copies already made are kept
+        :param dict payload: webhook payload
+        :param str component: DmsComponentID
+        :param str version: component version
+        """
+        self.logger.info(self.__log_msg(f"[{component}:{version}]: version revoked"))
+
+        if not self.update_component_state(component, lambda x: x.update(
+                revoked_versions=sorted(set(x.get("revoked_versions", list()) + [version]), key=self._version_key))):
+            self.logger.warning(self.__log_msg("State directory is not configured, revocation is not remembered"))
+
+    @staticmethod
+    def _get_artifact_key(artifact):
+        """
+        Return artifact key to remember it in state: DMS artifact ID, or type, name and classifier if ID is missing
+        :param dict artifact: artifact properties from Dms
+        :return str:
+        """
+        if artifact.get("id") is not None:
+            return str(artifact["id"])
+
+        return ':'.join(map(lambda x: str(artifact.get(x) or ""), ["type", "name", "classifier"]))
+
+    @staticmethod
+    def _set_deleted_artifacts(state, version, update):
+        """
+        Update deleted artifacts of a version in component state
+        :param dict state: component synchronization state
+        :param str version: component version
+        :param update: function getting list of deleted artifacts keys and returning a new one
+        """
+        _deleted = state.setdefault("deleted_artifacts", dict())
+        _deleted[version] = update(_deleted.get(version, list()))
+
+        if not _deleted[version]:
+            del _deleted[version]
+
+    def process_artifacts(self, artifacts, component, version):
+        """
+        Process artifacts of a component version concurrently, with --webhook-artifact-workers threads
+        All artifacts are processed even if some of them fail
+        :param list artifacts: artifacts properties from Dms
+        :param str component: DmsComponentID
+        :param str version: component version
+        :return: 'None' on success; the error is raised if one artifact failed, summary exception if several
+        """
+        if not artifacts:
+            return
+
+        _process_artifact = self._with_process_name(self.process_artifact)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self._args.webhook_artifact_workers, len(artifacts)))) as _executor:
+            _futures = list(map(lambda x: _executor.submit(_process_artifact, x, component, version), artifacts))
+
+        _errors = list(filter(None, map(lambda x: x.exception(), _futures)))
+
+        if not _errors:
+            return
+
+        for _error in _errors:
+            self.logger.error(self.__log_msg(f"[{component}:{version}]: {repr(_error)}"))
+
+        if len(_errors) == 1:
+            raise _errors.pop()
+
+        raise Exception(f"[{len(_errors)}] of [{len(artifacts)}] artifacts of [{component}:{version}] failed: "
+                        f"{'; '.join(map(repr, _errors))}")
+
+    def process_component_webhooks(self, payloads):
+        """
+        Process many webhook payloads, i.e. DMS events replayed after an outage
+        :param list payloads: webhook payloads
+        :return list: 'None' for each payload processed, error message for each failed, in the order given
+        """
+        _results = list()
+
+        for _payload in payloads:
+            try:
+                self.process_component_webhook(_payload)
+                _results.append(None)
+            except Exception as _e:
+                self.logger.error(self.__log_msg(repr(_e)))
+                _results.append(str(_e) or repr(_e))
+
+        return _results
 
     def register_component(self, payload):
         component_id = payload.get("componentVersion").get("component")
@@ -251,7 +519,7 @@ class DmsMirror:
         _result["c_hyphen"] = f"-{_result['c']}" if _result["c"] else ""
         _result["c_colon"] = f":{_result['c']}" if _result["c"] else ""
 
-        temp_template = Template(distr_gav_template).substitute(_result)
+        temp_template = self._get_template(distr_gav_template).substitute(_result)
 
         escaped_template = re.sub(r'(?<!\$)\.', r'\\.', temp_template)
 
@@ -271,7 +539,7 @@ class DmsMirror:
         Process component
         To be called in separate process
         :param str component: DMS component ID
-        :return: 'None' on success, raised exception on failure
+        :return dict: 'None' on success, error record on failure, see 'errors.make_record'
         """
         self.__process_name = component
 
@@ -285,12 +553,48 @@ class DmsMirror:
             self.logger.warning(self.__log_msg(
                 "'componentId' and 'artifactType' parameters are deprecated and may be safely removed"))
 
+        _finished = set()
+        if self._journal:
+            _finished, _done = self._journal.load(component)
+
+            if _done:
+                self.logger.info(self.__log_msg(f"Skipping: [{component}]. Finished before the run was interrupted"))
+                return None
+
         try:
             versions = self._make_dms_api_call_with_retries(self.dms_client.get_versions, component) or list()
+            self._known_versions[component] = set(versions)
+            _state = self.load_component_state(component)
+            versions, _full_scan = self._select_versions(component, versions, _state)
+            _start_time = time.time()
             self.logger.info(self.__log_msg(f"[{component}]: versions to process: [{len(versions)}]"))
 
-            for version in versions:
-                self.process_version(version, component)
+            if _finished:
+                self.logger.info(self.__log_msg(
+                    f"[{component}]: versions finished before the run was interrupted: [{len(_finished)}]"))
+
+            with contextlib.closing(self._prefetching(
+                    component, filter(lambda x: x not in _finished, versions))) as _versions:
+                for version in _versions:
+                    try:
+                        self.process_version(version, component)
+                    except Exception as _e:
+                        errors.annotate(_e, version=version)
+                        raise
+
+                    if self._journal:
+                        self._journal.version_done(component, version)
+
+            # processing time of a full scan is used as component weight for sharding, resumed one is incomplete
+            self._update_watermark(component, versions, _full_scan,
+                                   time.time() - _start_time if _full_scan and not _finished else None)
+
+            if self._journal:
+                self._journal.component_done(component)
+
+            if self._args.daemon:
+                self._polled_versions[component] = (
+                    self._polled_versions.get(component, set()) | set(versions)) & self._known_versions[component]
         except Exception as _e:
             # this makes multiprocessing to stuck:
             # extending exception message to show the subprocess (i.e. component) where it has been raised
@@ -299,24 +603,275 @@ class DmsMirror:
             # DO NOT DO THAT!
             # the second bad idea is to return exception as a result in mulitprocessing stack
             # this makes stuck too unfortunately
-            # transfer a human-readable string to log it at the end
+            # transfer a record with a human-readable string to log it at the end
             _error_message = self.__log_msg(repr(_e))
             self.logger.error(_error_message, exc_info=True)
-            return _error_message
+            metrics.inc("component_errors_total")
+            return errors.make_record(_e, component, _error_message)
 
+        self.logger.debug(self.__log_msg(
+            f"HTTP connections of the process: DMS {http_pool.stats('dms')}, MVN {http_pool.stats('mvn')}"))
+        metrics.inc("components_processed_total")
         return None
 
+    @staticmethod
+    def _version_key(version):
+        """
+        Return a key for natural ordering of versions: numeric parts are compared as numbers,
+        a qualifier (a part with letters, i.e. '-RC1') goes before the release it qualifies: 1.2-RC1 < 1.2 < 1.2.1
+        :param str version: component version
+        :return list:
+        """
+        _key = list()
+
+        for _x in filter(None, re.split(r'(\d+)', version)):
+            if _x.isdigit():
+                _key.append((3, int(_x), ""))
+            elif re.search(r'[^\W\d_]', _x):
+                _key.append((0, 0, _x))
+            else:
+                # separator only, the release goes on
+                _key.append((2, 0, _x))
+
+        # end of version: after its qualifiers, before its continuations
+        _key.append((1, 0, ""))
+        return _key
+
+    def _select_versions(self, component, versions, state):
+        """
+        Narrow the versions list down to the scan window configured
+        :param str component: DMS component ID
+        :param list versions: all versions of the component
+        :param dict state: component synchronization state
+        :return tuple: (versions to process, whether it is a full scan)
+        """
+        if state.get("revoked_versions"):
+            _revoked = set(state["revoked_versions"])
+            versions = list(filter(lambda x: x not in _revoked, versions))
+            self.logger.info(self.__log_msg(f"[{component}]: revoked versions skipped: [{len(_revoked)}]"))
+
+        _interval = (self._args.full_scan_interval or 0) * 3600
+        if _interval and time.time() - state.get("last_full_scan", 0) >= _interval:
+            self.logger.info(self.__log_msg(f"[{component}]: full scan is due"))
+            return (versions, True)
+
+        _full_scan = True
+
+        if self._args.scan_window == "watermark" and state.get("mirrored_versions") is not None:
+            _mirrored = set(state["mirrored_versions"])
+            versions = list(filter(lambda x: x not in _mirrored, versions))
+            _full_scan = False
+            self.logger.info(self.__log_msg(f"[{component}]: versions not mirrored yet: [{len(versions)}]"))
+        elif self._args.scan_window == "watermark" and state.get("watermark"):
+            # state saved before mirrored versions were recorded
+            _watermark = self._version_key(state["watermark"])
+            versions = list(filter(lambda x: self._version_key(x) > _watermark, versions))
+            _full_scan = False
+            self.logger.info(self.__log_msg(
+                f"[{component}]: versions newer than watermark [{state['watermark']}]: [{len(versions)}]"))
+
+        if self._args.daemon and component in self._polled_versions:
+            # polled before: versions new since are to be mirrored only
+            _polled = self._polled_versions[component]
+            versions = list(filter(lambda x: x not in _polled, versions))
+            _full_scan = False
+            self.logger.info(self.__log_msg(f"[{component}]: versions not polled yet: [{len(versions)}]"))
+
+        if self._args.scan_newest and len(versions) > self._args.scan_newest:
+            versions = sorted(versions, key=self._version_key)[-self._args.scan_newest:]
+            _full_scan = False
+
+        return (versions, _full_scan)
+
+    def _update_watermark(self, component, versions, full_scan, cost=None):
+        """
+        Save versions processed as mirrored, and the newest one as component watermark
+        Versions no longer listed by DMS are dropped from mirrored ones
+        :param str component: DMS component ID
+        :param list versions: versions processed successfully
+        :param bool full_scan: whether all versions were processed
+        :param float cost: processing time of a full scan, seconds
+        """
+        def _update(state):
+            _versions = list(versions)
+            if state.get("watermark"):
+                _versions.append(state["watermark"])
+
+            if _versions:
+                state["watermark"] = max(_versions, key=self._version_key)
+
+            _mirrored = set(state.get("mirrored_versions") or list()) | set(versions)
+            _listed = self._known_versions.get(component)
+            if _listed is not None:
+                _mirrored &= _listed
+
+            state["mirrored_versions"] = sorted(_mirrored, key=self._version_key)
+
+            if full_scan:
+                state["last_full_scan"] = time.time()
+
+            if cost is not None:
+                state["cost"] = cost
+
+        self.update_component_state(component, _update)
+
+    def _get_state_path(self, component):
+        """
+        Return path to component synchronization state file
+        :param str component: DMS component ID
+        :return str:
+        """
+        return os.path.join(self._args.state_dir, f"{component}.json")
+
+    def load_component_state(self, component):
+        """
+        Return synchronization state saved for a component
+        :param str component: DMS component ID
+        :return dict: state, empty if state directory is not configured or nothing saved yet
+        """
+        if not self._args.state_dir:
+            return dict()
+
+        _path = self._get_state_path(component)
+        if not os.path.exists(_path):
+            return dict()
+
+        with open(_path, mode='rt') as _state:
+            return json.load(_state)
+
+    def update_component_state(self, component, update):
+        """
+        Update synchronization state of a component under file lock,
+        so batch runs and REST service workers sharing state directory do not lose changes of each other
+        :param str component: DMS component ID
+        :param update: function getting the state and changing it in place
+        :return dict: the state saved, 'None' if state directory is not configured
+        """
+        if not self._args.state_dir:
+            return None
+
+        os.makedirs(self._args.state_dir, exist_ok=True)
+        _fd = os.open(os.path.join(self._args.state_dir, f".{component}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX)
+            _state = self.load_component_state(component)
+            update(_state)
+            self.save_component_state(component, _state)
+            return _state
+        finally:
+            os.close(_fd)
+
+    def save_component_state(self, component, state):
+        """
+        Save synchronization state for a component, atomically
+        :param str component: DMS component ID
+        :param dict state: state to save
+        """
+        if not self._args.state_dir:
+            return
+
+        os.makedirs(self._args.state_dir, exist_ok=True)
+        _fd, _tmp_path = tempfile.mkstemp(dir=self._args.state_dir, prefix=f".{component}.")
+
+        with os.fdopen(_fd, mode='wt') as _state:
+            json.dump(state, _state)
+
+        os.replace(_tmp_path, self._get_state_path(component))
+
     def process_version(self, version, component):
         """
         Process versions of component
         :param str version: component version
         :param str component: DmsComponentID
         """
-        artifacts = self._make_dms_api_call_with_retries(self.dms_client.get_artifacts, component, version) or list()
+        artifacts = self._get_artifacts(component, version)
+        artifacts = self._filter_deleted(component, version, artifacts, self.load_component_state(component).get(
+            "deleted_artifacts", dict()).get(version))
         self.logger.info(self.__log_msg(f"[{component}:{version}]: artifacts to process: [{len(artifacts)}]"))
 
         for artifact in artifacts:
-            self.process_artifact(artifact, component, version)
+            try:
+                self.process_artifact(artifact, component, version)
+            except Exception as _e:
+                errors.annotate(_e, artifact=self._get_artifact_key(artifact))
+                raise
+
+    def _get_artifacts(self, component, version):
+        """
+        Return artifacts of a version, fetched ahead by '_prefetching' if it is in progress
+        :param str component: DmsComponentID
+        :param str version: component version
+        :return list: artifacts properties from Dms
+        """
+        _future = self._prefetched.pop((component, version), None)
+        if _future:
+            return _future.result()
+
+        return self._make_dms_api_call_with_retries(self.dms_client.get_artifacts, component, version) or list()
+
+    def _prefetching(self, component, versions):
+        """
+        Yield versions given while artifacts of the next --listing-prefetch ones are fetched in background,
+        so listing of a version overlaps processing of the previous one
+        Latency only: versions list is held whole as DMS API returns it, with no pagination, and listings of
+        the current version and --listing-prefetch next ones are held at once, more than with no prefetch
+        :param str component: DmsComponentID
+        :param versions: iterable of versions, consumed lazily
+        :return generator: versions
+        """
+        _depth = self._args.listing_prefetch
+        if not _depth:
+            yield from versions
+            return
+
+        _versions = iter(versions)
+        _ahead = list()
+        _fetch = self._with_process_name(self._make_dms_api_call_with_retries)
+
+        with ThreadPoolExecutor(max_workers=_depth) as _executor:
+            try:
+                while True:
+                    # the version to yield and the next ones
+                    for _version in itertools.islice(_versions, _depth + 1 - len(_ahead)):
+                        _ahead.append(_version)
+                        self._prefetched[(component, _version)] = _executor.submit(
+                            _fetch, self.dms_client.get_artifacts, component, _version)
+
+                    if not _ahead:
+                        return
+
+                    yield _ahead[0]
+                    self._drop_prefetched(component, _ahead.pop(0))
+            finally:
+                for _version in _ahead:
+                    self._drop_prefetched(component, _version)
+
+    def _drop_prefetched(self, component, version):
+        """
+        Cancel fetching artifacts listing of a version not taken, i.e. on failure
+        :param str component: DmsComponentID
+        :param str version: component version
+        """
+        _future = self._prefetched.pop((component, version), None)
+        if _future:
+            _future.cancel()
+
+    def _filter_deleted(self, component, version, artifacts, deleted):
+        """
+        Drop artifacts deleted by DMS events
+        :param str component: DmsComponentID
+        :param str version: component version
+        :param list artifacts: artifacts properties from Dms
+        :param list deleted: keys of artifacts deleted
+        :return list:
+        """
+        if not deleted:
+            return artifacts
+
+        _result = list(filter(lambda x: self._get_artifact_key(x) not in deleted, artifacts))
+        self.logger.info(self.__log_msg(
+            f"[{component}:{version}]: artifacts deleted by events skipped: [{len(artifacts) - len(_result)}]"))
+        return _result
 
     def _get_static_ci_type(self, artifact_type):
         """
@@ -387,17 +942,18 @@ class DmsMirror:
         self.logger.debug(self.__log_msg(f"Returning subst: [{_result}]"))
         return _result
 
-    def process_artifact(self, artifact, component, version):
+    def _get_target(self, artifact, component, version, params=None):
         """
-        Process artifacts
+        Resolve target GAV for an artifact
         :param dict artifact: artifact properties from Dms
-        :param str version: component version
         :param str component: DmsComponentID
+        :param str version: component version
+        :param dict params: component configuration, looked up if not given
+        :return tuple: (target GAV, artifact type, component parameters), 'None' if artifact is to be skipped
         """
-
         if artifact.get("repositoryType") == "DOCKER":
             self.logger.info(self.__log_msg(f"Skipping {artifact}: incompatible [repositoryType]"))
-            return
+            return None
 
         self.logger.debug(self.__log_msg(f"Artifact: {artifact}"))
 
@@ -407,11 +963,11 @@ class DmsMirror:
         self.logger.info(self.__log_msg(
             f"Processing component:artifact_type:version = [{component}:{_artifact_type}:{version}]"))
 
-        _params = self.get_component_config(component)
+        _params = params or self.get_component_config(component)
         if not _params:
             self.logger.warning(self.__log_msg(
                 f"Component [{component}] has not yet registered, skipping"))
-            return
+            return None
 
         self.logger.debug(self.__log_msg(f"Params: {_params}"))
         _gav_template = _params.get("tgtGavTemplate")
@@ -419,31 +975,256 @@ class DmsMirror:
         if not _gav_template:
             self.logger.warning(self.__log_msg(
                 f"Component [{component}] has no GAV settings for artifact_type [{_artifact_type}], skipping"))
-            return
+            return None
 
         _gav_template = _gav_template.get(_artifact_type).replace("\\", "")
 
         self.logger.debug(self.__log_msg(f"GAV template for [{component}:{_artifact_type}:{version}]: [{_gav_template}]"))
-        _tgt_gav = Template(_gav_template).substitute(self._make_gav_substitute(component, version, artifact))
+        _tgt_gav = self._get_template(_gav_template).substitute(self._make_gav_substitute(component, version, artifact))
         _tgt_gav = re.sub('[^\w\-\.\:_]+', "_", _tgt_gav)
         self.logger.info(self.__log_msg(f"Target GAV: [{component}:{_artifact_type}:{version}] ==> [{_tgt_gav}]"))
 
-        if self.mvn_client.exists(_tgt_gav, repo=self._args.mvn_download_repo):
+        return (_tgt_gav, _artifact_type, _params)
+
+    def process_artifact(self, artifact, component, version):
+        """
+        Process artifacts
+        :param dict artifact: artifact properties from Dms
+        :param str version: component version
+        :param str component: DmsComponentID
+        """
+        _target = self._get_target(artifact, component, version)
+        if not _target:
+            return
+
+        _tgt_gav, _artifact_type, _params = _target
+
+        if self.lease_backend:
+            # another instance (batch run or REST service) may be transferring the same target right now
+            _lease = Lease(self.lease_backend, _tgt_gav, self._args.lease_ttl)
+            if not _lease.acquire():
+                # not done yet: the version is not to be journaled or recorded as mirrored
+                self.logger.info(self.__log_msg(f"Leased by another instance, to be retried: [{_tgt_gav}]"))
+                metrics.inc("artifacts_leased_total")
+                raise LeaseHeld(f"Lease [{_tgt_gav}] is held by another instance")
+
+            try:
+                self._process_target(artifact, component, version, _tgt_gav, _artifact_type, _params, lease=_lease)
+            finally:
+                _lease.release()
+
+            return
+
+        self._process_target(artifact, component, version, _tgt_gav, _artifact_type, _params)
+
+    def _process_target(self, artifact, component, version, tgt_gav, artifact_type, params, lease=None):
+        """
+        Copy and register an artifact to the target GAV resolved
+        :param dict artifact: artifact properties from Dms
+        :param str component: DmsComponentID
+        :param str version: component version
+        :param str tgt_gav: target GAV
+        :param str artifact_type: DMS artifact type
+        :param dict params: component configuration
+        :param lease.Lease lease: lease held on the target, checked before upload and registration
+        """
+        with self._backend_call("nexus"):
+            _exists = self.mvn_client.exists(tgt_gav, repo=self._args.mvn_download_repo)
+
+        if _exists:
             self.logger.info(self.__log_msg(
-                f"Already exists, skipping copying: [{component}:{_artifact_type}:{version}] ==> [{_tgt_gav}]"))
+                f"Already exists, skipping copying: [{component}:{artifact_type}:{version}] ==> [{tgt_gav}]"))
+            metrics.inc("artifacts_existing_total")
             if self._args.always_enqueue is True:
                 self.logger.info(self.__log_msg("Always enqueue parameter set, registering"))
-                _ci_type = self._get_static_ci_type(_artifact_type) or _params["ci_type"]
-                self._register_artifact(_tgt_gav, _ci_type)
+                _ci_type = self._get_static_ci_type(artifact_type) or params["ci_type"]
+                if lease:
+                    lease.check()
+                self._register_artifact(tgt_gav, _ci_type)
+                metrics.inc("artifacts_registered_total")
             return
 
+        _ci_type = self._get_static_ci_type(artifact_type) or params["ci_type"]
+        self.logger.debug(self.__log_msg(f"ci_type: [{component}:{artifact_type}:{version}] ==> [{_ci_type}]"))
+
+        self.logger.info(self.__log_msg(f"Copying: [{component}:{artifact_type}:{version}] ==> [{tgt_gav}]"))
+        self._copy_artifact(component, version, artifact, tgt_gav, lease=lease)
+        metrics.inc("artifacts_copied_total")
+
+        if lease:
+            lease.check()
+
+        self.logger.info(self.__log_msg(f"Registering: [{tgt_gav}] with ci_type [{_ci_type}]"))
+        self._register_artifact(tgt_gav, _ci_type)
+        metrics.inc("artifacts_registered_total")
+
+    def plan_artifact(self, artifact, component, version, params=None):
+        """
+        Compute actions 'process_artifact' would perform, without transferring or enqueuing anything
+        :param dict artifact: artifact properties from Dms
+        :param str component: DmsComponentID
+        :param str version: component version
+        :param dict params: component configuration, looked up if not given
+        :return list: planned actions, dictionaries with 'action' key set to 'copy' or 'register'
+        """
+        _target = self._get_target(artifact, component, version, params)
+        if not _target:
+            return list()
+
+        _tgt_gav, _artifact_type, _params = _target
+        _action = {"component": component, "version": version, "artifact_type": _artifact_type, "gav": _tgt_gav}
+        _actions = list()
+
+        with self._backend_call("nexus"):
+            _exists = self.mvn_client.exists(_tgt_gav, repo=self._args.mvn_download_repo)
+
+        if _exists:
+            if self._args.always_enqueue is not True:
+                return _actions
+        else:
+            _actions.append(dict(_action, action="copy"))
+
         _ci_type = self._get_static_ci_type(_artifact_type) or _params["ci_type"]
-        self.logger.debug(self.__log_msg(f"ci_type: [{component}:{_artifact_type}:{version}] ==> [{_ci_type}]"))
+        _actions.append(dict(_action, action="register", ci_type=_ci_type))
+        return _actions
+
+    def plan_component(self, component, versions=None):
+        """
+        Compute the mirroring plan for a component
+        To be called in separate process
+        :param str component: DMS component ID
+        :param list versions: versions to plan, all DMS versions if not set
+        :return dict: 'component', 'actions' planned and 'error' message if any
+        """
+        self.__process_name = component
+        _result = {"component": component, "actions": list(), "error": None}
+
+        _params = self.get_component_config(component)
+        if not _params or not _params.get('enabled', True):
+            self.logger.info(self.__log_msg(f"Skipping: [{component}]. Not configured or disabled"))
+            return _result
+
+        try:
+            _state = self.load_component_state(component)
+            if versions is None:
+                versions = self._make_dms_api_call_with_retries(self.dms_client.get_versions, component) or list()
+                versions, _ = self._select_versions(component, versions, _state)
+
+            with contextlib.closing(self._prefetching(component, versions)) as _versions:
+                for version in _versions:
+                    artifacts = self._filter_deleted(component, version, self._get_artifacts(component, version),
+                                                     _state.get("deleted_artifacts", dict()).get(version))
+
+                    for artifact in artifacts:
+                        _result["actions"].extend(self.plan_artifact(artifact, component, version, _params))
+        except Exception as _e:
+            _result["error"] = self.__log_msg(repr(_e))
+            self.logger.error(_result["error"], exc_info=True)
 
-        self.logger.info(self.__log_msg(f"Copying: [{component}:{_artifact_type}:{version}] ==> [{_tgt_gav}]"))
-        self._copy_artifact(component, version, artifact, _tgt_gav)
-        self.logger.info(self.__log_msg(f"Registering: [{_tgt_gav}] with ci_type [{_ci_type}]"))
-        self._register_artifact(_tgt_gav, _ci_type)
+        return _result
+
+    def inventory_component(self, component, params):
+        """
+        Compute target GAVs of all artifacts of a component, without checking MVN
+        Versions revoked and artifacts deleted by DMS events are skipped
+        To be called in separate process
+        :param str component: DMS component ID
+        :param dict params: component configuration
+        :return dict: 'component', 'targets' as (target GAV, version, artifact type) tuples and 'error' message if any
+        """
+        self.__process_name = component
+        _result = {"component": component, "targets": list(), "error": None}
+
+        if not params.get('enabled', True):
+            self.logger.info(self.__log_msg(f"Skipping: [{component}]. Disabled in the configuration"))
+            return _result
+
+        try:
+            _state = self.load_component_state(component)
+            _revoked = set(_state.get("revoked_versions", list()))
+            versions = self._make_dms_api_call_with_retries(self.dms_client.get_versions, component) or list()
+
+            with contextlib.closing(self._prefetching(
+                    component, filter(lambda x: x not in _revoked, versions))) as _versions:
+                for version in _versions:
+                    artifacts = self._filter_deleted(component, version, self._get_artifacts(component, version),
+                                                     _state.get("deleted_artifacts", dict()).get(version))
+
+                    for artifact in artifacts:
+                        _target = self._get_target(artifact, component, version, params)
+                        if _target:
+                            _result["targets"].append((_target[0], version, _target[1]))
+        except Exception as _e:
+            _result["error"] = self.__log_msg(repr(_e))
+            self.logger.error(_result["error"], exc_info=True)
+
+        return _result
+
+    def list_mvn_group(self, group):
+        """
+        List artifacts of a group in MVN download repository with the search of MVN client,
+        Nexus (Lucene search) and Artifactory (GAVC search) alike
+        POMs, checksums and signatures are not listed, nor artifacts of other groups the search may match
+        :param str group: groupId
+        :return set: GAVs, as target GAVs are formatted
+        """
+        with self._backend_call("nexus"):
+            _listed = self.mvn_client.ls(group, repo=self._args.mvn_download_repo) or list()
+
+        _gavs = set()
+        for _gav in _listed:
+            _parts = _gav.split(":")
+
+            if _parts[0] != group or len(_parts) < 4 or not _parts[3]:
+                continue
+
+            if _parts[3] == "pom" or _parts[3].rsplit(".", 1).pop() in self.mvn_auxiliary_extensions:
+                continue
+
+            _gavs.add(sys.intern(_gav))
+
+        return _gavs
+
+    def _get_template(self, template):
+        """
+        Return compiled GAV template, cached until configuration is reloaded
+        :param str template: template string
+        :return string.Template:
+        """
+        _template = self._templates.get(template)
+        if not _template:
+            _template = Template(template)
+            self._templates[template] = _template
+
+        return _template
+
+    def _build_gav_index(self):
+        """
+        Build reverse index from target GAV to component for the configuration loaded
+        :return GavIndex:
+        """
+        _configs = list(self._components.values()) + [self._gav_template or dict()]
+        _artifact_types = set(itertools.chain.from_iterable(
+                map(lambda x: (x.get("tgtGavTemplate") or dict()).keys(), _configs)))
+        _index = GavIndex(self._args.mvn_prefix, dict(filter(
+                lambda x: x[1], map(lambda x: (x, self._get_static_ci_type(x)), _artifact_types))))
+
+        for _component, _params in self._components.items():
+            _index.add_component(_component, _params)
+
+        if self._gav_template:
+            _index.add_generic(self._gav_template)
+
+        return _index
+
+    def find_component_by_gav(self, gav):
+        """
+        Find components and ci_types producing the target GAV given
+        Component is 'None' for GAVs of the generic template: components registered in database only
+        :param str gav: target GAV
+        :return list: dictionaries with 'component', 'artifact_type' and 'ci_type', the most specific first
+        """
+        return self.gav_index.find(gav)
 
     def get_component_config(self, component):
         _params = self._components.get(component)
@@ -451,26 +1232,77 @@ class DmsMirror:
             return _params
 
         try:
-            citype = self.pg_client.get_citypedms_by_dms_id(component)
+            citype = self._get_citypedms(component)
         except HttpAPIError as e:
-            if e.code == 404:
-                self.logger.warning(
-                    self.__log_msg(f"Component [{component}] not registered in config nor in database, skipping"))
-            else:
-                self.logger.error(
-                    self.__log_msg(f"Postgres client error: {e.resp}"))
+            self.logger.error(
+                self.__log_msg(f"Postgres client error: {e.resp}"))
+            return None
+
+        if citype is None:
             return None
 
         return self._generate_component_config(citype)
 
-    def _generate_component_config(self, citype):
+    def _get_citypedms(self, component):
+        """
+        Return component registration from database
+        :param str component: DMS component ID
+        :return dict: citypedms record, 'None' if component is not registered
+        """
+        try:
+            return self.pg_client.get_citypedms_by_dms_id(component)
+        except HttpAPIError as e:
+            if e.code != 404:
+                raise
+
+        self.logger.warning(
+            self.__log_msg(f"Component [{component}] not registered in config nor in database, skipping"))
+        return None
+
+    def get_components_config(self, components):
+        """
+        Return configuration for many components at once, as 'get_component_config' does for one
+        Database registrations are requested concurrently, DMS components catalog is requested once for all
+        :param list components: DMS component IDs, duplicates are resolved once
+        :return generator: (component, parameters, error) tuples in the order given,
+                           parameters are 'None' if not found, error is 'None' on success
+        """
+        _pending = list()
+        _catalog = None
+
+        with ThreadPoolExecutor(max_workers=self._args.batch_workers) as _executor:
+            for _component in dict.fromkeys(components):
+                _params = self._components.get(_component)
+                _pending.append((_component, _params, None if _params else _executor.submit(
+                    self._get_citypedms, _component)))
+
+            for _component, _params, _future in _pending:
+                if not _future:
+                    yield (_component, _params, None)
+                    continue
+
+                try:
+                    _citype = _future.result()
+
+                    if _citype is not None and _catalog is None:
+                        _catalog = self._make_dms_api_call_with_retries(self.dms_client.get_components) or list()
+
+                    yield (_component, None if _citype is None else self._generate_component_config(
+                        _citype, _catalog), None)
+                except Exception as _e:
+                    _error = self.__log_msg(repr(_e))
+                    self.logger.error(_error)
+                    yield (_component, None, _error)
+
+    def _generate_component_config(self, citype, components=None):
         component = citype.get('dms_id')
         citype_id = citype.get('ci_type_id')
         if not component or not citype_id:
             self.logger.error(self.__log_msg(f"Invalid data for component [{component}] or citype [{citype_id}]"))
             return None
         self.logger.debug(self.__log_msg(f"Component [{component}] not registered in config, creating temporary one"))
-        components = self._make_dms_api_call_with_retries(self.dms_client.get_components) or list()
+        if components is None:
+            components = self._make_dms_api_call_with_retries(self.dms_client.get_components) or list()
         client_code = None
         for comp in components:
             if comp["id"] == component:
@@ -496,60 +1328,350 @@ class DmsMirror:
         :param str ci_type: ci_type
         """
         _location = FileLocation(tgt_gav, "NXS", None)
-        if self._args.msg_target == "amqp":
-            # Send to RabbitMQ
-            self.queue_client.connect()
-            self.logger.info(self.__log_msg(f"About to send queue to mq"))
-            resp = self.queue_client.register_file(_location, ci_type, 0)
-            self.logger.debug(self.__log_msg(f"Register response: [{resp}]"))
-            self.queue_client.disconnect()
-        else:
-            # Send to PSQL MQ
-            self.logger.info(self.__log_msg(f"About to send queue to psql"))
-            params = {
-                "location": _location,
-                "citype": ci_type,
-                "depth": 0
-            }
-            message = self.psql_mq_client.compose_message('register_file', params)
-            self.logger.debug(self.__log_msg('Composed message: [%s]' % message))
-            self.psql_mq_client.enqueue_message('cdt.dlartifacts.input', message)
-
-    def _copy_artifact(self, component, version, artifact, tgt_gav):
+        with _register_lock, self._error_backend("amqp" if self._args.msg_target == "amqp" else "psql_mq"):
+            if self._args.msg_target == "amqp":
+                # Send to RabbitMQ
+                self.queue_client.connect()
+                self.logger.info(self.__log_msg(f"About to send queue to mq"))
+                resp = self.queue_client.register_file(_location, ci_type, 0)
+                self.logger.debug(self.__log_msg(f"Register response: [{resp}]"))
+                self.queue_client.disconnect()
+            else:
+                # Send to PSQL MQ
+                self.logger.info(self.__log_msg(f"About to send queue to psql"))
+                params = {
+                    "location": _location,
+                    "citype": ci_type,
+                    "depth": 0
+                }
+                message = self.psql_mq_client.compose_message('register_file', params)
+                self.logger.debug(self.__log_msg('Composed message: [%s]' % message))
+                self.psql_mq_client.enqueue_message('cdt.dlartifacts.input', message)
+
+    def _copy_artifact(self, component, version, artifact, tgt_gav, lease=None):
         """
         Make an artifact copy
         :param str component:
         :param str version:
         :param dict artifact: artifact properties from DMS
         :param str tgt_gav: target GAV
+        :param lease.Lease lease: lease held on the target, checked before upload
         """
+        _fetch_range = None
+        _download = lambda _file: None
+        _backend = "dms"
 
-        _tgt_file = tempfile.TemporaryFile(mode='w+b')
         if hasattr(self.dms_client, "download_component"):
             self.logger.info(self.__log_msg(f"Downloading component: [{component}:{version}:{artifact['type']}]"))
-            self._make_dms_api_call_with_retries(self.dms_client.download_component, component, version, artifact["id"], write_to=_tgt_file)
+            _fetch_range = lambda _start, _end: self._get_dms_download_range(component, version, artifact, _start, _end)
+            _download = lambda _file: self._download_from_dms(component, version, artifact, _file)
         elif hasattr(self.dms_client, "get_gav"):
             self.logger.debug(self.__log_msg(f"Getting GAV from DMS: [{component}:{version}:{artifact['type']}]"))
             _src_gav = self._make_dms_api_call_with_retries(
                     self.dms_client.get_gav, component, version,
                     artifact["type"], artifact["name"], artifact["classifier"])
             self.logger.info(self.__log_msg(f"Downloading source GAV: [{_src_gav}]"))
-            self.mvn_client.cat(_src_gav, repo=self._args.mvn_download_repo,
-                                stream=True, binary=True, write_to=_tgt_file)
+            _fetch_range = lambda _start, _end: self._get_mvn_download_range(_src_gav, _start, _end)
+            _backend = "nexus"
+            _download = lambda _file: self.mvn_client.cat(_src_gav, repo=self._args.mvn_download_repo,
+                                                          stream=True, binary=True, write_to=_file)
+
+        _size, _ranges = self._get_artifact_size(_fetch_range, _backend)
+
+        with self._get_spool_manager().spool(_size) as _tgt_file:
+            with self._transfer_slot("download"):
+                if not self._download_multipart(_fetch_range if _ranges else None, _size, _tgt_file):
+                    with self._backend_call(_backend, transfer=True):
+                        _download(self._throttled(_tgt_file, "download"))
+
+            _tgt_file.seek(0, os.SEEK_SET)
+            self.logger.info(self.__log_msg(
+                f"Putting to [{self._args.mvn_upload_repo}]: [{component}:{version}:{artifact['type']}] ==> [{tgt_gav}]"))
+
+            if lease:
+                # a download outliving the lease: the target may be uploaded by another instance already
+                lease.check()
+
+            with self._transfer_slot("upload"), self._backend_call("nexus", transfer=True):
+                self.mvn_client.upload(tgt_gav, repo=self._args.mvn_upload_repo,
+                                       data=self._throttled(upload_view(_tgt_file), "upload"), pom=True)
 
-        _tgt_file.seek(0, os.SEEK_SET)
-        self.logger.info(self.__log_msg(
-            f"Putting to [{self._args.mvn_upload_repo}]: [{component}:{version}:{artifact['type']}] ==> [{tgt_gav}]"))
-        self.mvn_client.upload(tgt_gav, repo=self._args.mvn_upload_repo, data=_tgt_file, pom=True)
-        _tgt_file.close()
         self.logger.debug(self.__log_msg(f"Uploaded: [{component}:{version}:{artifact['type']}] ==> [{tgt_gav}]"))
 
+    def _download_from_dms(self, component, version, artifact, write_to):
+        """
+        Download an artifact from DMS, resuming from the last byte written after connection failures
+        :param str component:
+        :param str version:
+        :param dict artifact: artifact properties from DMS
+        :param write_to: binary file object to write to, empty
+        """
+        _attempt = 0
+        while True:
+            _attempt += 1
+            _offset = write_to.tell()
+            self.logger.debug(self.__log_msg(f"download: attempt [{_attempt}], offset [{_offset}]"))
+
+            try:
+                if _offset:
+                    _expected = self._resume_dms_download(component, version, artifact, write_to, _offset)
+                else:
+                    _expected = get_content_size(self.dms_client.download_component(
+                        component, version, artifact["id"], write_to=write_to))
+
+                _written = write_to.tell()
+
+                if _expected is None or _written == _expected:
+                    return
+
+                if _written > _expected:
+                    self.logger.warning(self.__log_msg(
+                        f"Downloaded [{_written}] bytes while [{_expected}] expected, starting over"))
+                    write_to.seek(0, os.SEEK_SET)
+                    write_to.truncate()
+
+                raise IncompleteRead(_written, _expected - _written)
+            except self.__transfer_errors as _err:
+                if _attempt >= self._args.retries_count:
+                    raise
+
+                self.logger.debug(self.__log_msg(repr(_err)), exc_info=True)
+                time.sleep(30)
+
+    def _resume_dms_download(self, component, version, artifact, write_to, offset):
+        """
+        Continue an artifact download from DMS with HTTP Range request
+        :param str component:
+        :param str version:
+        :param dict artifact: artifact properties from DMS
+        :param write_to: binary file object to write to, positioned at the offset
+        :param int offset: bytes already written
+        :return int: full artifact size expected, 'None' if unknown
+        """
+        self.logger.info(self.__log_msg(f"Resuming download from byte [{offset}]: [{component}:{version}:{artifact['type']}]"))
+        _response = self._get_dms_download_range(component, version, artifact, offset)
+
+        if _response.status_code != 206:
+            self.logger.warning(self.__log_msg("Ranges are not supported by DMS, starting over"))
+            write_to.seek(0, os.SEEK_SET)
+            write_to.truncate()
+
+        shutil.copyfileobj(_response.raw, write_to)
+        write_to.flush()
+        return get_content_size(_response)
+
+    def _get_dms_download_range(self, component, version, artifact, start, end=None):
+        """
+        Request a bytes range of an artifact from DMS
+        :param str component:
+        :param str version:
+        :param dict artifact: artifact properties from DMS
+        :param int start: first byte offset
+        :param int end: last byte offset, up to the end if not set
+        :return requests.Response: streamed response
+        """
+        # the same resource as 'download_component' requests, but with a range
+        return self.dms_client.get(
+                ['components', component, 'versions', version, 'artifacts', str(artifact["id"]), 'download'],
+                headers={"Range": f"bytes={start}-{'' if end is None else end}"}, stream=True)
+
+    def _get_mvn_download_range(self, gav, start, end=None):
+        """
+        Request a bytes range of an artifact from MVN download repository
+        :param str gav: source GAV
+        :param int start: first byte offset
+        :param int end: last byte offset, up to the end if not set
+        :return requests.Response: streamed response
+        """
+        _url = self.mvn_client.gav_get_url(gav, repo=self._args.mvn_download_repo)
+        return self.mvn_client.pp(self.mvn_client.web.get(
+            _url, headers={"Range": f"bytes={start}-{'' if end is None else end}"}, stream=True))
+
+    def _use_multipart(self):
+        """
+        Check if large artifacts are to be downloaded with concurrent range requests
+        :return bool:
+        """
+        return bool(self._args.multipart_threshold) and self._args.multipart_parts >= 2
+
+    def _get_artifact_size(self, fetch_range, backend):
+        """
+        Learn artifact size with range request if multipart download or spool admission needs it
+        :param fetch_range: function (start, end) returning streamed response for bytes range
+        :param str backend: backend the artifact is downloaded from, 'dms' or 'nexus'
+        :return tuple: (size, 'None' if unknown or not needed; whether ranges are supported)
+        """
+        if not fetch_range:
+            return (None, False)
+
+        if not (self._use_multipart() or self._args.spool_min_free or self._args.spool_budget):
+            return (None, False)
+
+        return self._call_with_retries(backend, probe_size, fetch_range)
+
+    def _download_multipart(self, fetch_range, size, file_obj):
+        """
+        Download an artifact larger than the threshold configured with concurrent range requests
+        :param fetch_range: function (start, end) returning streamed response for bytes range,
+            'None' if ranges are not supported
+        :param int size: artifact size, 'None' if unknown
+        :param file_obj: spool file object
+        :return bool: 'False' if artifact is to be downloaded as a single stream
+        """
+        if not fetch_range or not self._use_multipart():
+            return False
+
+        if size is None or size < self._args.multipart_threshold:
+            self.logger.debug(self.__log_msg(f"Single stream download, size: [{size}]"))
+            return False
+
+        self.logger.info(self.__log_msg(f"Downloading [{size}] bytes in [{self._args.multipart_parts}] parts"))
+        _bucket = self._get_bucket("download")
+        download_ranges(fetch_range, size, file_obj, self._args.multipart_parts,
+                        retries=self._args.retries_count, consume=_bucket.consume if _bucket else None)
+        return True
+
+    def _get_spool_manager(self):
+        """
+        Return spool manager: small artifacts are kept in memory, large ones go to spool directory
+        once free space and bytes in flight budget shared by all processes of the host allow
+        :return SpoolManager:
+        """
+        _budget = None
+        if self._args.spool_budget:
+            _budget = InflightBudget(os.path.join(self._args.throttle_dir, "spool.budget"), self._args.spool_budget)
+
+        return SpoolManager(directory=self._args.spool_dir, memory_threshold=self._args.spool_memory_threshold,
+                            min_free=self._args.spool_min_free, budget=_budget,
+                            timeout=self._args.spool_admission_timeout,
+                            unknown_size=self._args.spool_unknown_size)
+
+    def _get_bucket(self, direction):
+        """
+        Return bandwidth bucket shared by all processes of the host
+        :param str direction: 'download' or 'upload'
+        :return TokenBucket: 'None' if unlimited
+        """
+        _rate = getattr(self._args, f"{direction}_rate")
+        if not _rate:
+            return None
+
+        return TokenBucket(os.path.join(self._args.throttle_dir, f"{direction}.bucket"), _rate)
+
+    def _throttled(self, file_obj, direction):
+        """
+        Wrap spool file to limit transfer rate shared by all processes of the host
+        :param file_obj: spool file object
+        :param str direction: 'download' or 'upload'
+        :return: file object to transfer with
+        """
+        _bucket = self._get_bucket(direction)
+        if not _bucket:
+            return file_obj
+
+        return ThrottledFile(file_obj, _bucket)
+
+    def _transfer_slot(self, direction):
+        """
+        Return context manager holding a transfer slot shared by all processes of the host
+        :param str direction: 'download' or 'upload'
+        """
+        _limit = getattr(self._args, f"max_{direction}s")
+        if not _limit:
+            return contextlib.nullcontext()
+
+        return TransferSlots(os.path.join(self._args.throttle_dir, f"{direction}.slots"), _limit,
+                             aging=self._args.priority_aging).slot(self.priority_levels[self.transfer_priority])
+
+    def _get_adaptive_limiter(self, backend):
+        """
+        Return adaptive concurrent calls limiter of a backend shared by all processes of the host
+        :param str backend: 'dms' or 'nexus'
+        :return AdaptiveLimiter: 'None' if disabled
+        """
+        if not self._args.adaptive_max_calls:
+            return None
+
+        return AdaptiveLimiter(os.path.join(self._args.throttle_dir, f"{backend}.adaptive"),
+                               min_limit=self._args.adaptive_min_calls, max_limit=self._args.adaptive_max_calls)
+
+    def _is_backend_overload(self, error):
+        """
+        Check if an error means the backend is overloaded or throttles calls, rather than a bad request
+        :param Exception error:
+        :return bool:
+        """
+        if isinstance(error, HttpAPIError):
+            return error.code == 429 or error.code >= 500
+
+        return isinstance(error, self.__transfer_errors)
+
+    @contextlib.contextmanager
+    def _backend_call(self, backend, transfer=False):
+        """
+        Context manager holding a backend call slot within the adaptive limit, the limit is adapted to the call result
+        The backend is attached to errors raised, for error records
+        :param str backend: 'dms' or 'nexus'
+        :param bool transfer: whether the call is an artifact transfer: it holds no slot, so metadata calls do not
+                              wait behind long transfers bounded by --max-downloads/--max-uploads anyway,
+                              and counts for errors only, its duration depends on size
+        """
+        _limiter = self._get_adaptive_limiter(backend)
+
+        if not _limiter:
+            with self._error_backend(backend):
+                yield
+
+            return
+
+        with contextlib.nullcontext() if transfer else _limiter.slot():
+            _start = time.monotonic()
+            _error = False
+
+            try:
+                yield
+            except Exception as _err:
+                errors.annotate(_err, backend=backend)
+                _error = self._is_backend_overload(_err)
+                raise
+            finally:
+                _before, _after, _reason = _limiter.record(None if transfer else time.monotonic() - _start, _error)
+                metrics.set("adaptive_limit", _after, backend=backend)
+
+                if _reason in ("error", "latency"):
+                    metrics.inc("adaptive_decreases_total", backend=backend, reason=_reason)
+
+                if _after != _before:
+                    self.logger.info(self.__log_msg(
+                        f"Concurrent [{backend}] calls limit: [{_before}] ==> [{_after}], reason: [{_reason}]"))
+
+    @contextlib.contextmanager
+    def _error_backend(self, backend):
+        """
+        Context manager attaching the backend to errors raised, for error records
+        :param str backend: backend name
+        """
+        try:
+            yield
+        except Exception as _err:
+            errors.annotate(_err, backend=backend)
+            raise
+
     def _make_dms_api_call_with_retries(self, method, *args, **kwargs):
         """
         Make DMS API call with set amount of retries on error
         :param method: method reference
         :return: result of the method call
         """
+        return self._call_with_retries("dms", method, *args, **kwargs)
+
+    def _call_with_retries(self, backend, method, *args, **kwargs):
+        """
+        Make backend API call with set amount of retries on error, DMS calls are rate limited
+        :param str backend: 'dms' or 'nexus'
+        :param method: method reference
+        :return: result of the method call
+        """
         _attempt = 0
         while True:
             _attempt += 1
@@ -560,14 +1682,85 @@ class DmsMirror:
             else:
                 _method_name = 'Unknown method'
             self.logger.debug(self.__log_msg(f"{_method_name}: attempt [{_attempt}]"))
+            _bucket = self._get_dms_bucket(_method_name) if backend == "dms" else None
+            if _bucket:
+                _bucket.consume(1)
+
             try:
-                return method(*args, **kwargs)
+                with self._backend_call(backend):
+                    return method(*args, **kwargs)
             except self.__errors as _err:
                 if _attempt >= self._args.retries_count:
                     raise
 
                 self.logger.debug(self.__log_msg(repr(_err)), exc_info=True)
-                time.sleep(30)
+                time.sleep(self._get_retry_delay(_err))
+
+    def _get_dms_bucket(self, method_name):
+        """
+        Return DMS API calls rate bucket of the endpoint class of a method, shared by all processes of the host
+        :param str method_name: DMS client method name
+        :return TokenBucket: 'None' if unlimited
+        """
+        _class = self.dms_endpoint_classes.get(method_name, "default")
+
+        if _class not in self._dms_buckets:
+            _rate = self._dms_rates.get(_class, self._dms_rates.get("default"))
+            self._dms_buckets[_class] = TokenBucket(
+                    os.path.join(self._args.throttle_dir, f"dms-{_class}.bucket"), _rate) if _rate else None
+
+        return self._dms_buckets[_class]
+
+    @staticmethod
+    def _parse_dms_rates(rates):
+        """
+        Parse DMS API calls rates given as '<endpoint class>=<calls per second>'
+        :param list rates: strings
+        :return dict: endpoint class => calls per second
+        """
+        _result = dict()
+
+        for _rate in rates or list():
+            _key, _sep, _value = _rate.partition("=")
+
+            try:
+                _result[_key] = float(_value)
+            except ValueError:
+                _sep = None
+
+            if not _sep or not _key or not _result[_key] > 0:
+                raise ValueError(f"Invalid DMS rate [{_rate}], <endpoint class>=<calls per second> expected")
+
+        return _result
+
+    @staticmethod
+    def _get_retry_delay(error):
+        """
+        Return seconds to wait before the next attempt: as 'Retry-After' of a throttled response asks, 30 otherwise
+        :param Exception error:
+        :return float:
+        """
+        _headers = getattr(getattr(error, "resp", None), "headers", None) or dict()
+        _retry_after = str(_headers.get("Retry-After") or "")
+
+        if isinstance(error, HttpAPIError) and error.code == 429 and _retry_after.isdigit():
+            return min(int(_retry_after), 300)
+
+        return 30
+
+    # DMS client methods by endpoint class, each class is rate limited on its own, the rest are 'default'
+    dms_endpoint_classes = {
+        "get_components": "components",
+        "get_versions": "versions",
+        "get_artifacts": "artifacts",
+        "get_artifact_info": "artifacts",
+        "get_gav": "artifacts"}
+
+    # extensions of MVN files accompanying artifacts, not mirrored themselves
+    mvn_auxiliary_extensions = ["md5", "sha1", "sha256", "sha512", "asc"]
+
+    # transfer slots are given to waiters of lower level first
+    priority_levels = {"high": 0, "low": 1}
 
     class DmsEventType(Enum):
         PUBLISH_COMPONENT_VERSION = "PUBLISH_COMPONENT_VERSION"
@@ -659,6 +1852,116 @@ class DmsMirror:
                             help="Enqueue if artifact exists",
                             action="store_true", default=False)
         parser.add_argument("--msg-target", dest="msg_target", help="amqp|db message target", default="amqp", choices=["amqp", "db"])
+        parser.add_argument("--journal-dir", dest="journal_dir", type=str,
+                            help="Directory for progress journal of batch runs, to be resumed after a crash",
+                            default=os.path.join(tempfile.gettempdir(), "oc_dms_mirror", "journal"))
+        parser.add_argument("--listing-prefetch", dest="listing_prefetch", type=int, default=1,
+                            help="Versions to fetch artifacts listings of ahead of processing, 0 to fetch on demand")
+        parser.add_argument("--fail-fast-after", dest="fail_fast_after", type=int, default=0,
+                            help="Stop a batch run after this many components failed, 0 to process all")
+        parser.add_argument("--error-threshold", dest="error_threshold", action="append", default=list(),
+                            help="Stop a batch run once errors counted by <key> reach <count>, as <key>=<count>; "
+                                 "key is 'total', 'retriable', 'permanent', a backend or an exception class name; "
+                                 "may be repeated")
+        parser.add_argument("--resume", dest="resume", action="store_true", default=False,
+                            help="Skip components and versions finished by a batch run interrupted")
+        parser.add_argument("--state-dir", dest="state_dir", type=str,
+                            help="Directory to keep components synchronization state in", default=None)
+        parser.add_argument("--scan-window", dest="scan_window", default="all", choices=["all", "watermark"],
+                            help="Versions to scan: all or not mirrored yet (needs --state-dir)")
+        parser.add_argument("--scan-newest", dest="scan_newest", type=int, default=0,
+                            help="Scan newest N versions of each component only, 0 for all")
+        parser.add_argument("--full-scan-interval", dest="full_scan_interval", type=float, default=0,
+                            help="Hours after which a component is scanned fully regardless of scan window, 0 to disable")
+        parser.add_argument("--shard-index", dest="shard_index", type=int, default=0,
+                            help="Index of components shard to process by this node, from 0")
+        parser.add_argument("--shard-count", dest="shard_count", type=int, default=1,
+                            help="Total amount of shards components are split into")
+        parser.add_argument("--shard-by", dest="shard_by", default="hash", choices=["hash", "weight"],
+                            help="Split components by ID hash or by cost snapshot given in --shard-weights")
+        parser.add_argument("--shard-weights", dest="shard_weights", type=str, default=None,
+                            help="Components costs snapshot for --shard-by weight, the same file for all nodes")
+        parser.add_argument("--save-shard-weights", dest="save_shard_weights", type=str, default=None,
+                            help="Save components costs from --state-dir to this file for --shard-weights and exit")
+        parser.add_argument("--report-file", dest="report_file", type=str, default=None,
+                            help="Path to write run summary to, JSON")
+        parser.add_argument("--lease-backend", dest="lease_backend", default="none", choices=["none", "file"],
+                            help="Lease target GAVs before transferring, so parallel instances do not duplicate work")
+        parser.add_argument("--lease-dir", dest="lease_dir", type=str,
+                            help="Directory for 'file' lease backend",
+                            default=os.path.join(tempfile.gettempdir(), "oc_dms_mirror", "leases"))
+        parser.add_argument("--lease-ttl", dest="lease_ttl", type=float, default=300,
+                            help="Lease time-to-live in seconds, renewed by heartbeat while transfer is in progress")
+        parser.add_argument("--download-rate", dest="download_rate", type=int, default=0,
+                            help="Download bandwidth limit for all processes of the host, bytes/sec, 0 for unlimited")
+        parser.add_argument("--upload-rate", dest="upload_rate", type=int, default=0,
+                            help="Upload bandwidth limit for all processes of the host, bytes/sec, 0 for unlimited")
+        parser.add_argument("--max-downloads", dest="max_downloads", type=int, default=0,
+                            help="Concurrent downloads limit for all processes of the host, 0 for unlimited")
+        parser.add_argument("--max-uploads", dest="max_uploads", type=int, default=0,
+                            help="Concurrent uploads limit for all processes of the host, 0 for unlimited")
+        parser.add_argument("--multipart-threshold", dest="multipart_threshold", type=int, default=0,
+                            help="Download artifacts of this size (bytes) and larger with concurrent range requests, "
+                                 "0 to disable")
+        parser.add_argument("--multipart-parts", dest="multipart_parts", type=int, default=4,
+                            help="Concurrent range requests for each large artifact")
+        parser.add_argument("--throttle-dir", dest="throttle_dir", type=str,
+                            help="Directory for limits state shared between processes",
+                            default=os.path.join(tempfile.gettempdir(), "oc_dms_mirror", "throttle"))
+        parser.add_argument("--http-pool-connections", dest="http_pool_connections", type=int, default=10,
+                            help="Hosts of each backend to keep HTTP connection pools for, in each process")
+        parser.add_argument("--http-pool-maxsize", dest="http_pool_maxsize", type=int, default=10,
+                            help="Kept-alive HTTP connections to each host, in each process; "
+                                 "set not lower than concurrent threads")
+        parser.add_argument("--traffic-record", dest="traffic_record", type=str, default=None,
+                            help="Append metadata of DMS, MVN and PSQL API responses to this file as JSON lines: "
+                                 "method, URL path, status, timing and size; no bodies nor secrets")
+        parser.add_argument("--dms-rate", dest="dms_rate", action="append", default=list(),
+                            help="DMS API calls rate limit for all processes of the host, as "
+                                 "<endpoint class>=<calls per second>; classes are 'components', 'versions', "
+                                 "'artifacts' and 'default' for the rest and unset ones; may be repeated")
+        parser.add_argument("--adaptive-max-calls", dest="adaptive_max_calls", type=int, default=0,
+                            help="Upper limit of concurrent calls to each of DMS and MVN for all processes of the host, "
+                                 "the limit is adapted to backend latency and errors; 0 to disable")
+        parser.add_argument("--adaptive-min-calls", dest="adaptive_min_calls", type=int, default=1,
+                            help="Lower limit of concurrent calls to each of DMS and MVN")
+        parser.add_argument("--priority-aging", dest="priority_aging", type=float, default=60,
+                            help="Seconds of waiting for a transfer slot raising batch (low) priority to webhook "
+                                 "(high) one, 0 to never raise")
+        parser.add_argument("--spool-dir", dest="spool_dir", type=str, default=None,
+                            help="Directory to spool large artifacts in, system temporary directory if not set")
+        parser.add_argument("--spool-memory-threshold", dest="spool_memory_threshold", type=int, default=1024 * 1024,
+                            help="Keep artifacts of this size (bytes) and smaller in memory, 0 to always spool to disk")
+        parser.add_argument("--spool-min-free", dest="spool_min_free", type=int, default=0,
+                            help="Free space (bytes) to keep in --spool-dir, transfers wait until it allows")
+        parser.add_argument("--spool-budget", dest="spool_budget", type=int, default=0,
+                            help="Bytes in flight limit for all processes of the host, 0 for unlimited")
+        parser.add_argument("--spool-unknown-size", dest="spool_unknown_size", type=int, default=0,
+                            help="Bytes to check free space and budget for when artifact size is unknown, "
+                                 "0 for --spool-memory-threshold")
+        parser.add_argument("--spool-admission-timeout", dest="spool_admission_timeout", type=float, default=3600,
+                            help="Seconds to wait for spool free space or budget before failing the transfer")
+        parser.add_argument("--config-reload-interval", dest="config_reload_interval", type=float, default=10,
+                            help="REST service: seconds between configuration files checks for hot reload, 0 to disable")
+        parser.add_argument("--webhook-artifact-workers", dest="webhook_artifact_workers", type=int, default=4,
+                            help="Concurrent artifacts processing for a webhook event")
+        parser.add_argument("--batch-workers", dest="batch_workers", type=int, default=4,
+                            help="REST service: concurrent database requests of batch endpoints")
+        parser.add_argument("--daemon", dest="daemon", action="store_true", default=False,
+                            help="Keep running: poll each component on its own interval, adapted to how often it "
+                                 "publishes, with --dms-processes threads sharing clients and caches")
+        parser.add_argument("--daemon-interval-min", dest="daemon_interval_min", type=float, default=300,
+                            help="Daemon: polling interval of components publishing new versions, seconds")
+        parser.add_argument("--daemon-interval-max", dest="daemon_interval_max", type=float, default=6 * 3600,
+                            help="Daemon: the longest polling interval of quiet components, seconds")
+        parser.add_argument("--metrics-bind", dest="metrics_bind", type=str, default=None,
+                            help="Daemon: <host:port> to serve metrics on, as /metrics of the REST service")
+        parser.add_argument("--plan", dest="plan",
+                            help="Print copies and registrations to be done without transferring anything",
+                            action="store_true", default=False)
+        parser.add_argument("--reconcile", dest="reconcile",
+                            help="Print artifacts missing in MVN, orphaned there and components never mirrored, "
+                                 "comparing inventories in bulk", action="store_true", default=False)
 
         # CITYPE properties
         parser.add_argument("--ci-type-release-notes", dest="ci_type_release_notes",
@@ -675,6 +1978,10 @@ class DmsMirror:
         :param argpares.namespace args: parsed arguments
         """
         self._args = args
+        # malformed values are rejected at start rather than once the run is in progress
+        self._error_thresholds = errors.parse_thresholds(self._args.error_threshold)
+        self._dms_rates = self._parse_dms_rates(self._args.dms_rate)
+        self._dms_buckets = dict()
 
         # adjust file paths to absolute
         self._args.config_file = os.path.abspath(self._args.config_file)
@@ -690,17 +1997,48 @@ class DmsMirror:
             self.logger.info(self.__log_msg(f"{_k.upper()}:\t[{_display_value}]"))
 
 
-    def load_config(self):
+    def read_config(self):
+        """
+        Read and validate components and GAV template configuration files
+        :return tuple: (components, GAV template), GAV template is 'None' if its file does not exist
+        """
         with open(self._args.config_file, mode='rt') as _config:
-            self._components = json.load(_config)
+            _components = json.load(_config)
 
-        if os.path.exists(self._args.gav_template_config_file):
-            with open(self._args.gav_template_config_file, mode='rt') as _config:
-                self._gav_template = json.load(_config)
-        else:
+        if not isinstance(_components, dict) or not all(map(lambda x: isinstance(x, dict), _components.values())):
+            raise ValueError(f"Components configuration is not a dictionary of dictionaries: [{self._args.config_file}]")
+
+        if not os.path.exists(self._args.gav_template_config_file):
             print(f"Gav template config file not found: {self._args.gav_template_config_file}")
-            self._gav_template = None
+            return (_components, None)
 
+        with open(self._args.gav_template_config_file, mode='rt') as _config:
+            _gav_template = json.load(_config)
+
+        if not isinstance(_gav_template, dict) or not isinstance(_gav_template.get("tgtGavTemplate"), dict):
+            raise ValueError(f"GAV template configuration has no 'tgtGavTemplate' dictionary: "
+                             f"[{self._args.gav_template_config_file}]")
+
+        return (_components, _gav_template)
+
+    def load_config(self):
+        self._components, self._gav_template = self.read_config()
+        self._templates = dict()
+        self._gav_index = self._build_gav_index()
+
+    def reloaded(self):
+        """
+        Return a copy with configuration files re-read, for hot reload in REST service
+        Clients are shared with the copy, compiled templates and GAV index are not
+        :return DmsMirror:
+        """
+        _components, _gav_template = self.read_config()
+        _dms_mirror = copy.copy(self)
+        _dms_mirror._components = _components
+        _dms_mirror._gav_template = _gav_template
+        _dms_mirror._templates = dict()
+        _dms_mirror._gav_index = _dms_mirror._build_gav_index()
+        return _dms_mirror
 
     def run(self):
         """
@@ -710,17 +2048,367 @@ class DmsMirror:
 
         self.load_config()
 
-        self.logger.info(self.__log_msg(f"Components to process: {len(self._components)}"))
+        if self._args.save_shard_weights:
+            self.save_shard_weights(self._args.save_shard_weights)
+            return list()
 
-        with multiprocessing.Pool(processes=self._args.dms_processes) as pool:
-            _exceptions = pool.map(self.process_component, self._components)
+        _components = self._select_components()
+        self.summary = {
+                "shard_index": self._args.shard_index,
+                "shard_count": self._args.shard_count,
+                "components": len(_components)}
+
+        self.logger.info(self.__log_msg(
+            f"Components to process: {len(_components)} of {len(self._components)}, "
+            f"shard [{self._args.shard_index}/{self._args.shard_count}]"))
+
+        if self._args.plan:
+            return self.run_plan(_components)
+
+        if self._args.reconcile:
+            # differences of groups shared by components of different shards would be misreported
+            return self.run_reconcile(list(self._components))
 
-        _components_count = len(_exceptions)
-        _exceptions = list(filter(lambda x: bool(x), _exceptions))
+        if self._args.daemon:
+            # a requested stop is a normal exit: errors of the last polls are reported, not raised
+            _records = self.run_daemon(_components)
+            self.summary["errors"] = len(_records)
+            self.summary["error_counts"] = errors.count_records(_records)
+            self.summary["error_records"] = _records
+
+            for _record in _records:
+                self.logger.warning(self.__log_msg(f"Failed by the last poll: {_record['message']}"))
+
+            return list()
+
+        # a journal per shard, so shards running on the same node do not clear progress of each other
+        self._journal = Journal(os.path.join(
+            self._args.journal_dir, f"{self._args.shard_index or 0}-{self._args.shard_count or 1}"))
+
+        if self._args.resume:
+            self.logger.info(self.__log_msg(f"Resuming from journal: [{self._journal.directory}]"))
+        else:
+            self._journal.clear()
+
+        with multiprocessing.Pool(processes=self._args.dms_processes) as pool:
+            _records, _components_count, _stopped_by = self._collect_results(
+                pool.imap_unordered(self.process_component_result, _components), len(_components))
+
+        self.summary["errors"] = len(_records)
+        self.summary["error_counts"] = errors.count_records(_records)
+        self.summary["error_records"] = _records
+        _exceptions = list(map(lambda x: x["message"], _records))
+
+        if _stopped_by:
+            # stopped early: journal is kept to resume
+            self._journal = None
+            self.summary["stopped"] = _stopped_by
+            _exceptions.append(self.__log_msg(
+                f"Stopped after [{len(_records)}] errors by threshold [{_stopped_by}], "
+                f"[{_components_count}] of [{len(_components)}] components processed"))
+            return _exceptions
+
+        # the run is over: the next one starts from scratch, even with --resume
+        self._journal.clear()
+        self._journal = None
 
         self.logger.info(self.__log_msg(f"All [{_components_count}] components processed. Errors: [{len(_exceptions)}]"))
         return _exceptions
 
+    def process_component_result(self, component):
+        """
+        Process component and return the result with the component ID and processing time, for results streamed
+        To be called in separate process
+        :param str component: DMS component ID
+        :return tuple: (component, error record or 'None', seconds elapsed)
+        """
+        _start_time = time.time()
+        _error = self.process_component(component)
+        return (component, _error, time.time() - _start_time)
+
+    def _collect_results(self, results, total):
+        """
+        Log progress and errors as components are processed, stop once an abort threshold is reached:
+        --fail-fast-after errors in total or any of --error-threshold
+        :param results: iterable of 'process_component_result' results, in order of completion
+        :param int total: components count
+        :return tuple: (error records, components processed, threshold stopped by or 'None')
+        """
+        _thresholds = dict(self._error_thresholds)
+        if self._args.fail_fast_after:
+            _thresholds.setdefault("total", self._args.fail_fast_after)
+
+        _records = list()
+        _done = 0
+        _start_time = time.time()
+
+        for _component, _error, _elapsed in results:
+            _done += 1
+            _eta = (time.time() - _start_time) / _done * (total - _done)
+
+            if _error:
+                _records.append(_error)
+
+            self.logger.info(self.__log_msg(
+                f"[{_done}/{total}] [{_component}] {'failed' if _error else 'done'} in [{_elapsed:.1f}] seconds, "
+                f"errors: [{len(_records)}], ETA: [{_eta:.0f}] seconds"))
+
+            _exceeded = _error and errors.exceeded_threshold(errors.count_records(_records), _thresholds)
+            if _exceeded:
+                self.logger.error(self.__log_msg(f"Errors threshold [{_exceeded}] reached, stopping"))
+                return (_records, _done, _exceeded)
+
+        return (_records, _done, None)
+
+    def _next_interval(self, component, interval, known_versions):
+        """
+        Adapt polling interval of a component to how often it publishes:
+        reset to the minimum when new versions appeared, doubled up to the maximum otherwise
+        :param str component: DMS component ID
+        :param float interval: current interval, seconds
+        :param set known_versions: versions seen before the last processing, 'None' if never processed
+        :return float: next interval, seconds
+        """
+        _versions = self._known_versions.get(component)
+        if known_versions is None or _versions is None:
+            return interval
+
+        if _versions - known_versions:
+            self.logger.info(self.__log_msg(f"[{component}]: new versions: {sorted(_versions - known_versions)}"))
+            return self._args.daemon_interval_min
+
+        return min(interval * 2, self._args.daemon_interval_max)
+
+    def run_daemon(self, components, stop=None):
+        """
+        Keep processing components, each on its own interval, with warm clients and caches
+        Components are processed by --dms-processes threads instead of processes
+        :param list components: DMS component IDs
+        :param threading.Event stop: set to finish, SIGTERM and SIGINT set it too if running in the main thread
+        :return list: error records of the last processing of failed components
+        """
+        stop = stop or threading.Event()
+        _handlers = dict()
+        if threading.current_thread() is threading.main_thread():
+            for _signal in [signal.SIGTERM, signal.SIGINT]:
+                _handlers[_signal] = signal.signal(_signal, lambda *args: stop.set())
+
+        _server = serve_metrics(self._args.metrics_bind) if self._args.metrics_bind else None
+        _intervals = dict.fromkeys(components, self._args.daemon_interval_min)
+        _schedule = list(map(lambda x: (time.time(), x), components))
+        heapq.heapify(_schedule)
+        _running = dict()
+        _errors = dict()
+        metrics.set("daemon_components", len(components))
+        self.logger.info(self.__log_msg(f"Daemon started: [{len(components)}] components"))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self._args.dms_processes) as _executor:
+                while not stop.is_set() or _running:
+                    while not stop.is_set() and _schedule and _schedule[0][0] <= time.time() \
+                            and len(_running) < self._args.dms_processes:
+                        _, _component = heapq.heappop(_schedule)
+                        _known = self._known_versions.get(_component)
+                        _running[_executor.submit(self.process_component, _component)] = (_component, _known)
+
+                    # wake up when a component is done, the next one is due or at least every second to check stop
+                    _timeout = 1
+                    if _schedule and len(_running) < self._args.dms_processes:
+                        _timeout = max(0, min(1, _schedule[0][0] - time.time()))
+
+                    _done = set()
+                    if _running:
+                        _done, _ = wait(list(_running), timeout=_timeout, return_when=FIRST_COMPLETED)
+                    else:
+                        stop.wait(_timeout)
+
+                    for _future in _done:
+                        _component, _known = _running.pop(_future)
+                        _errors[_component] = _future.result()
+
+                        # a failed component is retried on the same interval
+                        if not _errors[_component]:
+                            _intervals[_component] = self._next_interval(_component, _intervals[_component], _known)
+
+                        metrics.set("component_poll_interval_seconds", _intervals[_component], component=_component)
+                        metrics.set("daemon_failed_components", len(list(filter(None, _errors.values()))))
+                        heapq.heappush(_schedule, (time.time() + _intervals[_component], _component))
+        finally:
+            if _server:
+                _server.shutdown()
+
+            for _signal, _handler in _handlers.items():
+                signal.signal(_signal, _handler)
+
+        self.logger.info(self.__log_msg("Daemon stopped"))
+        return list(filter(None, _errors.values()))
+
+    def _select_components(self):
+        """
+        Return components of the shard given in arguments, all components if sharding is not configured
+        Shards never overlap: by-hash partitioning depends on component IDs only,
+        by-weight one on the same --shard-weights snapshot given to all nodes, never changed by runs
+        :return list: DMS component IDs
+        """
+        _count = self._args.shard_count or 1
+        _index = self._args.shard_index or 0
+
+        if _count <= 1:
+            return list(self._components)
+
+        if not 0 <= _index < _count:
+            raise ValueError(f"Shard index [{_index}] is out of range for [{_count}] shards")
+
+        if self._args.shard_by != "weight":
+            return list(filter(
+                lambda x: int(hashlib.md5(x.encode("utf-8")).hexdigest(), 16) % _count == _index, self._components))
+
+        if not self._args.shard_weights:
+            raise ValueError("Sharding by weight needs --shard-weights, see --save-shard-weights")
+
+        with open(self._args.shard_weights, mode='rt') as _weights:
+            _weights = json.load(_weights)
+
+        # greedy partitioning: the heaviest component goes to the least loaded shard
+        _costs = dict(map(lambda x: (x, _weights.get(x)), self._components))
+        _known = list(filter(lambda x: x is not None, _costs.values()))
+        _default = sum(_known) / len(_known) if _known else 1
+        _loads = [0] * _count
+        _shards = list(map(lambda x: list(), range(_count)))
+
+        for _component in sorted(self._components, key=lambda x: (-(_costs[x] or _default), x)):
+            _shard = _loads.index(min(_loads))
+            _loads[_shard] += _costs[_component] or _default
+            _shards[_shard].append(_component)
+
+        self.logger.info(self.__log_msg(f"Shard loads by cost: {_loads}"))
+        return list(filter(lambda x: x in _shards[_index], self._components))
+
+    def save_shard_weights(self, path):
+        """
+        Save costs of components from --state-dir as a snapshot for --shard-by weight, atomically
+        Costs are rewritten by runs, so all nodes of a run have to partition by the same snapshot
+        :param str path: JSON file to write component ID => cost to
+        :return dict: costs saved
+        """
+        _costs = dict()
+
+        for _component in self._components:
+            _cost = self.load_component_state(_component).get("cost")
+            if _cost is not None:
+                _costs[_component] = _cost
+
+        _fd, _tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".shard-weights.")
+
+        with os.fdopen(_fd, mode='wt') as _weights:
+            json.dump(_costs, _weights, indent=4, sort_keys=True)
+
+        os.replace(_tmp_path, path)
+        self.logger.info(self.__log_msg(f"Costs of [{len(_costs)}] of [{len(self._components)}] components saved: [{path}]"))
+        return _costs
+
+    def run_plan(self, components):
+        """
+        Compute the mirroring plan for components given and print it as JSON lines
+        :param list components: DMS component IDs
+        :return list: error messages
+        """
+        with multiprocessing.Pool(processes=self._args.dms_processes) as pool:
+            _plans = pool.map(self.plan_component, components)
+
+        _copies = 0
+        _registrations = 0
+
+        for _plan in _plans:
+            for _action in _plan["actions"]:
+                print(json.dumps(_action))
+
+            _copies += len(list(filter(lambda x: x["action"] == "copy", _plan["actions"])))
+            _registrations += len(list(filter(lambda x: x["action"] == "register", _plan["actions"])))
+
+        _exceptions = list(filter(lambda x: bool(x), map(lambda x: x["error"], _plans)))
+        self.summary.update({"errors": len(_exceptions), "copies": _copies, "registrations": _registrations})
+        self.logger.info(self.__log_msg(
+            f"Plan for [{len(_plans)}] components: copies [{_copies}], registrations [{_registrations}]. "
+            f"Errors: [{len(_exceptions)}]"))
+        return _exceptions
+
+    def run_reconcile(self, components):
+        """
+        Compare DMS inventory to MVN one and print differences as JSON lines:
+        'missing' - target GAV expected but not found in MVN,
+        'orphaned' - artifact found in MVN in a group mirrored, but not expected for any DMS artifact,
+        'unregistered' - component of DMS catalog not configured nor registered in database, never mirrored
+        Expected GAVs are collected by pool processes, MVN groups are listed concurrently with --batch-workers threads
+        :param list components: configured DMS component IDs
+        :return list: error messages
+        """
+        _inventory = list(map(lambda x: (x, self._components[x]), components))
+        _unregistered = list()
+        _exceptions = list()
+
+        _catalog = self._make_dms_api_call_with_retries(self.dms_client.get_components) or list()
+        _others = list(filter(lambda x: x not in self._components, map(lambda x: x["id"], _catalog)))
+
+        for _component, _params, _error in self.get_components_config(_others):
+            if _error:
+                _exceptions.append(_error)
+            elif _params:
+                _inventory.append((_component, _params))
+            else:
+                _unregistered.append(_component)
+
+        with multiprocessing.Pool(processes=self._args.dms_processes) as pool:
+            _results = pool.starmap(self.inventory_component, _inventory)
+
+        # expected target GAV => (component, version, artifact type), strings are interned to keep it compact
+        _expected = dict()
+        for _result in _results:
+            _component = sys.intern(_result["component"])
+            if _result["error"]:
+                _exceptions.append(_result["error"])
+
+            for _gav, _version, _artifact_type in _result["targets"]:
+                _expected[sys.intern(_gav)] = (_component, sys.intern(_version), sys.intern(_artifact_type))
+
+        _groups = sorted(set(map(lambda x: x.split(":", 1)[0], _expected)))
+        self.logger.info(self.__log_msg(f"Expected GAVs: [{len(_expected)}], listing MVN groups: [{len(_groups)}]"))
+        _present = set()
+        _listed = set()
+
+        with ThreadPoolExecutor(max_workers=self._args.batch_workers) as _executor:
+            for _group, _future in list(map(lambda x: (x, _executor.submit(self.list_mvn_group, x)), _groups)):
+                try:
+                    _present.update(_future.result())
+                    _listed.add(_group)
+                except Exception as _e:
+                    _exceptions.append(self.__log_msg(f"[{_group}]: {repr(_e)}"))
+                    self.logger.error(_exceptions[-1], exc_info=True)
+
+        # differences are not reported for groups failed to list
+        _missing = sorted(filter(lambda x: x.split(":", 1)[0] in _listed, _expected.keys() - _present))
+        _orphaned = sorted(_present - _expected.keys())
+
+        for _gav in _missing:
+            _component, _version, _artifact_type = _expected[_gav]
+            print(json.dumps({"status": "missing", "gav": _gav, "component": _component, "version": _version,
+                              "artifact_type": _artifact_type}))
+
+        for _gav in _orphaned:
+            _matches = self.find_component_by_gav(_gav)
+            print(json.dumps({"status": "orphaned", "gav": _gav,
+                              "component": _matches[0]["component"] if _matches else None}))
+
+        for _component in _unregistered:
+            print(json.dumps({"status": "unregistered", "component": _component}))
+
+        self.summary.update({"errors": len(_exceptions), "missing": len(_missing), "orphaned": len(_orphaned),
+                             "unregistered": len(_unregistered)})
+        self.logger.info(self.__log_msg(
+            f"Reconciled [{len(_inventory)}] components: missing [{len(_missing)}], orphaned [{len(_orphaned)}], "
+            f"unregistered [{len(_unregistered)}]. Errors: [{len(_exceptions)}]"))
+        return _exceptions
+
     def main(self):
         _parser = self.basic_args()
         _args = _parser.parse_args()
@@ -736,6 +2424,12 @@ class DmsMirror:
 
         __elapsed = time.time() - __start_time
         self.logger.info(self.__log_msg(f"Finished. Elapsed time: {__elapsed}"))
+        self.summary["elapsed"] = __elapsed
+        self.logger.info(self.__log_msg(f"Summary: {json.dumps(self.summary)}"))
+
+        if self._args.report_file:
+            with open(self._args.report_file, mode='wt') as _report:
+                json.dump(self.summary, _report)
 
         if _exceptions:
             # log ALL exceptions
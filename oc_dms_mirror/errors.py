@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+from oc_cdtapi.API import HttpAPIError
+
+from .lease import LeaseHeld, LeaseLost
+from .transfer import transfer_errors
+
+# errors worth retrying later: backend unavailable, overloaded, connection or lease lost; the rest need a fix
+retriable_errors = transfer_errors + (TimeoutError, ConnectionError, LeaseHeld, LeaseLost)
+
+
+def annotate(error, **context):
+    """
+    Attach context to an exception being raised: the innermost context set is kept
+    Exceptions are not returned from pool processes, so context is never pickled
+    :param Exception error:
+    :param context: 'backend', 'version', 'artifact'
+    """
+    _context = getattr(error, "dms_mirror_context", None) or dict()
+
+    for _key, _value in context.items():
+        _context.setdefault(_key, _value)
+
+    error.dms_mirror_context = _context
+
+
+def is_retriable(error):
+    """
+    Check if an error is transient
+    :param Exception error:
+    :return bool:
+    """
+    if isinstance(error, HttpAPIError):
+        return error.code == 429 or (isinstance(error.code, int) and error.code >= 500)
+
+    return isinstance(error, retriable_errors)
+
+
+def make_record(error, component, message):
+    """
+    Return structured record of an error, to be returned from pool processes and aggregated
+    :param Exception error:
+    :param str component: DMS component ID
+    :param str message: human-readable message
+    :return dict: 'class', 'backend', 'component', 'version', 'artifact', 'retriable' and 'message'
+    """
+    _context = getattr(error, "dms_mirror_context", None) or dict()
+    return {
+        "class": type(error).__name__,
+        "backend": _context.get("backend"),
+        "component": component,
+        "version": _context.get("version"),
+        "artifact": _context.get("artifact"),
+        "retriable": is_retriable(error),
+        "message": message}
+
+
+def count_records(records):
+    """
+    Aggregate error records into counts
+    :param list records: error records
+    :return dict: 'total', 'retriable', 'permanent' counts and counts 'by_class' and 'by_backend'
+    """
+    _counts = {"total": len(records), "retriable": 0, "permanent": 0, "by_class": dict(), "by_backend": dict()}
+
+    for _record in records:
+        _counts["retriable" if _record["retriable"] else "permanent"] += 1
+        _counts["by_class"][_record["class"]] = _counts["by_class"].get(_record["class"], 0) + 1
+        _backend = _record["backend"] or "none"
+        _counts["by_backend"][_backend] = _counts["by_backend"].get(_backend, 0) + 1
+
+    return _counts
+
+
+def parse_thresholds(thresholds):
+    """
+    Parse abort thresholds given as '<key>=<count>'
+    :param list thresholds: strings, key is 'total', 'retriable', 'permanent', a backend or an exception class name
+    :return dict: key => count
+    """
+    _result = dict()
+
+    for _threshold in thresholds or list():
+        _key, _sep, _count = _threshold.partition("=")
+
+        if not _sep or not _key or not _count.isdigit() or not int(_count):
+            raise ValueError(f"Invalid error threshold [{_threshold}], <key>=<count> expected")
+
+        _result[_key] = int(_count)
+
+    return _result
+
+
+def exceeded_threshold(counts, thresholds):
+    """
+    Find the first abort threshold reached
+    :param dict counts: result of 'count_records'
+    :param dict thresholds: result of 'parse_thresholds'
+    :return str: threshold reached as '<key>=<count>', 'None' if none
+    """
+    for _key, _limit in thresholds.items():
+        _count = counts.get(_key) if _key in ("total", "retriable", "permanent") else \
+            counts["by_backend"].get(_key, 0) + counts["by_class"].get(_key, 0)
+
+        if _count >= _limit:
+            return f"{_key}={_limit}"
+
+    return None
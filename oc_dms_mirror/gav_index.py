@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import re
+from string import Template
+
+# expressions for placeholders of target GAV templates, see 'DmsMirror._make_gav_substitute'
+placeholders = {
+    "at": r"[^:]+",
+    "n": r"[^:]*",
+    "v": r"[^:]+",
+    "p": r"[^:]*",
+    "c": r"[^:]*",
+    "cl": r"[^:]*",
+    "c_hyphen": r"(?:-[^:]+)?",
+    "c_colon": r"(?::[^:]+)?"}
+
+# expressions for generic GAV template placeholders, substituted by 'DmsMirror._generate_component_config'
+generic_placeholders = {
+    "component": r"(?P<ci_type>[^:]+?)",
+    "client_dot": r"(?:\.[^.:]+)?"}
+
+
+def compile_template(template, prefix, fields=None):
+    """
+    Split GAV template into its literal beginning and regular expression matching GAVs it produces
+    :param str template: GAV template as configured, backslashes are dropped
+    :param str prefix: MVN prefix, substituted literally
+    :param dict fields: extra placeholders expressions
+    :return tuple: (literal prefix, compiled regular expression)
+    """
+    _template = template.replace("\\", "")
+    _fields = dict(placeholders, **(fields or dict()))
+    _literal = ""
+    _pattern = ""
+    _is_literal = True
+    _position = 0
+
+    for _match in Template.pattern.finditer(_template):
+        _text = _template[_position:_match.start()]
+        _position = _match.end()
+        _name = _match.group("named") or _match.group("braced")
+
+        if _match.group("escaped") is not None:
+            _text += "$"
+        elif _name == "prefix":
+            _text += prefix
+        elif _name is None:
+            raise ValueError(f"Invalid placeholder in GAV template [{template}]")
+
+        _pattern += re.escape(_text)
+
+        if _is_literal:
+            _literal += _text
+
+        if _name and _name != "prefix":
+            _pattern += _fields.get(_name, r"[^:]*")
+            _is_literal = False
+
+    _text = _template[_position:]
+    _pattern += re.escape(_text)
+
+    if _is_literal:
+        _literal += _text
+
+    return (_literal, re.compile(_pattern))
+
+
+class GavIndex:
+    """
+    Reverse index from target GAV to component, artifact type and ci_type
+    Templates are kept in a trie by their literal beginnings, so a lookup matches only templates the GAV starts with;
+    templates starting with a placeholder and the generic GAV template are matched as regular expressions fallback
+    Plain data only: the index is pickled with 'DmsMirror' to batch pool workers
+    """
+    def __init__(self, prefix, static_ci_types=None):
+        """
+        :param str prefix: MVN prefix
+        :param dict static_ci_types: artifact type => ci_type set regardless of component parameters
+        """
+        self.prefix = prefix
+        self.static_ci_types = static_ci_types or dict()
+        self._trie = dict()
+        self._fallback = list()
+
+    def _get_ci_type(self, artifact_type, params):
+        """
+        Return ci_type of an artifact type of a component
+        :param str artifact_type: DMS artifact type
+        :param dict params: component parameters from configuration
+        :return str:
+        """
+        return self.static_ci_types.get(artifact_type) or params.get("ci_type")
+
+    def _add(self, literal, entry):
+        """
+        Put an entry to the trie node of its literal beginning
+        :param str literal: literal beginning
+        :param tuple entry: (regular expression, component, artifact type, ci_type)
+        """
+        if not literal:
+            self._fallback.append(entry)
+            return
+
+        _node = self._trie
+        for _char in literal:
+            _node = _node.setdefault(_char, dict())
+
+        _node.setdefault(None, list()).append(entry)
+
+    def add_component(self, component, params):
+        """
+        Index target GAV templates of a component
+        :param str component: DMS component ID
+        :param dict params: component parameters from configuration
+        """
+        for _artifact_type, _template in (params.get("tgtGavTemplate") or dict()).items():
+            if not _template:
+                continue
+
+            _literal, _regexp = compile_template(_template, self.prefix)
+            self._add(_literal, (_regexp, component, _artifact_type, self._get_ci_type(_artifact_type, params)))
+
+    def add_generic(self, gav_template):
+        """
+        Index generic GAV template used for components registered in database only
+        DMS component ID can not be learned from GAV, ci_type is taken from the '$component' part
+        :param dict gav_template: generic GAV template configuration
+        """
+        for _artifact_type, _template in (gav_template.get("tgtGavTemplate") or dict()).items():
+            if not _template:
+                continue
+
+            _template = _template.replace(".$client", "${client_dot}").replace("$component", "${component}")
+            _literal, _regexp = compile_template(_template, self.prefix, generic_placeholders)
+            _ci_type = self._get_ci_type(_artifact_type, dict())
+            self._fallback.append((_regexp, None, _artifact_type, _ci_type))
+
+    def find(self, gav):
+        """
+        Find components producing the GAV given
+        :param str gav: target GAV
+        :return list: dictionaries with 'component', 'artifact_type' and 'ci_type',
+                      templates with longer literal beginnings go first
+        """
+        _candidates = list()
+        _node = self._trie
+
+        for _char in gav:
+            _node = _node.get(_char)
+            if _node is None:
+                break
+
+            _candidates.extend(_node.get(None, list()))
+
+        _result = list()
+        for _regexp, _component, _artifact_type, _ci_type in reversed(_candidates):
+            if _regexp.fullmatch(gav):
+                _result.append({"component": _component, "artifact_type": _artifact_type, "ci_type": _ci_type})
+
+        for _regexp, _component, _artifact_type, _ci_type in self._fallback:
+            _match = _regexp.fullmatch(gav)
+            if not _match:
+                continue
+
+            _groups = _match.groupdict()
+            _result.append({"component": _component, "artifact_type": _artifact_type,
+                            "ci_type": _ci_type or _groups.get("ci_type")})
+
+        return _result
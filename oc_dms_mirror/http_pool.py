@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .metrics import metrics
+
+
+class _CountingPool:
+    """
+    Connection pool mixin counting connections taken: new ones (TCP and TLS handshakes to be made) and reused ones
+    """
+    backend = None
+
+    def _get_conn(self, timeout=None):
+        _conn = super()._get_conn(timeout=timeout)
+        # a kept-alive connection is still connected, a new or dropped one is connected on request
+        _state = "new" if getattr(_conn, "sock", None) is None else "reused"
+        metrics.inc("http_connections_total", backend=self.backend, state=_state)
+        return _conn
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    Transport adapter with keep-alive connection pools shared by all client sessions of a backend in the process
+    Pools inherited from parent process are dropped on the first request in a child, so sockets are never shared
+    """
+    __attrs__ = HTTPAdapter.__attrs__ + ["backend"]
+
+    def __init__(self, backend, **kwargs):
+        """
+        :param str backend: backend name for statistics
+        :param kwargs: 'requests.adapters.HTTPAdapter' arguments: pool sizes and retries
+        """
+        self.backend = backend
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._pid = os.getpid()
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("HTTPConnectionPool", (_CountingPool, HTTPConnectionPool), {"backend": self.backend}),
+            "https": type("HTTPSConnectionPool", (_CountingPool, HTTPSConnectionPool), {"backend": self.backend})}
+
+    def send(self, request, **kwargs):
+        if self._pid != os.getpid():
+            # forked: connections are shared with the parent, not closed here to keep them usable there
+            self.init_poolmanager(self._pool_connections, self._pool_maxsize, block=self._pool_block)
+
+        return super().send(request, **kwargs)
+
+
+# adapters of the process by backend, dropped in forked children
+_adapters = dict()
+_adapters_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _adapters_lock
+    _adapters.clear()
+    _adapters_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_adapter(backend, pool_connections=10, pool_maxsize=10, max_retries=0):
+    """
+    Return transport adapter shared by all sessions of a backend in the process, created on the first call
+    :param str backend: backend name
+    :param int pool_connections: hosts to keep pools for
+    :param int pool_maxsize: kept-alive connections for each host
+    :param max_retries: 'urllib3.Retry' or attempts count
+    :return PooledAdapter:
+    """
+    with _adapters_lock:
+        if backend not in _adapters:
+            _adapters[backend] = PooledAdapter(backend, pool_connections=pool_connections,
+                                               pool_maxsize=pool_maxsize, max_retries=max_retries)
+
+        return _adapters[backend]
+
+
+def mount(session, backend, pool_connections=10, pool_maxsize=10):
+    """
+    Mount shared adapter of a backend on a client session, retries of the adapter mounted before are kept
+    :param requests.Session session: client session
+    :param str backend: backend name
+    :param int pool_connections: hosts to keep pools for
+    :param int pool_maxsize: kept-alive connections for each host
+    :return requests.Session: the same session
+    """
+    _adapter = get_adapter(backend, pool_connections, pool_maxsize, session.get_adapter("https://").max_retries)
+    session.mount("https://", _adapter)
+    session.mount("http://", _adapter)
+    return session
+
+
+def stats(backend):
+    """
+    Return connections statistics of a backend in the process
+    :param str backend: backend name
+    :return dict: 'new' and 'reused' connections counts
+    """
+    return dict((_state, metrics.get("http_connections_total", backend=backend, state=_state))
+                for _state in ("new", "reused"))
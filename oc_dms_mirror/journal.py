@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+
+
+class Journal:
+    """
+    Progress journal of a batch run, to resume it after a crash
+    A file per component, each is written by a single process: a JSON line per version finished
+    and the last one when the component is finished; lines are synced to disk once written
+    """
+    def __init__(self, directory):
+        """
+        :param str directory: journal directory
+        """
+        self.directory = directory
+
+    def _get_path(self, component):
+        return os.path.join(self.directory, f"{component}.journal")
+
+    def _append(self, component, record):
+        """
+        Append a record and sync it to disk
+        :param str component: DMS component ID
+        :param dict record: record to append
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(self._get_path(component), mode='at') as _journal:
+            _journal.write(json.dumps(record) + '\n')
+            _journal.flush()
+            os.fsync(_journal.fileno())
+
+    def load(self, component):
+        """
+        Return progress of a component
+        :param str component: DMS component ID
+        :return tuple: (set of versions finished, whether the component is finished)
+        """
+        _versions = set()
+        _done = False
+
+        if not os.path.exists(self._get_path(component)):
+            return (_versions, _done)
+
+        with open(self._get_path(component), mode='rt') as _journal:
+            for _line in _journal:
+                try:
+                    _record = json.loads(_line)
+                except ValueError:
+                    # the last line may be torn by a crash
+                    continue
+
+                if "version" in _record:
+                    _versions.add(_record["version"])
+
+                _done = _done or bool(_record.get("done"))
+
+        return (_versions, _done)
+
+    def version_done(self, component, version):
+        """
+        Record a version finished
+        :param str component: DMS component ID
+        :param str version: component version
+        """
+        self._append(component, {"version": version})
+
+    def component_done(self, component):
+        """
+        Record a component finished
+        :param str component: DMS component ID
+        """
+        self._append(component, {"done": True})
+
+    def clear(self):
+        """
+        Drop all records, to start the next run from scratch
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+import structlog
+
+
+class LeaseHeld(Exception):
+    """
+    Target is leased by another instance, work on it is to be retried later
+    """
+    pass
+
+
+class LeaseLost(Exception):
+    """
+    Lease expired and taken over by another instance while work under it was in progress
+    """
+    pass
+
+
+class FileLeaseBackend:
+    """
+    Leases stored as files in a local directory, for single-host setups
+    """
+    def __init__(self, directory):
+        """
+        :param str directory: directory to keep lease files in
+        """
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        """
+        Return lease file path: keys are GAVs and component IDs, so hash them to get a safe file name
+        :param str key: lease key
+        :return str:
+        """
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".lease")
+
+    def _open_locked(self, path):
+        """
+        Open a lease file and lock it exclusively, retrying if it was removed while waiting for the lock
+        :param str path: lease file path
+        :return int: file descriptor
+        """
+        while True:
+            _fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(_fd, fcntl.LOCK_EX)
+
+            try:
+                # removed by the previous holder: a new file is to be locked instead of the orphaned inode
+                if os.stat(path).st_ino == os.fstat(_fd).st_ino:
+                    return _fd
+            except FileNotFoundError:
+                pass
+
+            os.close(_fd)
+
+    def _update(self, path, update):
+        """
+        Read and update lease record under exclusive file lock
+        A file left with no record is removed, so files of released and expired leases do not pile up
+        :param str path: lease file path
+        :param update: function getting current record (or 'None') and returning a new one
+            ('None' to keep, empty to drop)
+        :return: the record written, 'None' if nothing changed
+        """
+        _fd = self._open_locked(path)
+        try:
+            _content = os.read(_fd, 4096)
+            _record = json.loads(_content) if _content else None
+            _new_record = update(_record)
+
+            if _new_record is None and _record:
+                return None
+
+            if not _new_record:
+                # removed while locked: waiters notice it and lock a new file
+                os.unlink(path)
+                return None
+
+            _data = json.dumps(_new_record).encode("utf-8")
+            os.lseek(_fd, 0, os.SEEK_SET)
+            os.ftruncate(_fd, 0)
+            os.write(_fd, _data)
+            return _new_record
+        finally:
+            os.close(_fd)
+
+    def collect(self):
+        """
+        Remove files of leases expired, i.e. of instances crashed while holding them
+        :return int: lease files removed
+        """
+        _removed = 0
+
+        for _name in os.listdir(self.directory):
+            if not _name.endswith(".lease"):
+                continue
+
+            def _collect(record):
+                nonlocal _removed
+                if record and record["expires"] > time.time():
+                    return None
+
+                _removed += 1
+                return dict()
+
+            self._update(os.path.join(self.directory, _name), _collect)
+
+        return _removed
+
+    def acquire(self, key, owner, ttl):
+        """
+        Take the lease if it is free, expired or held by the same owner
+        :param str key: lease key
+        :param str owner: lease owner
+        :param float ttl: lease time-to-live, seconds
+        :return bool: whether the lease was taken
+        """
+        def _acquire(record):
+            if record and record["owner"] != owner and record["expires"] > time.time():
+                return None
+
+            return {"key": key, "owner": owner, "expires": time.time() + ttl}
+
+        return self._update(self._path(key), _acquire) is not None
+
+    def renew(self, key, owner, ttl):
+        """
+        Prolong the lease held by the owner
+        :param str key: lease key
+        :param str owner: lease owner
+        :param float ttl: lease time-to-live, seconds
+        :return bool: 'False' if the lease was lost
+        """
+        def _renew(record):
+            if not record or record["owner"] != owner:
+                return None
+
+            return dict(record, expires=time.time() + ttl)
+
+        return self._update(self._path(key), _renew) is not None
+
+    def release(self, key, owner):
+        """
+        Release the lease if held by the owner
+        :param str key: lease key
+        :param str owner: lease owner
+        """
+        self._update(self._path(key), lambda record: dict() if record and record["owner"] == owner else None)
+
+
+class Lease:
+    """
+    A lease on a key, renewed by a heartbeat thread while held
+    """
+    def __init__(self, backend, key, ttl):
+        """
+        :param FileLeaseBackend backend: lease storage
+        :param str key: lease key, i.e. DMS component ID or target GAV
+        :param float ttl: lease time-to-live, seconds; heartbeat renews it every third of it
+        """
+        self.backend = backend
+        self.key = key
+        self.ttl = ttl
+        self.owner = ':'.join([socket.gethostname(), str(os.getpid()), uuid.uuid4().hex])
+        self.lost = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self.logger = structlog.get_logger()
+
+    def acquire(self):
+        """
+        Take the lease and start heartbeat
+        :return bool: whether the lease was taken
+        """
+        if not self.backend.acquire(self.key, self.owner, self.ttl):
+            return False
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew(self):
+        """
+        Heartbeat: renew the lease until stopped
+        """
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if self.backend.renew(self.key, self.owner, self.ttl):
+                    continue
+            except Exception as _e:
+                self.logger.warning(f"Lease [{self.key}] renewal failed: {repr(_e)}")
+                continue
+
+            self.logger.warning(f"Lease [{self.key}] lost by [{self.owner}]")
+            self.lost = True
+            return
+
+    def check(self):
+        """
+        Make sure the lease is still held and prolong it, before making changes visible to others
+        :raises LeaseLost: if the lease was taken over
+        """
+        if self.lost or not self.backend.renew(self.key, self.owner, self.ttl):
+            self.lost = True
+            raise LeaseLost(f"Lease [{self.key}] lost by [{self.owner}]")
+
+    def release(self):
+        """
+        Stop heartbeat and release the lease
+        """
+        self._stop.set()
+
+        if self._heartbeat:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+        self.backend.release(self.key, self.owner)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        if self._heartbeat:
+            self.release()
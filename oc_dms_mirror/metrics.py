@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Metrics:
+    """
+    Counters and gauges of the process, rendered in Prometheus text format
+    Names ending with '_total' are counters, others are gauges
+    Processes sharing a directory (i.e. gunicorn workers) render values of all of them:
+    counters are summed, the greatest gauge is taken
+    """
+    def __init__(self, prefix="dms_mirror"):
+        """
+        :param str prefix: metric names prefix
+        """
+        self.prefix = prefix
+        self.directory = None
+        self.interval = 1
+        self._values = dict()
+        self._lock = threading.Lock()
+        self._writer_pid = None
+
+    def share(self, directory, interval=1):
+        """
+        Share values with other processes: written to the directory by a background thread of each process
+        Files of processes exited are kept, so counters never go down
+        :param str directory: directory shared by the processes, cleared by their parent before they start
+        :param float interval: seconds between writes
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self._start_writer()
+
+    def _start_writer(self):
+        """
+        Start writing values in background, once in each process: threads are not inherited by forked children
+        """
+        if not self.directory or self._writer_pid == os.getpid():
+            return
+
+        self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_forever, args=(self._writer_pid,), daemon=True).start()
+
+    def _write_forever(self, pid):
+        _written = None
+
+        while self._writer_pid == pid:
+            with self._lock:
+                _values = list(map(lambda x: [x[0][0], x[0][1], x[1]], self._values.items()))
+
+            if _values != _written:
+                try:
+                    self.write()
+                    _written = _values
+                except OSError:
+                    # directory not writable for now: retried on the next interval
+                    pass
+
+            time.sleep(self.interval)
+
+    def write(self):
+        """
+        Write values of the process to the shared directory, atomically
+        """
+        with self._lock:
+            _values = list(map(lambda x: [x[0][0], x[0][1], x[1]], self._values.items()))
+
+        _fd, _tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".metrics.")
+
+        with os.fdopen(_fd, mode='wt') as _file:
+            json.dump(_values, _file)
+
+        os.replace(_tmp_path, os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def _collect(self):
+        """
+        Return values of the process, merged with ones of other processes sharing the directory
+        :return dict: (name, labels) => value
+        """
+        with self._lock:
+            _values = dict(self._values)
+
+        if not self.directory:
+            return _values
+
+        for _name in os.listdir(self.directory):
+            if not _name.endswith(".json") or _name == f"{os.getpid()}.json":
+                continue
+
+            try:
+                with open(os.path.join(self.directory, _name), mode='rt') as _file:
+                    _other = json.load(_file)
+            except (OSError, ValueError):
+                continue
+
+            for _metric, _labels, _value in _other:
+                _key = (_metric, tuple(map(tuple, _labels)))
+
+                if _metric.endswith("_total"):
+                    _values[_key] = _values.get(_key, 0) + _value
+                else:
+                    _values[_key] = max(_values.get(_key, _value), _value)
+
+        return _values
+
+    def _key(self, name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Increase a counter
+        :param str name: metric name, without prefix
+        :param float amount: value to add
+        :param labels: metric labels
+        """
+        _key = self._key(name, labels)
+        self._start_writer()
+        with self._lock:
+            self._values[_key] = self._values.get(_key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge
+        :param str name: metric name, without prefix
+        :param float value: metric value
+        :param labels: metric labels
+        """
+        self._start_writer()
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def get(self, name, **labels):
+        """
+        Return metric value
+        :param str name: metric name, without prefix
+        :param labels: metric labels
+        :return float: value, 0 if not set yet
+        """
+        with self._lock:
+            return self._values.get(self._key(name, labels), 0)
+
+    def clear(self):
+        """
+        Drop all values
+        """
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """
+        Return all metrics in Prometheus text format, of all processes sharing the directory if set
+        :return str:
+        """
+        _values = sorted(self._collect().items())
+
+        _lines = list()
+        _typed = set()
+
+        for (_name, _labels), _value in _values:
+            _name = f"{self.prefix}_{_name}"
+
+            if _name not in _typed:
+                _typed.add(_name)
+                _lines.append(f"# TYPE {_name} {'counter' if _name.endswith('_total') else 'gauge'}")
+
+            _labels = ','.join(map(lambda x: f'{x[0]}="{self._escape(x[1])}"', _labels))
+            _lines.append(f"{_name}{{{_labels}}} {_value}" if _labels else f"{_name} {_value}")
+
+        return '\n'.join(_lines) + '\n'
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# metrics of the process, shared by all DmsMirror instances
+metrics = Metrics()
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serve process metrics on GET /metrics
+    """
+    def do_GET(self):
+        if self.path.split("?").pop(0) != "/metrics":
+            self.send_error(404)
+            return
+
+        _data = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(_data)))
+        self.end_headers()
+        self.wfile.write(_data)
+
+    def log_message(self, format, *args):
+        # scrapes are too frequent to log
+        pass
+
+
+def serve_metrics(bind):
+    """
+    Start metrics HTTP server in a daemon thread
+    :param str bind: <host:port> to listen on
+    :return ThreadingHTTPServer: server started, to be shut down by caller
+    """
+    _host, _port = bind.rsplit(":", 1)
+    _server = ThreadingHTTPServer((_host, int(_port)), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -1,6 +1,8 @@
 if __name__ == "__main__":
     import argparse
     import logging
+    import shutil
+    import tempfile
     from ..dms_mirror import DmsMirror
     from .application import StandaloneApplication
 
@@ -10,8 +12,16 @@ if __name__ == "__main__":
                          default='0.0.0.0:5400')
     _parser.add_argument("--ws-timeout", dest="ws_timeout", type=str, help="WS response timeout", default=300)
     _parser.add_argument("--ws-workers", dest="ws_workers", type=int, help="Amount of WS workers", default=10)
+    _parser.add_argument("--metrics-dir", dest="metrics_dir", type=str, default=None,
+                         help="Directory for WS workers to share metrics in, cleared at start; temporary if not set")
     _args = _parser.parse_args()
 
+    # counters of workers restarted are kept until the service restarts
+    if _args.metrics_dir:
+        shutil.rmtree(_args.metrics_dir, ignore_errors=True)
+    else:
+        _args.metrics_dir = tempfile.mkdtemp(prefix="oc_dms_mirror.metrics.")
+
     if hasattr(_args, "log_level"):
         logging.basicConfig(
             format="%(pathname)s: %(asctime)-15s: %(levelname)s: %(funcName)s: %(lineno)d: %(message)s",
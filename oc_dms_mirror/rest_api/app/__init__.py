@@ -1,6 +1,7 @@
 from flask import Flask, Blueprint
 
 from .routes import DmsMirrorBlueprint
+from oc_dms_mirror.metrics import metrics
 
 def register_blueprint_controller(app):
     dms_mirror_blueprint = DmsMirrorBlueprint()
@@ -9,6 +10,9 @@ def register_blueprint_controller(app):
 def create_app(config_class, args):
     app = Flask(__name__)
     app.args = args
+    if getattr(args, "metrics_dir", None):
+        # metrics of all workers are rendered by the one serving the request
+        metrics.share(args.metrics_dir)
     app.config.from_object(config_class)
     register_blueprint_controller(app)
     return app
@@ -5,6 +5,8 @@ from flask import Response, request, current_app, Blueprint
 from oc_logging import setup_json_logging
 
 from oc_dms_mirror.dms_mirror import DmsMirror
+from oc_dms_mirror.metrics import metrics, content_type
+from oc_dms_mirror.watcher import FileWatcher
 
 class DmsMirrorBlueprint:
     def __init__(self, name='dms_mirror'):
@@ -15,11 +17,18 @@ class DmsMirrorBlueprint:
         self.logger = structlog.get_logger()
 
         self._dms_mirror = None
+        self._config_watcher = None
 
     def _register_routes(self):
         self.bp.route('/register-component-version-artifact', methods=['POST'])(self.register_component_version_artifact)
+        self.bp.route('/register-component-version-artifact-batch', methods=['POST'])(
+                self.register_component_version_artifact_batch)
         self.bp.route('/get-gav', methods=['POST'])(self.generate_gav)
+        self.bp.route('/get-gav-batch', methods=['POST'])(self.generate_gav_batch)
+        self.bp.route('/find-component', methods=['POST'])(self.find_component)
+        self.bp.route('/plan', methods=['POST'])(self.plan)
         self.bp.route('/healthcheck', methods=['GET'])(self.healthcheck)
+        self.bp.route('/metrics', methods=['GET'])(self.get_metrics)
 
     @property
     def dms_mirror(self):
@@ -31,9 +40,32 @@ class DmsMirrorBlueprint:
     def get_dms_mirror(self):
         dms_mirror = DmsMirror()
         dms_mirror.setup_from_args(current_app.args)
+        # live events go before batch backfill for host-wide transfer slots
+        dms_mirror.transfer_priority = "high"
         dms_mirror.load_config()
+        self.start_config_watcher(current_app.args)
         return dms_mirror
 
+    def start_config_watcher(self, args):
+        """
+        Start configuration files watcher of this worker, if hot reload is enabled
+        :param argparse.Namespace args: parsed arguments
+        """
+        if self._config_watcher or not getattr(args, "config_reload_interval", None):
+            return
+
+        self._config_watcher = FileWatcher([args.config_file, args.gav_template_config_file],
+                                           self.reload_config, args.config_reload_interval)
+        self._config_watcher.start()
+
+    def reload_config(self):
+        """
+        Replace DmsMirror instance with one using configuration re-read
+        Files are parsed and validated in the watcher thread; requests in progress keep the instance they started with
+        """
+        self._dms_mirror = self.dms_mirror.reloaded()
+        self.logger.info("Configuration reloaded")
+
     def response_json(self, code, data):
         """
         Return JSON data response
@@ -62,6 +94,23 @@ class DmsMirrorBlueprint:
 
         return self.response_json(200, {"result": "Success"})
 
+    def register_component_version_artifact_batch(self):
+        """
+        Endpoint performing component/version sync with DMS for a list of webhook payloads.
+        Returns results in the order of payloads given.
+        """
+        payloads = request.get_json(silent=True)
+        if not payloads or not isinstance(payloads, list) or not all(map(lambda x: isinstance(x, dict), payloads)):
+            return self.response_json(400, {"result": "payload must be a non-empty list of events"})
+
+        # do not log payloads: there may be thousands of them
+        self.logger.info(f"POST {request.url_rule.rule} from [{request.remote_addr}] with [{len(payloads)}] events")
+        results = list(map(lambda x: {"result": x or "Success"},
+                           self.dms_mirror.process_component_webhooks(payloads)))
+        self.logger.info(f"Events processed: [{len(results)}], "
+                         f"failed: [{len(list(filter(lambda x: x['result'] != 'Success', results)))}]")
+        return self.response_json(200, results)
+
     def generate_gav(self):
         """
         Endpoint for getting or generating GAV Template.
@@ -81,6 +130,73 @@ class DmsMirrorBlueprint:
 
         return self.response_json(200, gav_template)
 
+    def generate_gav_batch(self):
+        """
+        Endpoint for getting or generating GAV Templates of many components.
+        Streams JSON map: componentId => {"result": GAV template or null, "error": message or null}.
+        """
+        self.logger.info(f"POST {request.url_rule.rule} from [{request.remote_addr}] with payload: {request.get_json()}")
+        components = (request.get_json(silent=True) or dict()).get('componentIds')
+        if not components or not isinstance(components, list) or not all(map(lambda x: isinstance(x, str), components)):
+            return self.response_json(400, {"result": "componentIds must be a non-empty list of strings"})
+
+        # stream is generated after the view returns: take the instance now, hot reload may replace it
+        dms_mirror = self.dms_mirror
+
+        def _generate():
+            _separator = "{"
+            for _component, _gav_template, _error in dms_mirror.get_components_config(components):
+                if not _gav_template and not _error:
+                    _error = f"gav template for component {_component} not found"
+
+                yield f"{_separator}{json.dumps(_component)}: {json.dumps({'result': _gav_template, 'error': _error})}"
+                _separator = ", "
+
+            yield "}" if _separator != "{" else "{}"
+
+        return Response(status=200, mimetype='application/json', content_type='application/json',
+                        response=_generate())
+
+    def find_component(self):
+        """
+        Endpoint finding components and ci_types producing a target GAV.
+        """
+        self.logger.info(f"POST {request.url_rule.rule} from [{request.remote_addr}] with payload: {request.get_json()}")
+        try:
+            gav = request.json.get('gav')
+            if not gav:
+                return self.response_json(400, {"result": "gav cannot be blank"})
+
+            _matches = self.dms_mirror.find_component_by_gav(gav)
+            if not _matches:
+                return self.response_json(404, {"result": f"component for gav {gav} not found"})
+        except Exception as _e:
+            self.logger.error(str(_e))
+            return self.response_json(400, {"result": str(_e)})
+
+        return self.response_json(200, {"gav": gav, "matches": _matches})
+
+    def plan(self):
+        """
+        Endpoint computing copies and registrations to be done for a component without transferring anything.
+        """
+        self.logger.info(f"POST {request.url_rule.rule} from [{request.remote_addr}] with payload: {request.get_json()}")
+        try:
+            component = request.json.get('componentId')
+            if not component:
+                return self.response_json(400, {"result": "componentId cannot be blank"})
+
+            version = request.json.get('version')
+            _plan = self.dms_mirror.plan_component(component, [version] if version else None)
+        except Exception as _e:
+            self.logger.error(str(_e))
+            return self.response_json(400, {"result": str(_e)})
+
+        if _plan.get("error"):
+            return self.response_json(500, {"result": _plan["error"]})
+
+        return self.response_json(200, _plan)
+
     def healthcheck(self):
         """
         Simple healthcheck endpoint.
@@ -88,5 +204,12 @@ class DmsMirrorBlueprint:
         self.logger.debug(f"GET {request.url_rule.rule} - OK")
         return self.response_json(200, {"status": "ok"})
 
+    def get_metrics(self):
+        """
+        Metrics endpoint, Prometheus text format. Values are of all workers if --metrics-dir is shared,
+        of the worker process serving the request otherwise.
+        """
+        return Response(status=200, content_type=content_type, response=metrics.render())
+
     def get_blueprint(self):
         return self.bp
\ No newline at end of file
@@ -1,15 +1,27 @@
 #!/usr/bin/env python3
 
+import io
 import os
+import pickle
+import signal
 import tempfile
 import json
+import threading
+import time
 
 import unittest
 import unittest.mock
 from unittest.mock import Mock, call
 from ..dms_mirror import DmsMirror
+from ..throttling import ThrottledFile
+from ..http_pool import PooledAdapter
+from ..journal import Journal
+from ..lease import LeaseHeld, LeaseLost
+from ..traffic import ReplayAdapter, load_records
+from ..metrics import metrics
 from oc_cdtapi.DmsAPI import DmsAPI, DmsAPIv3
 from oc_cdtapi.API import HttpAPIError
+from urllib3.exceptions import ProtocolError
 from string import Template
 import re
 from oc_checksumsq.checksums_interface import FileLocation
@@ -74,6 +86,50 @@ class DmsMirrorTestBase(unittest.TestCase):
         self.args.ci_type_documentation = 'DOCS'
         self.args.ci_type_release_notes = 'RELEASENOTES'
         self.args.always_enqueue = False
+        self.args.retries_count = 5
+        self.args.plan = False
+        self.args.state_dir = None
+        self.args.scan_window = "all"
+        self.args.scan_newest = 0
+        self.args.full_scan_interval = 0
+        self.args.shard_index = 0
+        self.args.shard_count = 1
+        self.args.shard_by = "hash"
+        self.args.shard_weights = None
+        self.args.save_shard_weights = None
+        self.args.report_file = None
+        self.args.lease_backend = "none"
+        self.args.lease_ttl = 60
+        self.args.download_rate = 0
+        self.args.upload_rate = 0
+        self.args.max_downloads = 0
+        self.args.max_uploads = 0
+        self.args.multipart_threshold = 0
+        self.args.multipart_parts = 4
+        self.args.spool_dir = None
+        self.args.spool_memory_threshold = 1024 * 1024
+        self.args.spool_min_free = 0
+        self.args.spool_budget = 0
+        self.args.spool_admission_timeout = 1
+        self.args.spool_unknown_size = 0
+        self.args.batch_workers = 1
+        self.args.webhook_artifact_workers = 1
+        self.args.priority_aging = 60
+        self.args.adaptive_max_calls = 0
+        self.args.adaptive_min_calls = 1
+        self.args.dms_rate = list()
+        self.args.traffic_record = None
+        self.args.http_pool_connections = 10
+        self.args.http_pool_maxsize = 10
+        self.args.daemon = False
+        self.args.daemon_interval_min = 300
+        self.args.daemon_interval_max = 3600
+        self.args.metrics_bind = None
+        self.args.reconcile = False
+        self.args.resume = False
+        self.args.fail_fast_after = 0
+        self.args.error_threshold = list()
+        self.args.listing_prefetch = 0
         self.dmsmirror = DmsMirror()
         self.dmsmirror._queue_client = unittest.mock.MagicMock()
         self.dmsmirror._psql_mq_client = unittest.mock.MagicMock()
@@ -118,6 +174,118 @@ class DmsMirrorInitTestSuite(DmsMirrorTestBase):
         for _k, _v in _supposed_defaults.items():
             self.assertEqual(_parser.get_default(_k), _v)
 
+    def test_clients_pooled(self):
+        self.dmsmirror.setup_from_args(self.args)
+        self.dmsmirror._args.mvn_url = "https://mvn.example.com"
+        self.dmsmirror._args.dms_url = "https://dms.example.com"
+        self.dmsmirror._args.dms_api_version = 3
+        _mvn_adapter = self.dmsmirror._get_mvn_client().web.get_adapter(self.dmsmirror._args.mvn_url)
+        self.assertIsInstance(_mvn_adapter, PooledAdapter)
+        self.assertIs(self.dmsmirror._get_mvn_client().web.get_adapter(self.dmsmirror._args.mvn_url), _mvn_adapter)
+        self.assertIsNot(self.dmsmirror._get_dms_client().web.get_adapter(self.dmsmirror._args.dms_url), _mvn_adapter)
+
+    def test_traffic_recorded(self):
+        self.dmsmirror.setup_from_args(self.args)
+        self.dmsmirror._args.dms_api_version = 3
+        self.assertEqual(self.dmsmirror._get_dms_client().web.hooks["response"], list())
+        self.dmsmirror._args.traffic_record = "/tmp/traffic.jsonl"
+        self.assertEqual(len(self.dmsmirror._get_dms_client().web.hooks["response"]), 1)
+        self.assertEqual(len(self.dmsmirror._get_mvn_client().web.hooks["response"]), 1)
+        # clients are pickled with the mirror to batch pool workers
+        pickle.dumps(self.dmsmirror._get_dms_client().web)
+
+class DmsMirrorConfigTestSuite(DmsMirrorTestBase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.args.config_file = os.path.join(self.directory.name, "config.json")
+        self.args.gav_template_config_file = os.path.join(self.directory.name, "gav_template_config.json")
+        self._write(self.args.config_file, {"component": {"ci_type": "COMPONENTDSTR"}})
+        self._write(self.args.gav_template_config_file, self.gav_template)
+        self.dmsmirror.setup_from_args(self.args)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, path, data):
+        with open(path, mode='wt') as _file:
+            json.dump(data, _file)
+
+    def test_load_config(self):
+        self.dmsmirror.load_config()
+        self.assertEqual(self.dmsmirror._components, {"component": {"ci_type": "COMPONENTDSTR"}})
+        self.assertEqual(self.dmsmirror._gav_template, self.gav_template)
+
+        os.remove(self.args.gav_template_config_file)
+        self.dmsmirror.load_config()
+        self.assertIsNone(self.dmsmirror._gav_template)
+
+    def test_read_config_invalid(self):
+        self._write(self.args.config_file, ["component"])
+        with self.assertRaises(ValueError):
+            self.dmsmirror.read_config()
+
+        self._write(self.args.config_file, {"component": {}})
+        self._write(self.args.gav_template_config_file, {"distribution": "$prefix"})
+        with self.assertRaises(ValueError):
+            self.dmsmirror.read_config()
+
+        with open(self.args.config_file, mode='wt') as _file:
+            _file.write("{")
+
+        with self.assertRaises(json.JSONDecodeError):
+            self.dmsmirror.read_config()
+
+    def test_reloaded(self):
+        self.dmsmirror.load_config()
+        self.dmsmirror._get_template("$prefix")
+        self._write(self.args.config_file, {"other": {}})
+
+        _reloaded = self.dmsmirror.reloaded()
+        self.assertEqual(list(_reloaded._components), ["other"])
+        self.assertEqual(_reloaded._templates, dict())
+        self.assertIs(_reloaded._mvn_client, self.dmsmirror._mvn_client)
+        # the original one is untouched
+        self.assertEqual(list(self.dmsmirror._components), ["component"])
+        self.assertIn("$prefix", self.dmsmirror._templates)
+
+    def test_find_component_by_gav(self):
+        self.dmsmirror.load_config()
+        self.assertIsNotNone(self.dmsmirror._gav_index)
+        self.assertEqual(
+                self.dmsmirror.find_component_by_gav(f"{self.args.mvn_prefix}.client.registered:name:1.0:zip"),
+                [{"component": None, "artifact_type": "distribution", "ci_type": "registered"}])
+
+        self._write(self.args.config_file, {"component": {
+            "ci_type": "COMPONENTDSTR",
+            "tgtGavTemplate": {"documentation": "$prefix.documentation:component:$v:\\$p"}}})
+        _reloaded = self.dmsmirror.reloaded()
+        # configured component goes before generic template matches
+        self.assertEqual(
+                _reloaded.find_component_by_gav(f"{self.args.mvn_prefix}.documentation:component:1.0:pdf")[0],
+                {"component": "component", "artifact_type": "documentation", "ci_type": "DOCS"})
+
+    def test_pickled(self):
+        # the mirror is pickled to batch pool workers with the configuration loaded
+        _dmsmirror = DmsMirror()
+        _dmsmirror.setup_from_args(_dmsmirror.basic_args().parse_args([
+            "--config-file", self.args.config_file, "--gav-template-config-file", self.args.gav_template_config_file]))
+        _dmsmirror.load_config()
+
+        for _method in (_dmsmirror.process_component_result, _dmsmirror.plan_component,
+                        _dmsmirror.inventory_component):
+            self.assertEqual(pickle.loads(pickle.dumps(_method)).__name__, _method.__name__)
+
+        self.assertEqual(pickle.loads(pickle.dumps(_dmsmirror)).find_component_by_gav(
+                f"{_dmsmirror._args.mvn_prefix}.client.registered:name:1.0:zip"),
+                [{"component": None, "artifact_type": "distribution", "ci_type": "registered"}])
+
+    def test_get_template(self):
+        _template = self.dmsmirror._get_template("$prefix:$v")
+        self.assertIs(self.dmsmirror._get_template("$prefix:$v"), _template)
+        self.assertEqual(_template.substitute(prefix="p", v="1"), "p:1")
+
+
 class DmsMirrorV2TestSuite(DmsMirrorTestBase):
     def setUp(self):
         super().setUp()
@@ -185,10 +353,405 @@ class DmsMirrorV2TestSuite(DmsMirrorTestBase):
         self.dmsmirror.process_version = unittest.mock.MagicMock(return_value=None)
         self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(side_effect=_exc)
         self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
-        self.assertIsInstance(self.dmsmirror.process_component(_component), str)
+        _record = self.dmsmirror.process_component(_component)
+        self.assertEqual(_record["class"], "Exception")
+        self.assertEqual(_record["component"], _component)
+        self.assertEqual(_record["backend"], "dms")
+        self.assertFalse(_record["retriable"])
+        self.assertIsInstance(_record["message"], str)
         self.dmsmirror.process_version.assert_not_called()
         self.dmsmirror._dms_client.get_versions.assert_called_once_with(_component)
 
+    def test_version_key(self):
+        _versions = ["1.10", "1.2", "1.2.1", "0.9", "1.2-RC1", "1.2-RC2", "1.2-1", "1.2.1-RC1"]
+        self.assertEqual(sorted(_versions, key=self.dmsmirror._version_key),
+                         ["0.9", "1.2-RC1", "1.2-RC2", "1.2", "1.2-1", "1.2.1-RC1", "1.2.1", "1.10"])
+
+    def test_select_versions(self):
+        _versions = ["1.1", "1.10", "1.2", "1.9"]
+        self.assertEqual(self.dmsmirror._select_versions("c", _versions, {"watermark": "1.2"}), (_versions, True))
+
+        self.dmsmirror._args.scan_window = "watermark"
+        self.assertEqual(self.dmsmirror._select_versions("c", _versions, {}), (_versions, True))
+        self.assertEqual(self.dmsmirror._select_versions("c", _versions, {"watermark": "1.2"}),
+                         (["1.10", "1.9"], False))
+
+        self.dmsmirror._args.scan_newest = 1
+        self.assertEqual(self.dmsmirror._select_versions("c", _versions, {"watermark": "1.2"}), (["1.10"], False))
+
+        # full scan is due
+        self.dmsmirror._args.full_scan_interval = 1
+        self.assertEqual(self.dmsmirror._select_versions("c", _versions, {"watermark": "1.2"}), (_versions, True))
+        self.assertEqual(self.dmsmirror._select_versions(
+            "c", _versions, {"watermark": "1.2", "last_full_scan": time.time()}), (["1.10"], False))
+
+    def test_select_versions_mirrored(self):
+        self.dmsmirror._args.scan_window = "watermark"
+        # a release published after its RC, a hotfix of an older line published after a newer release
+        _state = {"watermark": "2.0", "mirrored_versions": ["1.2-RC1", "1.9", "2.0"]}
+        self.assertEqual(self.dmsmirror._select_versions("c", ["1.2-RC1", "1.2", "1.9", "1.9.5", "2.0"], _state),
+                         (["1.2", "1.9.5"], False))
+        self.assertEqual(self.dmsmirror._select_versions("c", ["1.2-RC1", "1.9", "2.0"], _state), ([], False))
+
+    def test_process_component_watermark(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        self.dmsmirror.process_version = unittest.mock.MagicMock(return_value=None)
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1.1", "1.2", "1.10"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        self.dmsmirror._args.scan_window = "watermark"
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.assertEqual(self.dmsmirror.process_version.call_count, 3)
+            _state = self.dmsmirror.load_component_state(_component)
+            self.assertEqual(_state["watermark"], "1.10")
+            self.assertEqual(_state["mirrored_versions"], ["1.1", "1.2", "1.10"])
+            self.assertIn("last_full_scan", _state)
+
+            # nothing new
+            self.dmsmirror.process_version.reset_mock()
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.dmsmirror.process_version.assert_not_called()
+
+            # a new version appeared
+            self.dmsmirror._dms_client.get_versions.return_value = ["1.1", "1.2", "1.10", "1.11"]
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.dmsmirror.process_version.assert_called_once_with("1.11", _component)
+            self.assertEqual(self.dmsmirror.load_component_state(_component)["watermark"], "1.11")
+
+            # an older version published later
+            self.dmsmirror.process_version.reset_mock()
+            self.dmsmirror._dms_client.get_versions.return_value = ["1.1", "1.2", "1.2.1", "1.10", "1.11"]
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.dmsmirror.process_version.assert_called_once_with("1.2.1", _component)
+
+            # watermark is not moved on failure
+            self.dmsmirror.process_version.reset_mock()
+            self.dmsmirror.process_version.side_effect = HttpAPIError(code=500)
+            self.dmsmirror._dms_client.get_versions.return_value = ["1.11", "1.12"]
+            self.assertIsNotNone(self.dmsmirror.process_component(_component))
+            self.assertEqual(self.dmsmirror.load_component_state(_component)["watermark"], "1.11")
+            self.assertNotIn("1.12", self.dmsmirror.load_component_state(_component)["mirrored_versions"])
+
+    def test_process_component_journal(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        self.dmsmirror.process_version = unittest.mock.MagicMock(side_effect=[None, HttpAPIError(code=500)])
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2", "3"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+
+        with tempfile.TemporaryDirectory() as _journal_dir:
+            self.dmsmirror._journal = Journal(_journal_dir)
+            self.assertIsNotNone(self.dmsmirror.process_component(_component))
+            self.assertEqual(self.dmsmirror._journal.load(_component), ({"1"}, False))
+
+            # resumed from the version failed
+            self.dmsmirror.process_version.reset_mock(side_effect=True)
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.assertEqual(self.dmsmirror.process_version.call_args_list,
+                             [call("2", _component), call("3", _component)])
+
+            # finished: skipped at all
+            self.dmsmirror.process_version.reset_mock()
+            self.dmsmirror._dms_client.get_versions.reset_mock()
+            self.assertIsNone(self.dmsmirror.process_component(_component))
+            self.dmsmirror.process_version.assert_not_called()
+            self.dmsmirror._dms_client.get_versions.assert_not_called()
+
+    def test_process_component_prefetch(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        _processed = list()
+        self.dmsmirror._args.listing_prefetch = 2
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2", "3", "4"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        # listings are fetched in other threads, logging as the component processing does
+        _logged = set()
+        self.dmsmirror._dms_client.get_artifacts = unittest.mock.MagicMock(side_effect=lambda c, v: _logged.add(
+                self.dmsmirror._DmsMirror__log_msg("fetched")) or [{"id": v}])
+        self.dmsmirror._dms_client.get_artifacts.__name__ = "get_artifacts"
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(
+                side_effect=lambda artifact, component, version: _processed.append((artifact["id"], version)))
+
+        self.assertIsNone(self.dmsmirror.process_component(_component))
+        self.assertEqual(_processed, [("1", "1"), ("2", "2"), ("3", "3"), ("4", "4")])
+        self.assertEqual(_logged, {f"[{_component}]: fetched"})
+        self.assertEqual(self.dmsmirror._dms_client.get_artifacts.call_count, 4)
+        self.assertEqual(self.dmsmirror._prefetched, dict())
+
+        # listings fetched ahead are dropped on failure
+        self.dmsmirror.process_artifact.side_effect = ValueError("test")
+        self.assertIsNotNone(self.dmsmirror.process_component(_component))
+        self.assertEqual(self.dmsmirror._prefetched, dict())
+
+    def test_process_component_result(self):
+        self.dmsmirror.process_component = unittest.mock.MagicMock(return_value="error")
+        _component, _error, _elapsed = self.dmsmirror.process_component_result("c1")
+        self.assertEqual((_component, _error), ("c1", "error"))
+        self.assertGreaterEqual(_elapsed, 0)
+
+    def test_process_component_error_record(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        self.dmsmirror._dms_client.get_artifacts = unittest.mock.MagicMock(return_value=[{"id": 10}])
+        self.dmsmirror._dms_client.get_artifacts.__name__ = "get_artifacts"
+        self.dmsmirror._mvn_client.exists = unittest.mock.MagicMock(side_effect=HttpAPIError(502, "url", None, "test"))
+        self.dmsmirror._get_target = unittest.mock.MagicMock(return_value=("g:a:1:zip", "distribution", dict()))
+
+        _record = self.dmsmirror.process_component(_component)
+        self.assertEqual(dict(_record, message=None), {
+            "class": "HttpAPIError", "backend": "nexus", "component": _component, "version": "1", "artifact": "10",
+            "retriable": True, "message": None})
+
+        # configuration error
+        self.dmsmirror._get_target.side_effect = KeyError("tgtGavTemplate")
+        _record = self.dmsmirror.process_component(_component)
+        self.assertEqual((_record["class"], _record["backend"], _record["retriable"]), ("KeyError", None, False))
+
+    def test_collect_results(self):
+        _e2 = {"class": "HttpAPIError", "backend": "dms", "retriable": True}
+        _e3 = {"class": "KeyError", "backend": None, "retriable": False}
+        _results = [("c1", None, 1), ("c2", _e2, 1), ("c3", _e3, 1), ("c4", None, 1)]
+        self.assertEqual(self.dmsmirror._collect_results(iter(_results), 4), ([_e2, _e3], 4, None))
+
+        # stopped early, the rest of results are not waited for
+        self.dmsmirror._args.fail_fast_after = 2
+        _iterator = iter(_results)
+        self.assertEqual(self.dmsmirror._collect_results(_iterator, 4), ([_e2, _e3], 3, "total=2"))
+        self.assertEqual(next(_iterator), ("c4", None, 1))
+
+        self.dmsmirror._args.fail_fast_after = 0
+        self.dmsmirror._args.error_threshold = ["KeyError=1"]
+        self.dmsmirror.setup_from_args(self.dmsmirror._args)
+        self.assertEqual(self.dmsmirror._collect_results(iter(_results), 4), ([_e2, _e3], 3, "KeyError=1"))
+        self.dmsmirror._args.error_threshold = ["dms=1"]
+        self.dmsmirror.setup_from_args(self.dmsmirror._args)
+        self.assertEqual(self.dmsmirror._collect_results(iter(_results), 4), ([_e2], 2, "dms=1"))
+
+        # rejected at start
+        self.dmsmirror._args.error_threshold = ["dms"]
+        with self.assertRaises(ValueError):
+            self.dmsmirror.setup_from_args(self.dmsmirror._args)
+
+    def test_run_fail_fast(self):
+        self.dmsmirror.load_config = unittest.mock.MagicMock()
+        self.dmsmirror._select_components = unittest.mock.MagicMock(return_value=["c1", "c2"])
+        self.dmsmirror.process_component = unittest.mock.MagicMock(return_value={
+            "class": "HttpAPIError", "backend": "dms", "component": "c1", "version": None, "artifact": None,
+            "retriable": True, "message": "error"})
+        self.dmsmirror._args.fail_fast_after = 1
+        self.dmsmirror._args.shard_count = 1
+        self.dmsmirror._args.shard_index = 0
+
+        with tempfile.TemporaryDirectory() as _journal_dir, \
+                unittest.mock.patch("multiprocessing.Pool") as _pool:
+            _pool.return_value.__enter__.return_value.imap_unordered = lambda f, x: map(f, x)
+            self.dmsmirror._args.journal_dir = _journal_dir
+            _exceptions = self.dmsmirror.run()
+            self.assertIn("Stopped after [1] errors", _exceptions.pop())
+            self.assertEqual(_exceptions, ["error"])
+            self.assertEqual(self.dmsmirror.summary["stopped"], "total=1")
+            self.assertEqual(self.dmsmirror.summary["error_counts"]["by_backend"], {"dms": 1})
+            self.assertEqual(self.dmsmirror.summary["error_records"][0]["component"], "c1")
+            self.dmsmirror.process_component.assert_called_once()
+
+    def test_select_versions_revoked(self):
+        self.assertEqual(self.dmsmirror._select_versions(
+            "c", ["1.1", "1.2", "1.3"], {"revoked_versions": ["1.2"]}), (["1.1", "1.3"], True))
+
+    def test_process_version_deleted(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        _artifacts = [{"id": 1, "type": "distribution"}, {"id": 2, "type": "notes"}]
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(return_value=None)
+        self.dmsmirror._dms_client.get_artifacts = unittest.mock.MagicMock(return_value=_artifacts)
+        self.dmsmirror._dms_client.get_artifacts.__name__ = "get_artifacts"
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.dmsmirror.save_component_state(_component, {"deleted_artifacts": {"1": ["2"]}})
+            self.assertIsNone(self.dmsmirror.process_version("1", _component))
+
+        self.dmsmirror.process_artifact.assert_called_once_with(_artifacts[0], _component, "1")
+
+    def test_update_component_state(self):
+        self.assertIsNone(self.dmsmirror.update_component_state("c", lambda x: x.update(watermark="1")))
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.dmsmirror.save_component_state("c", {"cost": 10})
+            self.assertEqual(self.dmsmirror.update_component_state("c", lambda x: x.update(watermark="1")),
+                             {"cost": 10, "watermark": "1"})
+            self.assertEqual(self.dmsmirror.load_component_state("c"), {"cost": 10, "watermark": "1"})
+
+    def test_next_interval(self):
+        self.dmsmirror._known_versions["c"] = {"1", "2"}
+        # the first processing
+        self.assertEqual(self.dmsmirror._next_interval("c", 300, None), 300)
+        # nothing new
+        self.assertEqual(self.dmsmirror._next_interval("c", 300, {"1", "2"}), 600)
+        self.assertEqual(self.dmsmirror._next_interval("c", 3000, {"1", "2"}), 3600)
+        # published
+        self.assertEqual(self.dmsmirror._next_interval("c", 3600, {"1"}), 300)
+
+    def test_run_daemon(self):
+        _stop = threading.Event()
+        _calls = list()
+
+        def _process_component(component):
+            _calls.append(component)
+            self.dmsmirror._known_versions[component] = {"1"}
+            if len(_calls) >= 4:
+                _stop.set()
+
+            return "error" if component == "c2" else None
+
+        self.dmsmirror.process_component = unittest.mock.MagicMock(side_effect=_process_component)
+        self.dmsmirror._args.dms_processes = 2
+        self.dmsmirror._args.daemon_interval_min = 0.01
+        self.dmsmirror._args.daemon_interval_max = 0.02
+        metrics.clear()
+
+        self.assertEqual(self.dmsmirror.run_daemon(["c1", "c2"], stop=_stop), ["error"])
+        self.assertGreaterEqual(len(_calls), 4)
+        self.assertEqual(set(_calls), {"c1", "c2"})
+        self.assertEqual(metrics.get("daemon_components"), 2)
+        # quiet component backs off, failed one is retried on the same interval
+        self.assertEqual(metrics.get("component_poll_interval_seconds", component="c1"), 0.02)
+        self.assertEqual(metrics.get("component_poll_interval_seconds", component="c2"), 0.01)
+
+    def test_main_daemon_sigterm(self):
+        _calls = list()
+
+        def _process_component(component):
+            _calls.append(component)
+            if len(_calls) >= 2:
+                os.kill(os.getpid(), signal.SIGTERM)
+
+            return {"message": "error", "class": "ValueError", "backend": None, "retriable": False} \
+                    if component == "c2" else None
+
+        self.args.daemon = True
+        self.args.dms_processes = 1
+        self.args.daemon_interval_min = 0.01
+        self.dmsmirror.basic_args = unittest.mock.MagicMock()
+        self.dmsmirror.basic_args.return_value.parse_args.return_value = self.args
+        self.dmsmirror.load_config = unittest.mock.MagicMock()
+        self.dmsmirror._select_components = unittest.mock.MagicMock(return_value=["c1", "c2"])
+        self.dmsmirror.process_component = unittest.mock.MagicMock(side_effect=_process_component)
+        _handler = signal.getsignal(signal.SIGTERM)
+        metrics.clear()
+
+        # stopped on request: errors of the last polls are reported, not raised
+        with unittest.mock.patch("oc_dms_mirror.dms_mirror.setup_json_logging"):
+            self.dmsmirror.main()
+
+        self.assertEqual(self.dmsmirror.summary["errors"], 1)
+        self.assertEqual(metrics.get("daemon_failed_components"), 1)
+        self.assertIs(signal.getsignal(signal.SIGTERM), _handler)
+
+    def test_process_component_polled(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        self.dmsmirror.process_version = unittest.mock.MagicMock(return_value=None)
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        self.dmsmirror._args.daemon = True
+
+        self.assertIsNone(self.dmsmirror.process_component(_component))
+        self.assertEqual(self.dmsmirror.process_version.call_count, 2)
+
+        # the next poll scans new versions only, with no state directory
+        self.dmsmirror.process_version.reset_mock()
+        self.dmsmirror._dms_client.get_versions.return_value = ["1", "2", "3"]
+        self.assertIsNone(self.dmsmirror.process_component(_component))
+        self.dmsmirror.process_version.assert_called_once_with("3", _component)
+
+        # failed ones are scanned again
+        self.dmsmirror.process_version.side_effect = HttpAPIError(code=500)
+        self.dmsmirror._dms_client.get_versions.return_value = ["1", "2", "3", "4"]
+        self.assertIsNotNone(self.dmsmirror.process_component(_component))
+        self.assertEqual(self.dmsmirror._polled_versions[_component], {"1", "2", "3"})
+
+    def test_process_name_by_thread(self):
+        _names = dict()
+        _barrier = threading.Barrier(2)
+
+        def _process(component):
+            self.dmsmirror._DmsMirror__process_name = component
+            _barrier.wait()
+            _names[component] = self.dmsmirror._DmsMirror__log_msg("message")
+
+        _threads = list(map(lambda x: threading.Thread(target=_process, args=(x,)), ["c1", "c2"]))
+        list(map(lambda x: x.start(), _threads))
+        list(map(lambda x: x.join(), _threads))
+        self.assertEqual(_names, {"c1": "[c1]: message", "c2": "[c2]: message"})
+
+    def _assert_shards(self, count):
+        _shards = list()
+        for _index in range(count):
+            self.dmsmirror._args.shard_index = _index
+            _shards.append(self.dmsmirror._select_components())
+
+        _all = sum(_shards, list())
+        self.assertEqual(sorted(_all), sorted(self.dmsmirror._components))
+        self.assertEqual(len(_all), len(set(_all)))
+        return _shards
+
+    def test_select_components(self):
+        self.dmsmirror._components = dict(map(lambda x: (f"component{x}", dict()), range(20)))
+        self.assertEqual(self.dmsmirror._select_components(), list(self.dmsmirror._components))
+
+        self.dmsmirror._args.shard_count = 3
+        _shards = self._assert_shards(3)
+        self.assertEqual(_shards, self._assert_shards(3))
+
+        self.dmsmirror._args.shard_index = 3
+        with self.assertRaises(ValueError):
+            self.dmsmirror._select_components()
+
+    def test_select_components_by_weight(self):
+        self.dmsmirror._components = dict(map(lambda x: (f"component{x}", dict()), range(5)))
+        self.dmsmirror._args.shard_count = 2
+        self.dmsmirror._args.shard_by = "weight"
+
+        with self.assertRaises(ValueError):
+            self.dmsmirror._select_components()
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.dmsmirror.save_component_state("component0", {"cost": 100})
+            self.dmsmirror.save_component_state("component1", {"cost": 10})
+            self.dmsmirror.save_component_state("component2", {"cost": 10})
+            self.dmsmirror._args.shard_weights = os.path.join(_state_dir, "weights.json")
+            self.assertEqual(self.dmsmirror.save_shard_weights(self.dmsmirror._args.shard_weights),
+                             {"component0": 100, "component1": 10, "component2": 10})
+            # no cost for the rest: average is used
+            _shards = self._assert_shards(2)
+            self.assertIn(["component0"], _shards)
+
+            # costs rewritten by a run do not change the partition
+            self.dmsmirror.save_component_state("component3", {"cost": 1000})
+            self.dmsmirror.save_component_state("component0", {"cost": 1})
+            self.assertEqual(self._assert_shards(2), _shards)
+
+    def test_main_save_shard_weights(self):
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.args.state_dir = _state_dir
+            self.args.save_shard_weights = os.path.join(_state_dir, "weights.json")
+            self.dmsmirror.basic_args = unittest.mock.MagicMock()
+            self.dmsmirror.basic_args.return_value.parse_args.return_value = self.args
+            self.dmsmirror.load_config = unittest.mock.MagicMock()
+            self.dmsmirror.process_component = unittest.mock.MagicMock()
+
+            # costs are saved and nothing else is done
+            with unittest.mock.patch("oc_dms_mirror.dms_mirror.setup_json_logging"):
+                self.dmsmirror.main()
+
+            with open(self.args.save_shard_weights, mode='rt') as _weights:
+                self.assertEqual(json.load(_weights), dict())
+
+            self.assertIn("elapsed", self.dmsmirror.summary)
+            self.dmsmirror.process_component.assert_not_called()
+
     def test_process_version(self):
         _component = list(self.dmsmirror._components.keys()).pop()
         self.assertIsNotNone(_component)
@@ -234,7 +797,7 @@ class DmsMirrorV2TestSuite(DmsMirrorTestBase):
         self.assertIsNone(self.dmsmirror.process_artifact(artifact, component, version))
         self.dmsmirror._mvn_client.exists.assert_called_once_with(_tgt_gav, repo=self.args.mvn_download_repo)
         self.dmsmirror._register_artifact.assert_called_once_with(_tgt_gav, ci_type)
-        self.dmsmirror._copy_artifact.assert_called_once_with(component, version, artifact, _tgt_gav)
+        self.dmsmirror._copy_artifact.assert_called_once_with(component, version, artifact, _tgt_gav, lease=None)
 
         if hasattr(self.dmsmirror._dms_client, "get_artifact_info"):
             self.dmsmirror._dms_client.get_artifact_info.assert_called_once_with(component, version, artifact["id"])
@@ -438,6 +1001,162 @@ class DmsMirrorV2TestSuite(DmsMirrorTestBase):
         self.dmsmirror._psql_mq_client.compose_message.assert_called_once_with("register_file", mock_params)
         self.dmsmirror._psql_mq_client.enqueue_message.assert_called_once_with("cdt.dlartifacts.input", mock_message)
 
+    def test_process_artifact_leased(self):
+        _artifact = {"type": "distribution", "id": 1}
+        _tgt_gav = "com.example.component:component:1:pkg"
+        self.dmsmirror._get_target = unittest.mock.MagicMock(
+                return_value=(_tgt_gav, "distribution", {"ci_type": "CITYPE"}))
+        self.dmsmirror._mvn_client.exists = unittest.mock.MagicMock(return_value=False)
+        self.dmsmirror._copy_artifact = unittest.mock.MagicMock()
+        self.dmsmirror._register_artifact = unittest.mock.MagicMock()
+
+        with tempfile.TemporaryDirectory() as _lease_dir:
+            self.dmsmirror._args.lease_backend = "file"
+            self.dmsmirror._args.lease_dir = _lease_dir
+
+            # held by another instance: failed to be retried, not skipped as done
+            self.assertTrue(self.dmsmirror.lease_backend.acquire(_tgt_gav, "other", 60))
+            with self.assertRaises(LeaseHeld):
+                self.dmsmirror.process_artifact(_artifact, "component", "1")
+            self.dmsmirror._mvn_client.exists.assert_not_called()
+            self.dmsmirror._copy_artifact.assert_not_called()
+
+            # free: processed and released after
+            self.dmsmirror.lease_backend.release(_tgt_gav, "other")
+            self.dmsmirror.process_artifact(_artifact, "component", "1")
+            self.dmsmirror._copy_artifact.assert_called_once_with(
+                    "component", "1", _artifact, _tgt_gav, lease=unittest.mock.ANY)
+            self.dmsmirror._register_artifact.assert_called_once_with(_tgt_gav, "CITYPE")
+            self.assertTrue(self.dmsmirror.lease_backend.acquire(_tgt_gav, "other", 60))
+            self.dmsmirror.lease_backend.release(_tgt_gav, "other")
+
+            # taken over while copying: not registered
+            def _take_over(*args, lease):
+                self.dmsmirror.lease_backend.release(lease.key, lease.owner)
+                self.assertTrue(self.dmsmirror.lease_backend.acquire(lease.key, "other", 60))
+
+            self.dmsmirror._copy_artifact.side_effect = _take_over
+            self.dmsmirror._register_artifact.reset_mock()
+
+            with self.assertRaises(LeaseLost):
+                self.dmsmirror.process_artifact(_artifact, "component", "1")
+
+            self.dmsmirror._register_artifact.assert_not_called()
+            # the lease of the other instance is kept
+            self.assertFalse(self.dmsmirror.lease_backend.acquire(_tgt_gav, "another", 60))
+
+    def test_plan_artifact(self):
+        _artifact = {"type": "distribution", "id": 1}
+        _tgt_gav = "com.example.component:component:1:pkg"
+        self.dmsmirror._get_target = unittest.mock.MagicMock(
+                return_value=(_tgt_gav, "distribution", {"ci_type": "CITYPE"}))
+        self.dmsmirror._copy_artifact = unittest.mock.MagicMock()
+        self.dmsmirror._register_artifact = unittest.mock.MagicMock()
+
+        # target does not exist: copy and register
+        self.dmsmirror._mvn_client.exists = unittest.mock.MagicMock(return_value=False)
+        _actions = self.dmsmirror.plan_artifact(_artifact, "component", "1", {"ci_type": "CITYPE"})
+        self.assertEqual(list(map(lambda x: x["action"], _actions)), ["copy", "register"])
+        self.dmsmirror._get_target.assert_called_once_with(_artifact, "component", "1", {"ci_type": "CITYPE"})
+        self.assertEqual(_actions[0]["gav"], _tgt_gav)
+        self.assertEqual(_actions[1]["ci_type"], "CITYPE")
+        self.dmsmirror._mvn_client.exists.assert_called_once_with(_tgt_gav, repo=self.args.mvn_download_repo)
+
+        # target exists: nothing to do
+        self.dmsmirror._mvn_client.exists.return_value = True
+        self.assertEqual(self.dmsmirror.plan_artifact(_artifact, "component", "1"), [])
+
+        # target exists and always enqueue: register only
+        self.dmsmirror._args.always_enqueue = True
+        _actions = self.dmsmirror.plan_artifact(_artifact, "component", "1")
+        self.assertEqual(list(map(lambda x: x["action"], _actions)), ["register"])
+
+        self.dmsmirror._copy_artifact.assert_not_called()
+        self.dmsmirror._register_artifact.assert_not_called()
+
+    def test_plan_component(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        self.dmsmirror._dms_client.get_artifacts = unittest.mock.MagicMock(return_value=["a1"])
+        self.dmsmirror._dms_client.get_artifacts.__name__ = "get_artifacts"
+        self.dmsmirror.plan_artifact = unittest.mock.MagicMock(return_value=[{"action": "copy"}])
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock()
+
+        _plan = self.dmsmirror.plan_component(_component)
+        self.assertEqual(_plan["component"], _component)
+        self.assertIsNone(_plan["error"])
+        self.assertEqual(len(_plan["actions"]), 2)
+        # configuration is resolved once per component
+        _params = self.dmsmirror._components[_component]
+        self.dmsmirror.plan_artifact.assert_any_call("a1", _component, "1", _params)
+        self.dmsmirror.plan_artifact.assert_any_call("a1", _component, "2", _params)
+        self.dmsmirror.process_artifact.assert_not_called()
+
+        # explicit versions list does not query DMS for versions
+        self.dmsmirror._dms_client.get_versions.reset_mock()
+        _plan = self.dmsmirror.plan_component(_component, ["3"])
+        self.assertEqual(len(_plan["actions"]), 1)
+        self.dmsmirror._dms_client.get_versions.assert_not_called()
+
+        # errors are returned, not raised
+        self.dmsmirror._dms_client.get_artifacts.side_effect = ValueError("test")
+        self.assertIsInstance(self.dmsmirror.plan_component(_component, ["3"])["error"], str)
+
+    def test_inventory_component(self):
+        _component = list(self.dmsmirror._components.keys()).pop()
+        _params = self.dmsmirror._components[_component]
+        self.dmsmirror._dms_client.get_versions = unittest.mock.MagicMock(return_value=["1", "2"])
+        self.dmsmirror._dms_client.get_versions.__name__ = "get_versions"
+        self.dmsmirror._dms_client.get_artifacts = unittest.mock.MagicMock(return_value=[{"type": "distribution"}])
+        self.dmsmirror._dms_client.get_artifacts.__name__ = "get_artifacts"
+        self.dmsmirror._get_target = unittest.mock.MagicMock(
+                side_effect=lambda artifact, component, version, params: (f"g:a:{version}:zip", "distribution", params))
+        self.dmsmirror.load_component_state = unittest.mock.MagicMock(return_value={"revoked_versions": ["2"]})
+
+        _inventory = self.dmsmirror.inventory_component(_component, _params)
+        self.assertIsNone(_inventory["error"])
+        self.assertEqual(_inventory["targets"], [("g:a:1:zip", "1", "distribution")])
+        self.dmsmirror._mvn_client.exists.assert_not_called()
+
+    def test_list_mvn_group(self):
+        self.dmsmirror._mvn_client.ls = unittest.mock.MagicMock(return_value=[
+            "g:a:1:zip", "g:a:1:pom", "g:a:1:zip.sha1", "g:a:1", "g.sub:a:1:zip", "g:a:1:txt:notes"])
+
+        self.assertEqual(self.dmsmirror.list_mvn_group("g"), {"g:a:1:zip", "g:a:1:txt:notes"})
+        self.dmsmirror._mvn_client.ls.assert_called_once_with("g", repo=self.args.mvn_download_repo)
+
+    def test_run_reconcile(self):
+        _components = list(self.dmsmirror._components.keys())
+        self.dmsmirror.summary = dict()
+        self.dmsmirror._dms_client.get_components = Mock(
+                return_value=list(map(lambda x: {"id": x}, _components + ["registered", "unknown"])))
+        self.dmsmirror._dms_client.get_components.__name__ = "get_components"
+        self.dmsmirror._get_citypedms = Mock(side_effect=lambda x: {"dms_id": x} if x == "registered" else None)
+        self.dmsmirror._generate_component_config = Mock(return_value={"ci_type": "CITYPE"})
+        self.dmsmirror.inventory_component = Mock(side_effect=lambda component, params: {
+            "component": component, "error": None,
+            "targets": [(f"g.{component}:a:1:zip", "1", "distribution"), ("g.shared:a:1:zip", "1", "distribution")]
+            if component == "registered" else list()})
+        self.dmsmirror.list_mvn_group = Mock(side_effect=lambda x: {"g.shared:a:1:zip", "g.shared:a:0:zip"})
+
+        with unittest.mock.patch("multiprocessing.Pool") as _pool, \
+                unittest.mock.patch("sys.stdout", new_callable=io.StringIO) as _stdout:
+            _pool.return_value.__enter__.return_value.starmap = lambda f, x: list(map(lambda y: f(*y), x))
+            self.assertEqual(self.dmsmirror.run_reconcile(_components), [])
+
+        # default structlog output goes to standard output too
+        _lines = list(map(json.loads, filter(lambda x: x.startswith('{"status"'), _stdout.getvalue().splitlines())))
+        self.assertEqual(_lines, [
+            {"status": "missing", "gav": "g.registered:a:1:zip", "component": "registered", "version": "1",
+             "artifact_type": "distribution"},
+            {"status": "orphaned", "gav": "g.shared:a:0:zip", "component": None},
+            {"status": "unregistered", "component": "unknown"}])
+        self.assertEqual(self.dmsmirror.summary["missing"], 1)
+        self.assertEqual(self.dmsmirror.inventory_component.call_count, len(_components) + 1)
+        self.assertEqual(sorted(map(lambda x: x.args[0], self.dmsmirror.list_mvn_group.call_args_list)),
+                         ["g.registered", "g.shared"])
+
     def test_get_static_ci_type(self):
         self.assertEqual(self.dmsmirror._get_static_ci_type("documentation"), self.args.ci_type_documentation)
         self.assertEqual(self.dmsmirror._get_static_ci_type("notes"), self.args.ci_type_release_notes)
@@ -696,6 +1415,242 @@ class DmsMirrorV3TestSuite(DmsMirrorV2TestSuite):
         self.dmsmirror._mvn_client.upload.assert_called_once_with(
                 _tgt_gav, repo=self.args.mvn_upload_repo, data=unittest.mock.ANY, pom=True)
         
+    def _mock_download(self, content, error=None, headers=dict()):
+        def _download_component(*args, write_to):
+            write_to.write(content)
+            if error:
+                raise error
+
+            return unittest.mock.Mock(headers=headers)
+
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock(side_effect=_download_component)
+
+    def test_download_from_dms_resumed(self):
+        _artifact = {"type": "distribution", "id": 10}
+        self._mock_download(b"abc", ProtocolError("Connection broken"))
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(return_value=unittest.mock.Mock(
+            status_code=206, raw=io.BytesIO(b"def"), headers={"Content-Range": "bytes 3-5/6"}))
+
+        with tempfile.TemporaryFile(mode='w+b') as _file, unittest.mock.patch("time.sleep") as _sleep:
+            self.dmsmirror._download_from_dms("component", "1", _artifact, _file)
+            _file.seek(0, os.SEEK_SET)
+            self.assertEqual(_file.read(), b"abcdef")
+
+        self.dmsmirror._dms_client.download_component.assert_called_once_with(
+                "component", "1", 10, write_to=unittest.mock.ANY)
+        self.dmsmirror._dms_client.get.assert_called_once_with(
+                ['components', 'component', 'versions', '1', 'artifacts', '10', 'download'],
+                headers={"Range": "bytes=3-"}, stream=True)
+        _sleep.assert_called_once()
+
+    def test_download_from_dms_ranges_unsupported(self):
+        _artifact = {"type": "distribution", "id": 10}
+        # stream ended silently before Content-Length
+        self._mock_download(b"abc", headers={"Content-Length": "6"})
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(return_value=unittest.mock.Mock(
+            status_code=200, raw=io.BytesIO(b"abcdef"), headers={"Content-Length": "6"}))
+
+        with tempfile.TemporaryFile(mode='w+b') as _file, unittest.mock.patch("time.sleep"):
+            self.dmsmirror._download_from_dms("component", "1", _artifact, _file)
+            _file.seek(0, os.SEEK_SET)
+            self.assertEqual(_file.read(), b"abcdef")
+
+    def test_download_from_dms_retries_exceeded(self):
+        _artifact = {"type": "distribution", "id": 10}
+        self.dmsmirror._args.retries_count = 2
+        self._mock_download(b"abc", ProtocolError("Connection broken"))
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(side_effect=ProtocolError("Connection broken"))
+
+        with tempfile.TemporaryFile(mode='w+b') as _file, unittest.mock.patch("time.sleep"):
+            with self.assertRaises(ProtocolError):
+                self.dmsmirror._download_from_dms("component", "1", _artifact, _file)
+
+        self.dmsmirror._dms_client.get.assert_called_once()
+
+    def test_copy_artifact_multipart(self):
+        _content = bytes(range(256)) * 40
+        _artifact = {"type": "distribution", "id": 10}
+        _tgt_gav = f"{self.args.mvn_prefix}.component:component:1:pkg"
+
+        def _get(req, headers, stream):
+            _start, _end = map(int, headers["Range"].split("=").pop().split("-"))
+            return unittest.mock.Mock(status_code=206, raw=io.BytesIO(_content[_start:_end + 1]),
+                                      headers={"Content-Range": f"bytes {_start}-{_end}/{len(_content)}"})
+
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(side_effect=_get)
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock(return_value="OK")
+        self.dmsmirror._mvn_client.upload = unittest.mock.MagicMock(
+                side_effect=lambda *args, data, **kwargs: self.assertEqual(data.read(), _content))
+        self.dmsmirror._args.multipart_threshold = 1024
+
+        self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+        self.dmsmirror._dms_client.download_component.assert_not_called()
+        # size probe and parts
+        self.assertEqual(self.dmsmirror._dms_client.get.call_count, 1 + self.args.multipart_parts)
+        self.dmsmirror._mvn_client.upload.assert_called_once()
+
+        # small artifact: single stream
+        self.dmsmirror._dms_client.get.reset_mock()
+        self.dmsmirror._args.multipart_threshold = len(_content) + 1
+        self.dmsmirror._mvn_client.upload = unittest.mock.MagicMock()
+        self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+        self.assertEqual(self.dmsmirror._dms_client.get.call_count, 1)
+        self.dmsmirror._dms_client.download_component.assert_called_once()
+
+    def test_copy_artifact_throttled(self):
+        _artifact = {"type": "distribution", "id": 10}
+        _tgt_gav = f"{self.args.mvn_prefix}.component:component:1:pkg"
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock(
+                side_effect=lambda *args, write_to: write_to.write(b"content"))
+        self.dmsmirror._dms_client.download_component.__name__ = 'download_component'
+        self.dmsmirror._mvn_client.upload = unittest.mock.MagicMock(
+                side_effect=lambda *args, data, **kwargs: self.assertEqual(data.read(), b"content"))
+
+        with tempfile.TemporaryDirectory() as _throttle_dir:
+            self.dmsmirror._args.throttle_dir = _throttle_dir
+            self.dmsmirror._args.download_rate = 1024
+            self.dmsmirror._args.upload_rate = 1024
+            self.dmsmirror._args.max_downloads = 1
+            self.dmsmirror._args.max_uploads = 1
+            self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+            self.assertTrue(os.path.exists(os.path.join(_throttle_dir, "download.bucket")))
+            self.assertTrue(os.path.exists(os.path.join(_throttle_dir, "upload.slots", "slot-0")))
+
+        self.assertIsInstance(
+                self.dmsmirror._dms_client.download_component.call_args.kwargs["write_to"], ThrottledFile)
+        self.dmsmirror._mvn_client.upload.assert_called_once()
+
+    def test_backend_call_adaptive(self):
+        metrics.clear()
+
+        with tempfile.TemporaryDirectory() as _throttle_dir:
+            self.dmsmirror._args.throttle_dir = _throttle_dir
+            self.dmsmirror._args.adaptive_max_calls = 8
+            self.dmsmirror._args.adaptive_min_calls = 1
+            self.dmsmirror._args.retries_count = 1
+
+            with self.assertRaises(HttpAPIError):
+                self.dmsmirror._make_dms_api_call_with_retries(
+                        Mock(side_effect=HttpAPIError(503, "url", None, "throttled"), __name__="get_versions"))
+
+            self.assertEqual(self.dmsmirror._get_adaptive_limiter("dms").limit, 4)
+            self.assertEqual(metrics.get("adaptive_limit", backend="dms"), 4)
+            self.assertEqual(metrics.get("adaptive_decreases_total", backend="dms", reason="error"), 1)
+
+            # not found is a client error, limit is not decreased
+            with self.assertRaises(HttpAPIError):
+                self.dmsmirror._make_dms_api_call_with_retries(
+                        Mock(side_effect=HttpAPIError(404, "url", None, "not found"), __name__="get_versions"))
+
+            self.assertEqual(self.dmsmirror._get_adaptive_limiter("dms").limit, 4)
+            self.assertEqual(self.dmsmirror._get_adaptive_limiter("nexus").limit, 8)
+
+            # transfers hold no slot, calls are not kept waiting by them
+            self.dmsmirror._args.adaptive_max_calls = 1
+            with self.dmsmirror._backend_call("nexus", transfer=True):
+                with self.dmsmirror._get_adaptive_limiter("nexus").slot():
+                    pass
+
+            with self.assertRaises(HttpAPIError):
+                with self.dmsmirror._backend_call("nexus", transfer=True):
+                    raise HttpAPIError(503, "url", None, "throttled")
+
+            self.assertEqual(metrics.get("adaptive_decreases_total", backend="nexus", reason="error"), 1)
+
+    def test_dms_call_rate_limited(self):
+        with tempfile.TemporaryDirectory() as _throttle_dir:
+            self.dmsmirror._args.throttle_dir = _throttle_dir
+            self.dmsmirror._args.dms_rate = ["versions=2", "default=100"]
+            self.dmsmirror.setup_from_args(self.dmsmirror._args)
+            self.assertEqual(self.dmsmirror._get_dms_bucket("get_artifacts").rate, 100)
+            self.dmsmirror._args.dms_rate = ["versions=2"]
+            self.dmsmirror.setup_from_args(self.dmsmirror._args)
+            self.assertIsNone(self.dmsmirror._get_dms_bucket("get_artifacts"))
+
+            _method = Mock(return_value=["1"], __name__="get_versions")
+            _start = time.time()
+            for _ in range(3):
+                self.assertEqual(self.dmsmirror._make_dms_api_call_with_retries(_method, "component"), ["1"])
+
+            # burst of one second, the third call waits
+            self.assertGreaterEqual(time.time() - _start, 0.4)
+            self.assertTrue(os.path.exists(os.path.join(_throttle_dir, "dms-versions.bucket")))
+
+            # buckets are kept, rejected at start
+            self.assertIs(self.dmsmirror._get_dms_bucket("get_versions"), self.dmsmirror._get_dms_bucket("get_versions"))
+            for _rate in (["versions"], ["versions=fast"], ["versions=0"], ["=1"]):
+                self.dmsmirror._args.dms_rate = _rate
+                with self.assertRaises(ValueError):
+                    self.dmsmirror.setup_from_args(self.dmsmirror._args)
+
+    def test_retry_delay(self):
+        self.assertEqual(self.dmsmirror._get_retry_delay(
+            HttpAPIError(429, "url", Mock(headers={"Retry-After": "5"}), "throttled")), 5)
+        self.assertEqual(self.dmsmirror._get_retry_delay(HttpAPIError(429, "url", None, "throttled")), 30)
+        self.assertEqual(self.dmsmirror._get_retry_delay(
+            HttpAPIError(500, "url", Mock(headers={"Retry-After": "5"}), "failed")), 30)
+
+    def test_copy_artifact_spooled(self):
+        _artifact = {"type": "distribution", "id": 10}
+        _tgt_gav = f"{self.args.mvn_prefix}.component:component:1:pkg"
+        _uploaded = list()
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock(
+                side_effect=lambda *args, write_to: write_to.write(b"content"))
+        self.dmsmirror._mvn_client.upload = unittest.mock.MagicMock(
+                side_effect=lambda *args, data, **kwargs: _uploaded.append((type(data), data.read())))
+
+        with tempfile.TemporaryDirectory() as _spool_dir:
+            self.dmsmirror._args.spool_dir = _spool_dir
+
+            # small artifact is kept in memory
+            self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+            self.assertEqual(_uploaded.pop(), (io.BytesIO, b"content"))
+
+            # disk spool
+            self.dmsmirror._args.spool_memory_threshold = 0
+            self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+            _type, _data = _uploaded.pop()
+            self.assertNotEqual(_type, io.BytesIO)
+            self.assertEqual(_data, b"content")
+
+    def test_copy_artifact_empty(self):
+        _artifact = {"type": "distribution", "id": 10}
+        _tgt_gav = f"{self.args.mvn_prefix}.component:component:1:pkg"
+        _responses = [HttpAPIError(code=503), HttpAPIError(code=416)]
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(side_effect=_responses)
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock(return_value="OK")
+        self.dmsmirror._args.multipart_threshold = 1024
+
+        # the probe is retried, no first byte of empty artifact means size 0
+        with unittest.mock.patch("time.sleep"):
+            self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+
+        self.assertEqual(self.dmsmirror._dms_client.get.call_count, 2)
+        self.dmsmirror._dms_client.download_component.assert_called_once()
+        self.dmsmirror._mvn_client.upload.assert_called_once()
+
+    def test_copy_artifact_spool_not_admitted(self):
+        _artifact = {"type": "distribution", "id": 10}
+        _tgt_gav = f"{self.args.mvn_prefix}.component:component:1:pkg"
+        self.dmsmirror._dms_client.get = unittest.mock.MagicMock(return_value=unittest.mock.Mock(
+            status_code=206, headers={"Content-Range": "bytes 0-0/%d" % (2 * 1024 * 1024)}))
+        self.dmsmirror._dms_client.download_component = unittest.mock.MagicMock()
+        self.dmsmirror._args.spool_min_free = 1 << 62
+
+        with unittest.mock.patch("time.sleep"), self.assertRaises(TimeoutError):
+            self.dmsmirror._copy_artifact("component", "1", _artifact, _tgt_gav)
+
+        self.dmsmirror._dms_client.download_component.assert_not_called()
+        self.dmsmirror._mvn_client.upload.assert_not_called()
+
+    def test_process_component_webhooks(self):
+        self.dmsmirror.process_component_webhook = unittest.mock.MagicMock(
+                side_effect=[None, ValueError("Missing or invalid componentVersion in payload"), KeyError()])
+
+        self.assertEqual(self.dmsmirror.process_component_webhooks([{"n": 1}, {"n": 2}, {"n": 3}]),
+                         [None, "Missing or invalid componentVersion in payload", "KeyError()"])
+        self.dmsmirror.process_component_webhook.assert_has_calls([call({"n": 1}), call({"n": 2}), call({"n": 3})])
+
     def test_process_component_webhook__ok(self):
         self.dmsmirror.process_artifact = unittest.mock.MagicMock(return_value=None)
         self.dmsmirror.register_component = unittest.mock.MagicMock(return_value=None)
@@ -727,6 +1682,78 @@ class DmsMirrorV3TestSuite(DmsMirrorV2TestSuite):
         ]
         self.dmsmirror.process_artifact.assert_has_calls(expected_calls)
 
+    def test_process_artifacts_concurrent(self):
+        _barrier = threading.Barrier(2, timeout=5)
+        # both artifacts are in progress at the same time, otherwise barrier is broken
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(side_effect=lambda *args: _barrier.wait() and None)
+        self.dmsmirror._args.webhook_artifact_workers = 2
+
+        self.assertIsNone(self.dmsmirror.process_artifacts(["a1", "a2"], "component", "1"))
+        self.dmsmirror.process_artifact.assert_has_calls(
+                [call("a1", "component", "1"), call("a2", "component", "1")], any_order=True)
+
+    def test_process_artifacts_errors(self):
+        self.dmsmirror._args.webhook_artifact_workers = 2
+
+        # all artifacts are processed, the only error is raised as is
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(side_effect=[None, KeyError("type"), None])
+        with self.assertRaises(KeyError):
+            self.dmsmirror.process_artifacts(["a1", "a2", "a3"], "component", "1")
+
+        self.assertEqual(self.dmsmirror.process_artifact.call_count, 3)
+
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(side_effect=[KeyError("type"), None, ValueError()])
+        with self.assertRaises(Exception) as ctx:
+            self.dmsmirror.process_artifacts(["a1", "a2", "a3"], "component", "1")
+
+        self.assertIn("[2] of [3] artifacts of [component:1] failed", str(ctx.exception))
+
+    def _make_event(self, event_type, **kwargs):
+        return dict({
+            'type': event_type,
+            'componentVersion': {'component': 'test-component', 'version': '1.0.0'}}, **kwargs)
+
+    def test_process_component_webhook__register_artifact(self):
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(return_value=None)
+        self.dmsmirror._args.auto_register_component = False
+        _artifact = {"id": 3, "type": "notes"}
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.dmsmirror.save_component_state("test-component", {"deleted_artifacts": {"1.0.0": ["2", "3"]}})
+            self.dmsmirror.process_component_webhook(
+                    self._make_event("REGISTER_COMPONENT_VERSION_ARTIFACT", artifact=_artifact))
+            # registered again: not deleted anymore
+            self.assertEqual(self.dmsmirror.load_component_state("test-component"),
+                             {"deleted_artifacts": {"1.0.0": ["2"]}})
+
+        self.dmsmirror.process_artifact.assert_called_once_with(_artifact, "test-component", "1.0.0")
+
+        with self.assertRaises(ValueError):
+            self.dmsmirror.process_component_webhook(self._make_event("REGISTER_COMPONENT_VERSION_ARTIFACT"))
+
+    def test_process_component_webhook__delete_and_revoke(self):
+        self.dmsmirror.process_artifact = unittest.mock.MagicMock(return_value=None)
+        self.dmsmirror._args.auto_register_component = False
+
+        with tempfile.TemporaryDirectory() as _state_dir:
+            self.dmsmirror._args.state_dir = _state_dir
+            self.dmsmirror.process_component_webhook(self._make_event(
+                "DELETE_COMPONENT_VERSION_ARTIFACT", artifact={"type": "notes", "name": "n", "classifier": None}))
+            self.dmsmirror.process_component_webhook(self._make_event("REVOKE_COMPONENT_VERSION"))
+            self.assertEqual(self.dmsmirror.load_component_state("test-component"), {
+                "deleted_artifacts": {"1.0.0": ["notes:n:"]}, "revoked_versions": ["1.0.0"]})
+
+            # published again
+            self.dmsmirror.process_component_webhook(self._make_event(
+                "PUBLISH_COMPONENT_VERSION", artifacts=[{"id": 1, "type": "distribution"}]))
+            self.assertEqual(self.dmsmirror.load_component_state("test-component")["revoked_versions"], [])
+            self.dmsmirror.process_artifact.assert_called_once()
+
+        # no state: nothing to remember, not an error
+        self.dmsmirror._args.state_dir = None
+        self.dmsmirror.process_component_webhook(self._make_event("REVOKE_COMPONENT_VERSION"))
+
     def test_process_component_webhook__wrong_event_type(self):
         self.dmsmirror.process_artifact = unittest.mock.MagicMock()
         self.dmsmirror.register_component = unittest.mock.MagicMock()
@@ -943,6 +1970,40 @@ class DmsMirrorV3TestSuite(DmsMirrorV2TestSuite):
         self.assertEqual(register_payload["is_deliverable"], False)
         self.assertEqual(register_payload["dms_id"], "test-component")
 
+    def test_get_components_config(self):
+        _configured = list(self.dmsmirror._components.keys()).pop()
+        _citypes = {
+            "registered": {"dms_id": "registered", "ci_type_id": "REGISTERED"},
+            "other": {"dms_id": "other", "ci_type_id": "OTHER"}}
+
+        def _get_citypedms(component):
+            if component == "failed":
+                raise HttpAPIError(code=500)
+
+            if component not in _citypes:
+                raise HttpAPIError(code=404)
+
+            return _citypes[component]
+
+        self.dmsmirror.pg_client.get_citypedms_by_dms_id = Mock(side_effect=_get_citypedms)
+        self.dmsmirror._dms_client.get_components = Mock(return_value=[{"id": "registered", "clientCode": "CLIENT"}])
+        self.dmsmirror._dms_client.get_components.__name__ = "get_components"
+        self.dmsmirror._args.batch_workers = 2
+
+        _result = list(self.dmsmirror.get_components_config(
+            [_configured, "registered", "missing", "failed", "other", "registered"]))
+        self.assertEqual(list(map(lambda x: x[0], _result)), [_configured, "registered", "missing", "failed", "other"])
+        self.assertEqual(_result[0], (_configured, self.dmsmirror._components[_configured], None))
+        self.assertEqual(_result[1][1]["ci_type"], "REGISTERED")
+        self.assertIn(".CLIENT.REGISTERED:", _result[1][1]["tgtGavTemplate"]["distribution"])
+        self.assertEqual(_result[2], ("missing", None, None))
+        self.assertIsNone(_result[3][1])
+        self.assertIn("HttpAPIError", _result[3][2])
+        self.assertEqual(_result[4][1]["ci_type"], "OTHER")
+        # shared catalog, unique registrations
+        self.dmsmirror._dms_client.get_components.assert_called_once()
+        self.assertEqual(self.dmsmirror.pg_client.get_citypedms_by_dms_id.call_count, 4)
+
     def test_register_component__component_registered(self):
         self.dmsmirror.pg_client.get_citypedms_by_dms_id = Mock(
             return_value=Mock(status_code=200)
@@ -1053,4 +2114,58 @@ class DmsMirrorV3TestSuite(DmsMirrorV2TestSuite):
         self.dmsmirror.register_component(payload=payload)
 
         self.dmsmirror.pg_client.get_citypedms_by_dms_id.assert_called_once_with("test-component")
-        self.dmsmirror.pg_client.post_new_component.assert_not_called()
\ No newline at end of file
+        self.dmsmirror.pg_client.post_new_component.assert_not_called()
+
+class DmsMirrorReplayTestSuite(DmsMirrorTestBase):
+    """
+    Performance regression tests: traffic in --traffic-record format is replayed with its timings,
+    requests made for each artifact and wall-clock time are checked
+    'traffic.jsonl' is a hand-written fixture, not a captured production trace
+    """
+    def setUp(self):
+        super().setUp()
+        self.args.dms_api_version = 3
+        self.dmsmirror.setup_from_args(self.args)
+        self.dmsmirror._dms_client = self.dmsmirror._get_dms_client()
+        self.dmsmirror._mvn_client = self.dmsmirror._get_mvn_client()
+
+        with open(self.args.config_file, mode='rt') as _config:
+            self.dmsmirror._components = json.load(_config)
+
+        _resources = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'resources')
+        self.records = load_records(os.path.join(_resources, 'traffic.jsonl'))
+
+        # bodies are not recorded, JSON ones are kept aside
+        with open(os.path.join(_resources, 'traffic_bodies.json'), mode='rt') as _bodies:
+            _bodies = dict((tuple(_k.split(" ", 1)), json.dumps(_v).encode())
+                           for _k, _v in json.load(_bodies).items())
+
+        self.adapters = dict()
+        for _backend, _client in [("dms", self.dmsmirror._dms_client), ("mvn", self.dmsmirror._mvn_client)]:
+            self.adapters[_backend] = ReplayAdapter(
+                list(filter(lambda x: x["backend"] == _backend, self.records)), bodies=_bodies)
+            self.adapters[_backend].mount(_client.web)
+
+    def test_replay(self):
+        _started = time.monotonic()
+        self.assertIsNone(self.dmsmirror.process_component("component"))
+        _elapsed = time.monotonic() - _started
+
+        for _adapter in self.adapters.values():
+            self.assertEqual(_adapter.unexpected, list())
+
+        # 2 versions of 2 artifacts each
+        _artifacts = 4
+        _dms = self.adapters["dms"]
+        _prefix = "/dms-service/rest/api/3/components/component/versions"
+        self.assertEqual(_dms.count("GET", _prefix), 1 + 2 + _artifacts * 2)
+        self.assertEqual(len(list(filter(lambda x: x[1].endswith("/download"), _dms.calls))), _artifacts)
+        _mvn = self.adapters["mvn"]
+        self.assertEqual(_mvn.count("HEAD"), _artifacts * 2)
+        self.assertEqual(_mvn.count("PUT"), _artifacts * 2)
+        self.assertEqual(self.dmsmirror.queue_client.register_file.call_count, _artifacts)
+
+        # sequential processing takes the time recorded, with a margin for the processing itself
+        _recorded = sum(map(lambda x: x["elapsed"], self.records))
+        self.assertGreaterEqual(_elapsed, _recorded * 0.9)
+        self.assertLess(_elapsed, _recorded + 2)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import unittest
+from .. import errors
+from ..lease import LeaseHeld, LeaseLost
+from oc_cdtapi.API import HttpAPIError
+from requests.exceptions import ConnectionError
+
+class ErrorsTestSuite(unittest.TestCase):
+    def test_annotate(self):
+        _error = ValueError("test")
+        errors.annotate(_error, artifact="10")
+        # the innermost context is kept
+        errors.annotate(_error, artifact="other", version="1")
+        _record = errors.make_record(_error, "component", "message")
+        self.assertEqual(_record, {"class": "ValueError", "backend": None, "component": "component", "version": "1",
+                                   "artifact": "10", "retriable": False, "message": "message"})
+
+    def test_is_retriable(self):
+        self.assertTrue(errors.is_retriable(HttpAPIError(503)))
+        self.assertTrue(errors.is_retriable(HttpAPIError(429)))
+        self.assertFalse(errors.is_retriable(HttpAPIError(404)))
+        self.assertTrue(errors.is_retriable(ConnectionError()))
+        self.assertTrue(errors.is_retriable(TimeoutError()))
+        self.assertTrue(errors.is_retriable(LeaseHeld()))
+        self.assertTrue(errors.is_retriable(LeaseLost()))
+        self.assertFalse(errors.is_retriable(KeyError("tgtGavTemplate")))
+
+    def test_thresholds(self):
+        _error = HttpAPIError(503)
+        errors.annotate(_error, backend="dms")
+        _records = [errors.make_record(_error, "c1", "m1"), errors.make_record(KeyError("key"), "c2", "m2")]
+        _counts = errors.count_records(_records)
+        self.assertEqual(_counts, {"total": 2, "retriable": 1, "permanent": 1,
+                                   "by_class": {"HttpAPIError": 1, "KeyError": 1},
+                                   "by_backend": {"dms": 1, "none": 1}})
+        self.assertEqual(errors.exceeded_threshold(_counts, {"dms": 1}), "dms=1")
+
+        self.assertEqual(errors.parse_thresholds(["total=3", "KeyError=1"]), {"total": 3, "KeyError": 1})
+        self.assertIsNone(errors.exceeded_threshold(_counts, {"total": 3}))
+        self.assertEqual(errors.exceeded_threshold(_counts, {"total": 3, "KeyError": 1}), "KeyError=1")
+        self.assertEqual(errors.exceeded_threshold(_counts, {"permanent": 1}), "permanent=1")
+
+        for _threshold in ["total", "total=", "=1", "total=0", "total=x"]:
+            with self.assertRaises(ValueError):
+                errors.parse_thresholds([_threshold])
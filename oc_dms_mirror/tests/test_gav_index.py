@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import unittest
+from ..gav_index import GavIndex, compile_template
+
+class GavIndexTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.index = GavIndex("com.example", {"notes": "RELEASENOTES"})
+        self.index.add_component("component", {
+            "ci_type": "COMPONENTDSTR",
+            "tgtGavTemplate": {
+                "notes": "\\$prefix.release_notes:component\\$c_hyphen:\\$v:\\$p",
+                "distribution": "\\$prefix.component:\\$n:\\$v:\\$p\\$c_colon"}})
+        self.index.add_component("component-ext", {
+            "ci_type": "COMPONENTEXT",
+            "tgtGavTemplate": {"distribution": "\\$prefix.component.ext:\\$n:\\$v:\\$p"}})
+
+    def test_compile_template(self):
+        _literal, _regexp = compile_template("\\$prefix.component:\\$n:\\$v:\\$p\\$c_colon", "com.example")
+        self.assertEqual(_literal, "com.example.component:")
+        self.assertTrue(_regexp.fullmatch("com.example.component:name:1.0:zip"))
+        self.assertTrue(_regexp.fullmatch("com.example.component:name:1.0:zip:linux"))
+        self.assertFalse(_regexp.fullmatch("com.example.other:name:1.0:zip"))
+
+        _literal, _regexp = compile_template("$n:$v", "com.example")
+        self.assertEqual(_literal, "")
+
+        with self.assertRaises(ValueError):
+            compile_template("$prefix:$", "com.example")
+
+    def test_find(self):
+        self.assertEqual(self.index.find("com.example.component:name:1.0:zip"), [
+            {"component": "component", "artifact_type": "distribution", "ci_type": "COMPONENTDSTR"}])
+        self.assertEqual(self.index.find("com.example.release_notes:component-en:1.0:pdf"), [
+            {"component": "component", "artifact_type": "notes", "ci_type": "RELEASENOTES"}])
+        # the longest literal prefix goes first
+        self.assertEqual(self.index.find("com.example.component.ext:name:1.0:zip"), [
+            {"component": "component-ext", "artifact_type": "distribution", "ci_type": "COMPONENTEXT"}])
+        self.assertEqual(self.index.find("com.example.other:name:1.0:zip"), [])
+
+    def test_find_generic(self):
+        self.index.add_generic({
+            "ci_type": "$component",
+            "tgtGavTemplate": {
+                "distribution": "$prefix.$client.$component:\\$n\\$c_hyphen:\\$v:\\$p"}})
+        self.assertEqual(self.index.find("com.example.client.registered:name:1.0:zip"), [
+            {"component": None, "artifact_type": "distribution", "ci_type": "registered"}])
+        self.assertEqual(self.index.find("com.example.registered:name:1.0:zip"), [
+            {"component": None, "artifact_type": "distribution", "ci_type": "registered"}])
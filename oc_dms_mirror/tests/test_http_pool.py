@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import unittest
+import unittest.mock
+from .. import http_pool
+from ..metrics import metrics
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpPoolTestSuite(unittest.TestCase):
+    def setUp(self):
+        metrics.clear()
+        http_pool._adapters.clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        http_pool._adapters.clear()
+
+    def test_shared_between_sessions(self):
+        _sessions = list(http_pool.mount(requests.Session(), "test") for _ in range(2))
+        self.assertIs(_sessions[0].get_adapter(self.url), _sessions[1].get_adapter(self.url))
+
+        for _session in _sessions:
+            self.assertEqual(_session.get(self.url).content, b"ok")
+
+        self.assertEqual(http_pool.stats("test"), {"new": 1, "reused": 1})
+        self.assertIsNot(http_pool.get_adapter("other"), _sessions[0].get_adapter(self.url))
+
+    def test_retries_kept(self):
+        _session = requests.Session()
+        _session.mount("https://", requests.adapters.HTTPAdapter(max_retries=3))
+        http_pool.mount(_session, "test")
+        self.assertEqual(_session.get_adapter(self.url).max_retries.total, 3)
+
+    def test_forked(self):
+        _session = http_pool.mount(requests.Session(), "test")
+        _session.get(self.url)
+        _poolmanager = _session.get_adapter(self.url).poolmanager
+
+        with unittest.mock.patch("os.getpid", return_value=os.getpid() + 1):
+            _session.get(self.url)
+
+        # pools inherited are not used in a child
+        self.assertIsNot(_session.get_adapter(self.url).poolmanager, _poolmanager)
+        self.assertEqual(http_pool.stats("test"), {"new": 2, "reused": 0})
+
+        http_pool._reset_after_fork()
+        self.assertIsNot(http_pool.get_adapter("test"), _session.get_adapter(self.url))
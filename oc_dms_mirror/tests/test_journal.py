@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+import unittest
+from ..journal import Journal
+
+class JournalTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.directory.name, "journal"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_progress(self):
+        self.assertEqual(self.journal.load("c1"), (set(), False))
+        self.journal.version_done("c1", "1")
+        self.journal.version_done("c1", "2")
+        self.assertEqual(self.journal.load("c1"), ({"1", "2"}, False))
+        self.journal.component_done("c1")
+        # shared with another instance, i.e. the next run
+        self.assertEqual(Journal(self.journal.directory).load("c1"), ({"1", "2"}, True))
+        self.assertEqual(self.journal.load("c2"), (set(), False))
+
+        self.journal.clear()
+        self.assertEqual(self.journal.load("c1"), (set(), False))
+        self.journal.clear()
+
+    def test_torn_line(self):
+        self.journal.version_done("c1", "1")
+
+        with open(os.path.join(self.journal.directory, "c1.journal"), mode='at') as _journal:
+            _journal.write('{"vers')
+
+        self.assertEqual(self.journal.load("c1"), ({"1"}, False))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import time
+
+import unittest
+import unittest.mock
+from ..lease import Lease, LeaseLost, FileLeaseBackend
+
+# disable extra logging
+import logging
+logging.getLogger().propagate = False
+logging.getLogger().disabled = True
+
+class FileLeaseBackendTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.backend = FileLeaseBackend(self.directory.name)
+        self.key = "com.example.component:component:1.0:zip"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_acquire_release(self):
+        self.assertTrue(self.backend.acquire(self.key, "owner1", 60))
+        # re-entrant for the same owner
+        self.assertTrue(self.backend.acquire(self.key, "owner1", 60))
+        self.assertFalse(self.backend.acquire(self.key, "owner2", 60))
+        # other keys are independent
+        self.assertTrue(self.backend.acquire("other", "owner2", 60))
+
+        # release by non-owner is ignored
+        self.backend.release(self.key, "owner2")
+        self.assertFalse(self.backend.acquire(self.key, "owner2", 60))
+
+        self.backend.release(self.key, "owner1")
+        self.assertTrue(self.backend.acquire(self.key, "owner2", 60))
+
+    def test_expired(self):
+        self.assertTrue(self.backend.acquire(self.key, "owner1", 0))
+        self.assertTrue(self.backend.acquire(self.key, "owner2", 60))
+        self.assertFalse(self.backend.renew(self.key, "owner1", 60))
+        self.assertTrue(self.backend.renew(self.key, "owner2", 60))
+
+    def test_files_removed(self):
+        self.assertTrue(self.backend.acquire(self.key, "owner1", 60))
+        self.assertTrue(self.backend.acquire("expired", "owner1", 0))
+        self.assertFalse(self.backend.renew("never-taken", "owner1", 60))
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+        self.assertEqual(self.backend.collect(), 1)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+        self.backend.release(self.key, "owner1")
+        self.assertEqual(os.listdir(self.directory.name), list())
+        self.assertTrue(self.backend.acquire(self.key, "owner2", 60))
+
+    def test_lease_lost(self):
+        _lease = Lease(self.backend, self.key, 60)
+
+        with _lease as _acquired:
+            self.assertTrue(_acquired)
+            _lease.check()
+            # expired and taken over by another instance
+            self.backend.release(self.key, _lease.owner)
+            self.assertTrue(self.backend.acquire(self.key, "other", 60))
+
+            with self.assertRaises(LeaseLost):
+                _lease.check()
+
+            self.assertTrue(_lease.lost)
+
+        # the lease of the other instance is not released
+        self.assertFalse(self.backend.acquire(self.key, "another", 60))
+
+    def test_lease_heartbeat(self):
+        _lease = Lease(self.backend, self.key, 0.3)
+
+        with _lease as _acquired:
+            self.assertTrue(_acquired)
+            # heartbeat keeps the lease longer than its ttl
+            time.sleep(0.5)
+            self.assertFalse(self.backend.acquire(self.key, "other", 60))
+            self.assertFalse(_lease.lost)
+
+        self.assertTrue(self.backend.acquire(self.key, "other", 60))
+
+    def test_lease_busy(self):
+        self.assertTrue(self.backend.acquire(self.key, "other", 60))
+        _lease = Lease(self.backend, self.key, 60)
+
+        with _lease as _acquired:
+            self.assertFalse(_acquired)
+
+        # busy lease is not released on exit
+        self.assertFalse(self.backend.acquire(self.key, "another", 60))
+
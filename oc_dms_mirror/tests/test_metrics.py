@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import time
+import urllib.request
+import urllib.error
+
+import unittest
+from ..metrics import Metrics, metrics, serve_metrics
+
+class MetricsTestSuite(unittest.TestCase):
+    def test_render(self):
+        _metrics = Metrics()
+        self.assertEqual(_metrics.render(), "\n")
+
+        _metrics.inc("events_total", type="PUBLISH")
+        _metrics.inc("events_total", 2, type="PUBLISH")
+        _metrics.inc("events_total", type='"quoted"')
+        _metrics.set("daemon_components", 5)
+        self.assertEqual(_metrics.get("events_total", type="PUBLISH"), 3)
+        self.assertEqual(_metrics.get("missing_total"), 0)
+        self.assertEqual(_metrics.render().splitlines(), [
+            "# TYPE dms_mirror_daemon_components gauge",
+            "dms_mirror_daemon_components 5",
+            "# TYPE dms_mirror_events_total counter",
+            'dms_mirror_events_total{type="\\"quoted\\""} 1',
+            'dms_mirror_events_total{type="PUBLISH"} 3'])
+
+    def test_shared(self):
+        with tempfile.TemporaryDirectory() as _directory:
+            # another worker
+            _other = Metrics()
+            _other.directory = _directory
+            _other.inc("events_total", 2, type="PUBLISH")
+            _other.set("daemon_components", 7)
+            _other.write()
+            os.rename(os.path.join(_directory, f"{os.getpid()}.json"), os.path.join(_directory, "1.json"))
+
+            _metrics = Metrics()
+            _metrics.share(_directory, interval=0.01)
+            _metrics.inc("events_total", type="PUBLISH")
+            _metrics.set("daemon_components", 5)
+            self.assertEqual(_metrics.render().splitlines(), [
+                "# TYPE dms_mirror_daemon_components gauge",
+                "dms_mirror_daemon_components 7",
+                "# TYPE dms_mirror_events_total counter",
+                'dms_mirror_events_total{type="PUBLISH"} 3'])
+
+            # own values are written in background
+            _written = list()
+            for _ in range(100):
+                time.sleep(0.01)
+                with open(os.path.join(_directory, f"{os.getpid()}.json"), mode='rt') as _file:
+                    _written = json.load(_file)
+
+                if len(_written) == 2:
+                    break
+
+            _metrics._writer_pid = None
+            self.assertIn(["events_total", [["type", "PUBLISH"]], 1], _written)
+
+    def test_serve_metrics(self):
+        metrics.inc("components_processed_total")
+        _server = serve_metrics("127.0.0.1:0")
+
+        try:
+            _url = f"http://127.0.0.1:{_server.server_address[1]}"
+            with urllib.request.urlopen(f"{_url}/metrics") as _response:
+                self.assertIn("dms_mirror_components_processed_total", _response.read().decode("utf-8"))
+
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{_url}/other")
+        finally:
+            _server.shutdown()
+            _server.server_close()
@@ -2,6 +2,7 @@ import json
 
 from ..rest_api.app import create_app
 from .config import TestConfig
+from ..metrics import metrics
 import unittest
 
 # disable extra logging output
@@ -113,4 +114,104 @@ class RestApiTestSuite(unittest.TestCase):
                 "clientCode": "test-component"
             }
             response = self.test_client.post("/get-gav", json=data)
-            self.assertEqual(response.status_code, 400)
\ No newline at end of file
+            self.assertEqual(response.status_code, 400)
+
+    def test_plan_ok(self):
+        with unittest.mock.patch('oc_dms_mirror.rest_api.app.routes.DmsMirrorBlueprint.get_dms_mirror') as _get_dms_mirror:
+            _dmsMirror = unittest.mock.MagicMock()
+            _plan = {"component": "test-component", "error": None, "actions": [
+                {"action": "copy", "component": "test-component", "version": "1.0", "gav": "g:a:1.0:zip"}]}
+            _dmsMirror.plan_component.return_value = _plan
+            _get_dms_mirror.return_value = _dmsMirror
+            self.create_app()
+
+            response = self.test_client.post("/plan", json={"componentId": "test-component", "version": "1.0"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data), _plan)
+            _dmsMirror.plan_component.assert_called_once_with("test-component", ["1.0"])
+
+            response = self.test_client.post("/plan", json={"version": "1.0"})
+            self.assertEqual(response.status_code, 400)
+
+    def test_reload_config(self):
+        with unittest.mock.patch('oc_dms_mirror.rest_api.app.routes.DmsMirrorBlueprint.get_dms_mirror') as _get_dms_mirror:
+            _dmsMirror = unittest.mock.MagicMock()
+            _dmsMirror.get_component_config.return_value = {"ci_type": "test-component"}
+            _reloaded = unittest.mock.MagicMock()
+            _reloaded.get_component_config.return_value = {"ci_type": "test-component"}
+            _dmsMirror.reloaded.return_value = _reloaded
+            _get_dms_mirror.return_value = _dmsMirror
+            self.create_app()
+            _blueprint = self.test_client.application.view_functions['dms_mirror.healthcheck'].__self__
+
+            self.test_client.post("/get-gav", json={"componentId": "test-component"})
+            _dmsMirror.get_component_config.assert_called_once_with("test-component")
+
+            _blueprint.reload_config()
+            response = self.test_client.post("/get-gav", json={"componentId": "test-component"})
+            self.assertEqual(response.status_code, 200)
+            _reloaded.get_component_config.assert_called_once_with("test-component")
+            _get_dms_mirror.assert_called_once()
+
+    def test_find_component(self):
+        with unittest.mock.patch('oc_dms_mirror.rest_api.app.routes.DmsMirrorBlueprint.get_dms_mirror') as _get_dms_mirror:
+            _dmsMirror = unittest.mock.MagicMock()
+            _matches = [{"component": "test-component", "artifact_type": "distribution", "ci_type": "TEST"}]
+            _dmsMirror.find_component_by_gav.side_effect = lambda gav: _matches if gav == "g:a:1.0:zip" else []
+            _get_dms_mirror.return_value = _dmsMirror
+            self.create_app()
+
+            response = self.test_client.post("/find-component", json={"gav": "g:a:1.0:zip"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json, {"gav": "g:a:1.0:zip", "matches": _matches})
+
+            response = self.test_client.post("/find-component", json={"gav": "g:b:1.0:zip"})
+            self.assertEqual(response.status_code, 404)
+
+            response = self.test_client.post("/find-component", json={})
+            self.assertEqual(response.status_code, 400)
+
+    def test_get_gav_batch(self):
+        with unittest.mock.patch('oc_dms_mirror.rest_api.app.routes.DmsMirrorBlueprint.get_dms_mirror') as _get_dms_mirror:
+            _dmsMirror = unittest.mock.MagicMock()
+            _dmsMirror.get_components_config.return_value = iter([
+                ("c1", {"ci_type": "C1"}, None), ("c2", None, None), ("c3", None, "HttpAPIError(500)")])
+            _get_dms_mirror.return_value = _dmsMirror
+            self.create_app()
+
+            response = self.test_client.post("/get-gav-batch", json={"componentIds": ["c1", "c2", "c3"]})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data), {
+                "c1": {"result": {"ci_type": "C1"}, "error": None},
+                "c2": {"result": None, "error": "gav template for component c2 not found"},
+                "c3": {"result": None, "error": "HttpAPIError(500)"}})
+            _dmsMirror.get_components_config.assert_called_once_with(["c1", "c2", "c3"])
+
+            response = self.test_client.post("/get-gav-batch", json={"componentIds": "c1"})
+            self.assertEqual(response.status_code, 400)
+
+    def test_register_component_version_artifact_batch(self):
+        with unittest.mock.patch('oc_dms_mirror.rest_api.app.routes.DmsMirrorBlueprint.get_dms_mirror') as _get_dms_mirror:
+            _dmsMirror = unittest.mock.MagicMock()
+            _dmsMirror.process_component_webhooks.return_value = [None, "processing failed"]
+            _get_dms_mirror.return_value = _dmsMirror
+            self.create_app()
+
+            data = [{"type": "PUBLISH_COMPONENT_VERSION", "componentVersion": {"component": "c1", "version": "1"}},
+                    {"type": "PUBLISH_COMPONENT_VERSION", "componentVersion": {"component": "c2", "version": "1"}}]
+            response = self.test_client.post("/register-component-version-artifact-batch", json=data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json, [{"result": "Success"}, {"result": "processing failed"}])
+            _dmsMirror.process_component_webhooks.assert_called_once_with(data)
+
+            response = self.test_client.post("/register-component-version-artifact-batch", json=data[0])
+            self.assertEqual(response.status_code, 400)
+
+    def test_metrics(self):
+        self.create_app()
+        metrics.inc("events_total", type="PUBLISH_COMPONENT_VERSION")
+
+        response = self.test_client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertIn('dms_mirror_events_total{type="PUBLISH_COMPONENT_VERSION"}', response.data.decode("utf-8"))
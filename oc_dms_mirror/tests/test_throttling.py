@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+import threading
+import time
+
+import unittest
+import unittest.mock
+from ..throttling import TokenBucket, TransferSlots, ThrottledFile, InflightBudget, AdaptiveLimiter
+
+class ThrottlingTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_token_bucket(self):
+        _bucket = TokenBucket(os.path.join(self.directory.name, "test.bucket"), 1000)
+        _start = time.time()
+        # full bucket: no wait
+        _bucket.consume(1000)
+        self.assertLess(time.time() - _start, 0.2)
+        # empty bucket: wait for refill
+        _bucket.consume(300)
+        self.assertGreaterEqual(time.time() - _start, 0.25)
+
+    def test_token_bucket_shared(self):
+        _path = os.path.join(self.directory.name, "test.bucket")
+        TokenBucket(_path, 1000).consume(1000)
+        # another instance (i.e. another process) sees the same state
+        self.assertGreater(TokenBucket(_path, 1000)._try_consume(500), 0)
+
+    def test_transfer_slots(self):
+        _slots = TransferSlots(os.path.join(self.directory.name, "test.slots"), 2)
+        _other = TransferSlots(os.path.join(self.directory.name, "test.slots"), 2)
+
+        with _slots.slot():
+            with _slots.slot():
+                self.assertIsNone(_other._try_acquire())
+
+            _fd = _other._try_acquire()
+            self.assertIsNotNone(_fd)
+            os.close(_fd)
+
+    def _wait_in_order(self, slots, priorities, delay=0.05):
+        _order = list()
+        _lock = threading.Lock()
+
+        def _wait(priority):
+            with slots.slot(priority):
+                with _lock:
+                    _order.append(priority)
+
+        _threads = list()
+        with slots.slot():
+            # waiters are registered one by one while the only slot is busy
+            for _priority in priorities:
+                _threads.append(threading.Thread(target=_wait, args=(_priority,)))
+                _threads[-1].start()
+                time.sleep(delay)
+
+        for _thread in _threads:
+            _thread.join()
+
+        return _order
+
+    def test_transfer_slots_priority(self):
+        _slots = TransferSlots(os.path.join(self.directory.name, "test.slots"), 1, aging=0)
+        self.assertEqual(self._wait_in_order(_slots, [1, 1, 0]), [0, 1, 1])
+        self.assertEqual(os.listdir(os.path.join(self.directory.name, "test.slots", "waiters")), [])
+
+    def test_transfer_slots_aging(self):
+        # low priority waiter started long before goes first
+        _slots = TransferSlots(os.path.join(self.directory.name, "test.slots"), 1, aging=0.01)
+        self.assertEqual(self._wait_in_order(_slots, [1, 0], delay=0.1), [1, 0])
+
+    def test_transfer_slots_crashed_waiter(self):
+        _slots = TransferSlots(os.path.join(self.directory.name, "test.slots"), 1)
+        _crashed = os.path.join(_slots.directory, "waiters", f"0-{time.time():.6f}-crashed")
+        open(_crashed, mode='w').close()
+
+        with _slots.slot(1):
+            pass
+
+        self.assertFalse(os.path.exists(_crashed))
+
+    def test_throttled_file(self):
+        _bucket = unittest.mock.MagicMock()
+        _file = ThrottledFile(io.BytesIO(), _bucket)
+        _file.write(b"data")
+        _bucket.consume.assert_called_once_with(4)
+        _file.seek(0, os.SEEK_SET)
+        self.assertEqual(_file.read(2), b"da")
+        _bucket.consume.assert_called_with(2)
+        self.assertEqual(_file.tell(), 2)
+
+    def test_inflight_budget(self):
+        _path = os.path.join(self.directory.name, "test.budget")
+        _budget = InflightBudget(_path, 100)
+        _key = _budget.try_acquire(60)
+        self.assertIsNotNone(_key)
+        # shared with another instance
+        self.assertIsNone(InflightBudget(_path, 100).try_acquire(60))
+        self.assertIsNotNone(_budget.try_acquire(40))
+        _budget.release(_key)
+        self.assertIsNotNone(_budget.try_acquire(60))
+
+    def test_inflight_budget_oversized(self):
+        _budget = InflightBudget(os.path.join(self.directory.name, "test.budget"), 100)
+        _key = _budget.try_acquire(500)
+        self.assertIsNotNone(_key)
+        self.assertIsNone(_budget.try_acquire(1))
+        _budget.release(_key)
+        self.assertIsNotNone(_budget.try_acquire(1))
+
+    def test_inflight_budget_dead_process(self):
+        _budget = InflightBudget(os.path.join(self.directory.name, "test.budget"), 100)
+        _budget.try_acquire(100)
+
+        with unittest.mock.patch.object(InflightBudget, "_is_alive", return_value=False):
+            self.assertIsNotNone(_budget.try_acquire(100))
+
+    def test_adaptive_limiter_increase(self):
+        _limiter = AdaptiveLimiter(os.path.join(self.directory.name, "test.adaptive"), min_limit=1, max_limit=4)
+        _limiter._update(lambda _state: _state.update(limit=1))
+
+        # flat latency: additive increase, about one per 'limit' calls
+        self.assertEqual(_limiter.record(0.1), (1, 2, "increase"))
+        self.assertEqual(_limiter.record(0.1), (2, 2, "increase"))
+
+        for _ in range(20):
+            _limiter.record(0.1)
+
+        self.assertEqual(_limiter.limit, 4)
+
+    def test_adaptive_limiter_decrease(self):
+        _path = os.path.join(self.directory.name, "test.adaptive")
+        _limiter = AdaptiveLimiter(_path, min_limit=2, max_limit=16, cooldown=60)
+        self.assertEqual(_limiter.record(0.1), (16, 16, "increase"))
+        self.assertEqual(_limiter.record(error=True), (16, 8, "error"))
+        # shared with another instance, cooldown is not over
+        self.assertEqual(AdaptiveLimiter(_path, min_limit=2, max_limit=16, cooldown=60).record(error=True),
+                         (8, 8, None))
+
+        _limiter.cooldown = 0
+        self.assertEqual(_limiter.record(10), (8, 7, "latency"))
+
+        for _ in range(5):
+            _limiter.record(error=True)
+
+        self.assertEqual(_limiter.limit, 2)
+
+    def test_adaptive_limiter_slots(self):
+        _limiter = AdaptiveLimiter(os.path.join(self.directory.name, "test.adaptive"), max_limit=2)
+        _limiter.poll_interval = 0.01
+        _limiter._update(lambda _state: _state.update(limit=1))
+        _events = list()
+
+        def _call(_name):
+            with _limiter.slot():
+                _events.append(f"{_name}-in")
+                time.sleep(0.05)
+                _events.append(f"{_name}-out")
+
+        _threads = list(threading.Thread(target=_call, args=(_name,)) for _name in ("a", "b"))
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+
+        # limit of one: calls do not overlap
+        self.assertEqual(_events[1], _events[0].replace("-in", "-out"))
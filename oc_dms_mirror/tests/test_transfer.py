@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+
+import unittest
+import unittest.mock
+from ..transfer import get_content_size, probe_size, split_ranges, download_range, download_ranges
+from ..transfer import SpoolManager, upload_view
+from oc_cdtapi.API import HttpAPIError
+from urllib3.exceptions import ProtocolError
+
+class TransferTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.content = os.urandom(10000)
+        self.requests = list()
+
+    def _fetch_range(self, start, end):
+        self.requests.append((start, end))
+        return unittest.mock.Mock(status_code=206, raw=io.BytesIO(self.content[start:end + 1]),
+                                  headers={"Content-Range": f"bytes {start}-{end}/{len(self.content)}"})
+
+    def test_get_content_size(self):
+        self.assertEqual(get_content_size(unittest.mock.Mock(headers={"Content-Range": "bytes 0-0/123"})), 123)
+        self.assertEqual(get_content_size(unittest.mock.Mock(headers={"Content-Length": "12"})), 12)
+        self.assertIsNone(get_content_size(unittest.mock.Mock(headers={"Content-Range": "bytes 0-0/*"})))
+        self.assertIsNone(get_content_size("OK"))
+
+    def test_probe_size(self):
+        self.assertEqual(probe_size(self._fetch_range), (len(self.content), True))
+        self.assertEqual(probe_size(lambda _start, _end: unittest.mock.Mock(status_code=200, headers={})),
+                         (None, False))
+        # ranges are not supported, size is known still
+        self.assertEqual(probe_size(lambda _start, _end: unittest.mock.Mock(
+            status_code=200, headers={"Content-Length": "10"})), (10, False))
+
+        # empty content
+        self.assertEqual(probe_size(lambda _start, _end: unittest.mock.Mock(status_code=416, headers={})), (0, True))
+        self.assertEqual(probe_size(unittest.mock.Mock(side_effect=HttpAPIError(code=416))), (0, True))
+
+        with self.assertRaises(HttpAPIError):
+            probe_size(unittest.mock.Mock(side_effect=HttpAPIError(code=503)))
+
+    def test_split_ranges(self):
+        self.assertEqual(split_ranges(10, 3), [(0, 3), (4, 7), (8, 9)])
+        self.assertEqual(split_ranges(2, 4), [(0, 0), (1, 1)])
+        self.assertEqual(split_ranges(8, 1), [(0, 7)])
+
+    def test_download_ranges(self):
+        _consume = unittest.mock.MagicMock()
+
+        with tempfile.TemporaryFile(mode='w+b') as _file:
+            download_ranges(self._fetch_range, len(self.content), _file, 3, consume=_consume)
+            self.assertEqual(_file.tell(), len(self.content))
+            _file.seek(0, os.SEEK_SET)
+            self.assertEqual(_file.read(), self.content)
+
+        self.assertEqual(sorted(self.requests), [(0, 3333), (3334, 6667), (6668, 9999)])
+        self.assertEqual(sum(map(lambda x: x.args[0], _consume.call_args_list)), len(self.content))
+
+    def test_download_range_resumed(self):
+        _responses = [
+                unittest.mock.Mock(status_code=206, raw=unittest.mock.Mock(
+                    read=unittest.mock.Mock(side_effect=[self.content[100:150], ProtocolError("broken")]))),
+                None]
+
+        def _fetch_range(start, end):
+            _response = _responses.pop(0)
+            if not _response:
+                return self._fetch_range(start, end)
+
+            self.requests.append((start, end))
+            return _response
+
+        with tempfile.TemporaryFile(mode='w+b') as _file, unittest.mock.patch("time.sleep"):
+            os.ftruncate(_file.fileno(), len(self.content))
+            download_range(_fetch_range, 100, 199, _file.fileno(), retries=2)
+            _file.seek(100, os.SEEK_SET)
+            self.assertEqual(_file.read(100), self.content[100:200])
+
+        self.assertEqual(self.requests, [(100, 199), (150, 199)])
+
+    def test_spool(self):
+        with tempfile.TemporaryDirectory() as _directory:
+            _manager = SpoolManager(directory=_directory, memory_threshold=100)
+
+            with _manager.spool(10) as _spool:
+                _spool.write(b"content")
+                _spool.seek(0, os.SEEK_SET)
+                self.assertIsInstance(upload_view(_spool), io.BytesIO)
+                self.assertEqual(upload_view(_spool).read(), b"content")
+
+            # unknown size: moved to disk once grown over the threshold
+            with _manager.spool() as _spool:
+                _spool.write(self.content)
+                self.assertIs(upload_view(_spool), _spool)
+
+            with _manager.spool(1000) as _spool:
+                self.assertIsInstance(_spool.fileno(), int)
+                self.assertIs(upload_view(_spool), _spool)
+
+    def test_spool_admission(self):
+        _budget = unittest.mock.MagicMock()
+        _budget.try_acquire.side_effect = [None, "key"]
+        _manager = SpoolManager(budget=_budget, timeout=10)
+
+        with unittest.mock.patch("time.sleep") as _sleep, _manager.spool(1000):
+            _sleep.assert_called_once()
+            _budget.release.assert_not_called()
+
+        _budget.release.assert_called_once_with("key")
+
+        _manager = SpoolManager(memory_threshold=100, min_free=1 << 62, timeout=0)
+        # in memory: free space does not matter
+        with _manager.spool(10):
+            pass
+
+        with self.assertRaises(TimeoutError):
+            with _manager.spool(1000):
+                pass
+
+        # unknown size may go to disk
+        with self.assertRaises(TimeoutError):
+            with _manager.spool():
+                pass
+
+        _budget = unittest.mock.MagicMock()
+        _budget.try_acquire.return_value = "key"
+
+        with SpoolManager(memory_threshold=100, budget=_budget).spool():
+            _budget.try_acquire.assert_called_once_with(100)
+
+        _budget.try_acquire.reset_mock()
+        with SpoolManager(memory_threshold=100, budget=_budget, unknown_size=1000).spool():
+            _budget.try_acquire.assert_called_once_with(1000)
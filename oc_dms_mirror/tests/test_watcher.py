@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+import unittest
+import unittest.mock
+from ..watcher import FileWatcher
+
+class FileWatcherTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+
+        with open(self.path, mode='wt') as _file:
+            _file.write("{}")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_check(self):
+        _callback = unittest.mock.MagicMock()
+        _missing = os.path.join(self.directory.name, "missing.json")
+        _watcher = FileWatcher([self.path, _missing], _callback)
+        self.assertFalse(_watcher.check())
+        _callback.assert_not_called()
+
+        with open(self.path, mode='at') as _file:
+            _file.write(" ")
+
+        self.assertTrue(_watcher.check())
+        _callback.assert_called_once()
+        self.assertFalse(_watcher.check())
+
+        # appeared
+        with open(_missing, mode='wt') as _file:
+            _file.write("{}")
+
+        self.assertTrue(_watcher.check())
+        self.assertEqual(_callback.call_count, 2)
+
+    def test_check_failed(self):
+        _callback = unittest.mock.MagicMock(side_effect=ValueError("invalid"))
+        _watcher = FileWatcher([self.path], _callback)
+        os.utime(self.path, ns=(0, 0))
+        self.assertTrue(_watcher.check())
+        # not repeated until changed again
+        self.assertFalse(_watcher.check())
+        _callback.assert_called_once()
+
+    def test_thread(self):
+        _watcher = FileWatcher([self.path], unittest.mock.MagicMock(), interval=0.01)
+        _watcher.check = unittest.mock.MagicMock()
+        _watcher.start()
+        _watcher.stop()
+        self.assertIsNone(_watcher._thread)
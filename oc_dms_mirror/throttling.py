@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+
+import contextlib
+import fcntl
+import json
+import os
+import time
+import uuid
+
+
+class TokenBucket:
+    """
+    Token bucket shared between processes of the host: the state is kept in a file guarded by 'flock'
+    """
+    def __init__(self, path, rate, burst=None):
+        """
+        :param str path: bucket state file path
+        :param float rate: tokens added per second
+        :param float burst: bucket capacity, one second of 'rate' by default
+        """
+        self.path = path
+        self.rate = rate
+        self.burst = burst or rate
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _try_consume(self, amount):
+        """
+        Take tokens if available
+        Amount larger than burst is taken as soon as the bucket is full, leaving it in debt
+        :param float amount: tokens to take
+        :return float: seconds to wait before the next try, zero if tokens were taken
+        """
+        _fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX)
+            _content = os.read(_fd, 4096)
+            _now = time.time()
+            _state = json.loads(_content) if _content else {"tokens": self.burst, "time": _now}
+            _tokens = min(self.burst, _state["tokens"] + (_now - _state["time"]) * self.rate)
+            _needed = min(amount, self.burst)
+
+            if _tokens < _needed:
+                return (_needed - _tokens) / self.rate
+
+            os.lseek(_fd, 0, os.SEEK_SET)
+            os.ftruncate(_fd, 0)
+            os.write(_fd, json.dumps({"tokens": _tokens - amount, "time": _now}).encode("utf-8"))
+            return 0
+        finally:
+            os.close(_fd)
+
+    def consume(self, amount):
+        """
+        Wait until tokens are available and take them
+        :param float amount: tokens to take
+        """
+        if not amount:
+            return
+
+        while True:
+            _wait = self._try_consume(amount)
+
+            if not _wait:
+                return
+
+            time.sleep(_wait)
+
+
+class TransferSlots:
+    """
+    Semaphore limiting concurrent transfers across processes of the host
+    Each slot is a file locked with 'flock' while in use, so slots of crashed processes are freed by OS
+    Waiters are served by priority: each of them keeps a locked file named by its priority and start time,
+    a waiter takes a free slot only if no other waiter goes before it;
+    waiting time raises priority one level per 'aging' seconds, so low priority waiters are not starved
+    """
+    poll_interval = 0.1
+
+    def __init__(self, directory, limit, aging=60):
+        """
+        :param str directory: directory to keep slot files in
+        :param int limit: maximum amount of concurrent transfers
+        :param float aging: seconds of waiting raising priority by one level
+        """
+        self.directory = directory
+        self.limit = limit
+        self.aging = aging
+        self._waiters = os.path.join(self.directory, "waiters")
+        os.makedirs(self._waiters, exist_ok=True)
+
+    def _try_acquire(self):
+        """
+        Lock a free slot if any
+        :return int: locked slot file descriptor, 'None' if all slots are busy
+        """
+        for _slot in range(self.limit):
+            _fd = os.open(os.path.join(self.directory, f"slot-{_slot}"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return _fd
+            except BlockingIOError:
+                os.close(_fd)
+
+        return None
+
+    def _rank(self, priority, since, now):
+        """
+        Return effective priority level of a waiter, less goes first
+        :param int priority: priority level, less goes first
+        :param float since: waiting start time
+        :param float now: current time
+        :return float:
+        """
+        return priority - (now - since) / self.aging if self.aging else priority
+
+    def _is_waiting(self, name):
+        """
+        Check if waiter is alive: its file is locked; files of crashed waiters are removed
+        :param str name: waiter file name
+        :return bool:
+        """
+        _path = os.path.join(self._waiters, name)
+        try:
+            _fd = os.open(_path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(_fd)
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(_path)
+
+        return False
+
+    def _is_first(self, name):
+        """
+        Check if no other waiter goes before the one given
+        :param str name: waiter file name
+        :return bool:
+        """
+        _now = time.time()
+        _priority, _since, _ = name.split("-", 2)
+        _key = (self._rank(int(_priority), float(_since), _now), float(_since))
+
+        for _other in os.listdir(self._waiters):
+            if _other == name or _other.startswith("."):
+                continue
+
+            _other_priority, _other_since, _ = _other.split("-", 2)
+            _other_key = (self._rank(int(_other_priority), float(_other_since), _now), float(_other_since))
+
+            if _other_key < _key and self._is_waiting(_other):
+                return False
+
+        return True
+
+    @contextlib.contextmanager
+    def slot(self, priority=0):
+        """
+        Context manager holding a slot, waits until one is free and no waiter goes before
+        :param int priority: priority level, less goes first
+        """
+        _fd = None
+        if not list(filter(lambda x: not x.startswith("."), os.listdir(self._waiters))):
+            _fd = self._try_acquire()
+
+        if _fd is None:
+            _name = f"{priority}-{time.time():.6f}-{uuid.uuid4().hex}"
+            _path = os.path.join(self._waiters, _name)
+            # lock before the file is visible to others, otherwise it may be taken for a crashed waiter's one
+            _waiter_fd = os.open(os.path.join(self._waiters, f".{_name}"), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(_waiter_fd, fcntl.LOCK_EX)
+            os.rename(os.path.join(self._waiters, f".{_name}"), _path)
+            try:
+
+                while _fd is None:
+                    if self._is_first(_name):
+                        _fd = self._try_acquire()
+
+                    if _fd is None:
+                        time.sleep(self.poll_interval)
+            finally:
+                os.remove(_path)
+                os.close(_waiter_fd)
+
+        try:
+            yield
+        finally:
+            os.close(_fd)
+
+
+class ThrottledFile:
+    """
+    File object wrapper consuming bucket tokens for each byte read or written
+    """
+    def __init__(self, file_obj, bucket):
+        """
+        :param file_obj: binary file-like object to wrap
+        :param TokenBucket bucket: bytes/sec bucket
+        """
+        self._file = file_obj
+        self._bucket = bucket
+
+    def write(self, data):
+        self._bucket.consume(len(data))
+        return self._file.write(data)
+
+    def read(self, *args):
+        _data = self._file.read(*args)
+        self._bucket.consume(len(_data))
+        return _data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class InflightBudget:
+    """
+    Bytes in flight accounted across processes of the host
+    Entries are kept per process, so those of crashed processes are dropped
+    """
+    def __init__(self, path, limit):
+        """
+        :param str path: budget state file path
+        :param int limit: maximum bytes in flight
+        """
+        self.path = path
+        self.limit = limit
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    @staticmethod
+    def _is_alive(pid):
+        """
+        Check if process exists
+        :param int pid: process ID
+        :return bool:
+        """
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        return True
+
+    def _update(self, update):
+        """
+        Update entries under exclusive file lock
+        :param update: function getting entries dictionary, changing it in place and returning the result
+        :return: the update function result
+        """
+        _fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX)
+            _content = b""
+            for _chunk in iter(lambda: os.read(_fd, 65536), b""):
+                _content += _chunk
+
+            _entries = json.loads(_content) if _content else dict()
+            _entries = dict(filter(lambda x: self._is_alive(x[1]["pid"]), _entries.items()))
+            _result = update(_entries)
+            os.lseek(_fd, 0, os.SEEK_SET)
+            os.ftruncate(_fd, 0)
+            os.write(_fd, json.dumps(_entries).encode("utf-8"))
+            return _result
+        finally:
+            os.close(_fd)
+
+    def try_acquire(self, amount):
+        """
+        Account bytes if they fit the budget; a single amount over the limit fits when nothing else is in flight
+        :param int amount: bytes
+        :return str: entry key to release with, 'None' if the budget is exhausted
+        """
+        def _acquire(entries):
+            _used = sum(map(lambda x: x["bytes"], entries.values()))
+            if _used and _used + amount > self.limit:
+                return None
+
+            _key = uuid.uuid4().hex
+            entries[_key] = {"pid": os.getpid(), "bytes": amount}
+            return _key
+
+        return self._update(_acquire)
+
+    def release(self, key):
+        """
+        Release bytes accounted
+        :param str key: entry key returned by 'try_acquire'
+        """
+        self._update(lambda entries: entries.pop(key, None))
+
+
+class AdaptiveLimiter:
+    """
+    Concurrent calls limit of a backend adapted to its latency and errors (AIMD), shared by processes of the host
+    The limit grows by one per 'limit' successful calls while latency stays near its baseline,
+    it is halved on backend errors and reduced by a tenth on latency spikes, at most once per 'cooldown' seconds
+    Calls hold slot files locked as 'TransferSlots' do, limit state is kept in a file guarded by 'flock'
+    """
+    poll_interval = 0.05
+
+    def __init__(self, directory, min_limit=1, max_limit=16, tolerance=2.0, cooldown=1.0):
+        """
+        :param str directory: directory to keep state and slot files in
+        :param int min_limit: the lowest limit
+        :param int max_limit: the highest limit, also the initial one
+        :param float tolerance: latency spike is the recent latency over baseline multiplied by this
+        :param float cooldown: seconds between decreases
+        """
+        self.directory = directory
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self._path = os.path.join(self.directory, "limit")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _update(self, update=None):
+        """
+        Read and update limit state under exclusive file lock
+        :param update: function getting the state and changing it in place, read only if not set
+        :return dict: state with 'limit', 'latency' (recent), 'baseline' latencies and 'decreased' time
+        """
+        _fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX)
+            _content = os.read(_fd, 4096)
+            _state = json.loads(_content) if _content else {
+                "limit": self.max_limit, "latency": None, "baseline": None, "decreased": 0}
+
+            if update:
+                update(_state)
+                os.lseek(_fd, 0, os.SEEK_SET)
+                os.ftruncate(_fd, 0)
+                os.write(_fd, json.dumps(_state).encode("utf-8"))
+
+            return _state
+        finally:
+            os.close(_fd)
+
+    @property
+    def limit(self):
+        """
+        Current concurrent calls limit
+        :return int:
+        """
+        return max(self.min_limit, min(self.max_limit, int(self._update()["limit"])))
+
+    def _try_acquire(self):
+        """
+        Lock a free slot within the current limit if any
+        :return int: locked slot file descriptor, 'None' if all slots are busy
+        """
+        for _slot in range(self.limit):
+            _fd = os.open(os.path.join(self.directory, f"slot-{_slot}"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return _fd
+            except BlockingIOError:
+                os.close(_fd)
+
+        return None
+
+    def record(self, latency=None, error=False):
+        """
+        Adapt the limit to a call result
+        :param float latency: call duration, seconds; 'None' if not comparable, i.e. for transfers
+        :param bool error: whether the backend failed or throttled the call
+        :return tuple: (limit before, limit after, reason: 'error', 'latency', 'increase' or 'None')
+        """
+        _decision = dict()
+
+        def _adapt(state):
+            _before = state["limit"]
+            _reason = None
+            _now = time.time()
+
+            if latency is not None:
+                state["latency"] = latency if state["latency"] is None else state["latency"] + 0.3 * (
+                        latency - state["latency"])
+                state["baseline"] = latency if state["baseline"] is None else state["baseline"] + 0.01 * (
+                        latency - state["baseline"])
+
+            if error:
+                _reason = "error"
+            elif state["latency"] is not None and state["latency"] > state["baseline"] * self.tolerance:
+                _reason = "latency"
+
+            if _reason and _now - state["decreased"] >= self.cooldown:
+                state["limit"] = max(self.min_limit, state["limit"] * (0.5 if _reason == "error" else 0.9))
+                state["decreased"] = _now
+            elif not _reason:
+                state["limit"] = min(self.max_limit, state["limit"] + 1 / state["limit"])
+                _reason = "increase"
+            else:
+                _reason = None
+
+            _decision.update(before=_before, after=state["limit"], reason=_reason)
+
+        self._update(_adapt)
+        return (int(_decision["before"]), int(_decision["after"]), _decision["reason"])
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager holding a call slot within the current limit, waits until one is free
+        """
+        _fd = self._try_acquire()
+
+        while _fd is None:
+            time.sleep(self.poll_interval)
+            _fd = self._try_acquire()
+
+        try:
+            yield
+        finally:
+            os.close(_fd)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import fcntl
+import io
+import json
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# response headers recorded, the rest may carry secrets or cookies
+recorded_headers = ["Content-Type", "Content-Length", "Content-Range", "Accept-Ranges", "Retry-After"]
+
+
+def sanitize_url(url):
+    """
+    Return URL path and sorted query parameter names only: no host, credentials or query values
+    :param str url:
+    :return tuple: (path, list of query parameter names)
+    """
+    _url = urllib.parse.urlsplit(url)
+    return (_url.path, sorted(set(map(lambda x: x[0], urllib.parse.parse_qsl(_url.query, keep_blank_values=True)))))
+
+
+class Recorder:
+    """
+    Record metadata of backend responses as JSON lines: method, sanitized URL, status, timing and size; no bodies
+    Appended under 'flock', so all processes and threads of a run may record to the same file
+    """
+    def __init__(self, path):
+        """
+        :param str path: JSON lines file to append records to
+        """
+        self.path = path
+
+    def record(self, backend, response):
+        """
+        Append a record of a response
+        :param str backend: backend name
+        :param requests.Response response:
+        """
+        _path, _query = sanitize_url(response.url)
+        _record = {
+            "backend": backend,
+            "method": response.request.method,
+            "path": _path,
+            "query": _query,
+            "status": response.status_code,
+            "elapsed": response.elapsed.total_seconds(),
+            "headers": dict((_k, response.headers[_k]) for _k in recorded_headers if _k in response.headers),
+            "time": time.time()}
+
+        with open(self.path, mode='at') as _file:
+            fcntl.flock(_file.fileno(), fcntl.LOCK_EX)
+            _file.write(json.dumps(_record) + '\n')
+
+    def hook(self, backend):
+        """
+        Return response hook for 'requests.Session.hooks'
+        :param str backend: backend name
+        :return _RecorderHook:
+        """
+        return _RecorderHook(self, backend)
+
+    def attach(self, session, backend):
+        """
+        Record responses of a client session
+        :param requests.Session session:
+        :param str backend: backend name
+        :return requests.Session: the same session
+        """
+        session.hooks["response"].append(self.hook(backend))
+        return session
+
+
+class _RecorderHook:
+    """
+    Response hook recording to a 'Recorder', not a closure: sessions hooked are pickled to batch pool workers
+    """
+    def __init__(self, recorder, backend):
+        """
+        :param Recorder recorder:
+        :param str backend: backend name
+        """
+        self.recorder = recorder
+        self.backend = backend
+
+    def __call__(self, response, *args, **kwargs):
+        self.recorder.record(self.backend, response)
+
+
+def load_records(path):
+    """
+    Read records written by 'Recorder'
+    :param str path: JSON lines file
+    :return list: records
+    """
+    with open(path, mode='rt') as _file:
+        return list(map(json.loads, filter(lambda x: x.strip(), _file)))
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter answering requests with recorded responses, with recorded timings
+    Responses are matched by method and URL path, in order recorded; bodies are not recorded,
+    so they are taken from 'bodies' given or are zeros of recorded 'Content-Length'
+    Requests made are kept in 'calls', ones with no record left are answered with 599 and kept in 'unexpected'
+    """
+    def __init__(self, records, bodies=None, speed=1.0):
+        """
+        :param list records: records of one backend, see 'Recorder'
+        :param dict bodies: (method, path) => response body bytes
+        :param float speed: timings are divided by this, 0 to answer at once
+        """
+        super().__init__()
+        self.bodies = bodies or dict()
+        self.speed = speed
+        self.calls = list()
+        self.unexpected = list()
+        self._lock = threading.Lock()
+        self._records = dict()
+
+        for _record in records:
+            self._records.setdefault((_record["method"], _record["path"]), list()).append(_record)
+
+    def _take(self, key):
+        """
+        Take the next record for a request
+        :param tuple key: (method, path)
+        :return dict: record, 'None' if none left
+        """
+        with self._lock:
+            self.calls.append(key)
+            _records = self._records.get(key)
+
+            if not _records:
+                self.unexpected.append(key)
+                return None
+
+            # the last record of a key answers all the repeated requests
+            return _records.pop(0) if len(_records) > 1 else _records[0]
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        _key = (request.method, sanitize_url(request.url)[0])
+        _record = self._take(_key) or {"status": 599, "elapsed": 0, "headers": dict()}
+
+        if self.speed:
+            time.sleep(_record["elapsed"] / self.speed)
+
+        _body = self.bodies.get(_key)
+        if _body is None:
+            _body = bytes(int(_record["headers"].get("Content-Length") or 0))
+
+        _response = requests.Response()
+        _response.status_code = _record["status"]
+        _response.headers = CaseInsensitiveDict(_record["headers"])
+        _response.raw = io.BytesIO(_body)
+        _response.url = request.url
+        _response.request = request
+        _response.connection = self
+        return _response
+
+    def close(self):
+        pass
+
+    def count(self, method=None, prefix=""):
+        """
+        Count requests made
+        :param str method: HTTP method to count, all if not set
+        :param str prefix: URL path prefix to count
+        :return int:
+        """
+        return len(list(filter(
+            lambda x: (method is None or x[0] == method) and x[1].startswith(prefix), self.calls)))
+
+    def mount(self, session):
+        """
+        Answer all requests of a client session
+        :param requests.Session session:
+        :return requests.Session: the same session
+        """
+        session.mount("https://", self)
+        session.mount("http://", self)
+        return session
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+import contextlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from oc_cdtapi.API import HttpAPIError
+from requests.exceptions import RequestException
+from urllib3.exceptions import HTTPError, IncompleteRead
+
+transfer_errors = (RequestException, HttpAPIError, HTTPError)
+chunk_size = 1024 * 1024
+
+
+def get_content_size(response):
+    """
+    Return full content size from response headers
+    :param requests.Response response:
+    :return int: size, 'None' if unknown
+    """
+    _headers = getattr(response, "headers", None) or dict()
+    _range = _headers.get("Content-Range") or ""
+
+    if re.match(r'^bytes\s+\d+-\d+/\d+$', _range):
+        return int(_range.rsplit("/", 1).pop())
+
+    _length = _headers.get("Content-Length")
+
+    if _length and str(_length).isdigit():
+        return int(_length)
+
+    return None
+
+
+def probe_size(fetch_range):
+    """
+    Request the first byte to learn if ranges are supported and the full content size
+    Empty content has no first byte: '416 Range Not Satisfiable' means size 0
+    :param fetch_range: function (start, end) returning streamed response for bytes range
+    :return tuple: (content size, 'None' if unknown; whether ranges are supported)
+    """
+    try:
+        _response = fetch_range(0, 0)
+    except HttpAPIError as _e:
+        if _e.code == 416:
+            return (0, True)
+
+        raise
+
+    # streamed: the body of a server ignoring the range is not read
+    _response.close()
+
+    if _response.status_code == 416:
+        return (0, True)
+
+    return (get_content_size(_response), _response.status_code == 206)
+
+
+def split_ranges(size, parts):
+    """
+    Split content into ranges of nearly equal size
+    :param int size: content size
+    :param int parts: amount of ranges
+    :return list: (start, end) tuples, bounds included
+    """
+    _part_size = -(-size // parts)
+    return list((_start, min(_start + _part_size, size) - 1) for _start in range(0, size, _part_size))
+
+
+def download_range(fetch_range, start, end, fd, retries=1, retry_delay=30, consume=None):
+    """
+    Download bytes range and write it at its offset, resuming on connection failures
+    :param fetch_range: function (start, end) returning streamed response for bytes range
+    :param int start: first byte offset
+    :param int end: last byte offset
+    :param int fd: file descriptor to write to
+    :param int retries: attempts count
+    :param float retry_delay: seconds to wait before next attempt
+    :param consume: function taking bytes count, for bandwidth limiting
+    """
+    _offset = start
+    _attempt = 0
+
+    while True:
+        _attempt += 1
+        try:
+            _response = fetch_range(_offset, end)
+
+            try:
+                if _response.status_code != 206:
+                    raise HttpAPIError(_response.status_code, getattr(_response, "url", ""), _response,
+                                       'Range request is not satisfied')
+
+                for _chunk in iter(lambda: _response.raw.read(chunk_size), b""):
+                    if consume:
+                        consume(len(_chunk))
+
+                    os.pwrite(fd, _chunk, _offset)
+                    _offset += len(_chunk)
+            finally:
+                _response.close()
+
+            if _offset <= end:
+                raise IncompleteRead(_offset - start, end + 1 - _offset)
+
+            return
+        except transfer_errors:
+            if _attempt >= retries:
+                raise
+
+            time.sleep(retry_delay)
+
+
+def download_ranges(fetch_range, size, file_obj, parts, retries=1, retry_delay=30, consume=None):
+    """
+    Download content with concurrent range requests, each part written at its offset of a preallocated file
+    :param fetch_range: function (start, end) returning streamed response for bytes range
+    :param int size: content size
+    :param file_obj: binary file object with file descriptor
+    :param int parts: amount of concurrent requests
+    :param int retries: attempts count for each part
+    :param float retry_delay: seconds to wait before next attempt
+    :param consume: function taking bytes count, for bandwidth limiting
+    """
+    file_obj.flush()
+    _fd = file_obj.fileno()
+    os.ftruncate(_fd, size)
+    _ranges = split_ranges(size, parts)
+
+    with ThreadPoolExecutor(max_workers=len(_ranges)) as _executor:
+        _futures = list(_executor.submit(
+            download_range, fetch_range, _start, _end, _fd, retries, retry_delay, consume) for _start, _end in _ranges)
+
+        # the first failure is raised, the rest of parts are waited for on executor shutdown
+        for _future in _futures:
+            _future.result()
+
+    file_obj.seek(size, os.SEEK_SET)
+
+
+class SpoolManager:
+    """
+    Spool files for artifacts in transfer: small ones are kept in memory, large ones go to the spool directory
+    A spool is admitted only if free disk space and bytes in flight budget allow
+    """
+    poll_interval = 1
+
+    def __init__(self, directory=None, memory_threshold=0, min_free=0, budget=None, timeout=3600, unknown_size=0):
+        """
+        :param str directory: spool directory, system temporary directory if not set
+        :param int memory_threshold: keep spools of this size and smaller in memory, 0 to always use disk
+        :param int min_free: bytes to keep free in spool directory
+        :param throttling.InflightBudget budget: bytes in flight budget shared between processes
+        :param float timeout: seconds to wait for admission
+        :param int unknown_size: bytes to admit a spool of unknown size for, 'memory_threshold' if not set
+        """
+        self.directory = directory
+        self.unknown_size = unknown_size
+        self.memory_threshold = memory_threshold
+        self.min_free = min_free
+        self.budget = budget
+        self.timeout = timeout
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _in_memory(self, size):
+        """
+        Check if spool of the size given may be kept in memory
+        :param int size: content size, 'None' if unknown
+        :return bool:
+        """
+        return bool(self.memory_threshold) and (size is None or size <= self.memory_threshold)
+
+    def _get_admitted_size(self, size):
+        """
+        Return bytes to admit a spool for: an unknown size may be large and may go to disk, so it is not free
+        :param int size: content size, 'None' if unknown
+        :return int:
+        """
+        if size is not None:
+            return size
+
+        return self.unknown_size or self.memory_threshold
+
+    def _has_space(self, size):
+        """
+        Check if there is enough free space in spool directory
+        :param int size: content size, 'None' if unknown
+        :return bool:
+        """
+        if not self.min_free or (size is not None and self._in_memory(size)):
+            return True
+
+        _free = shutil.disk_usage(self.directory or tempfile.gettempdir()).free
+        return _free - self._get_admitted_size(size) >= self.min_free
+
+    def _admit(self, size):
+        """
+        Wait for admission
+        :param int size: content size, 'None' if unknown
+        :return str: budget entry key, 'None' if no budget is configured
+        """
+        _deadline = time.time() + self.timeout
+
+        while True:
+            if self._has_space(size):
+                if not self.budget:
+                    return None
+
+                _key = self.budget.try_acquire(self._get_admitted_size(size))
+
+                if _key:
+                    return _key
+
+            if time.time() >= _deadline:
+                raise TimeoutError(f"Spool for [{size}] bytes was not admitted in [{self.timeout}] seconds")
+
+            time.sleep(self.poll_interval)
+
+    @contextlib.contextmanager
+    def spool(self, size=None):
+        """
+        Context manager returning binary spool file once admitted
+        In-memory spool is 'tempfile.SpooledTemporaryFile', it is moved to disk if grows over the threshold
+        :param int size: content size, 'None' if unknown
+        """
+        _key = self._admit(size)
+
+        try:
+            if self._in_memory(size):
+                _file = tempfile.SpooledTemporaryFile(max_size=self.memory_threshold, mode='w+b', dir=self.directory)
+            else:
+                _file = tempfile.TemporaryFile(mode='w+b', dir=self.directory)
+
+            with _file:
+                yield _file
+        finally:
+            if _key:
+                self.budget.release(_key)
+
+
+def upload_view(spool):
+    """
+    Return object to upload spool content from
+    HTTP clients call 'fileno' to learn content length, which moves in-memory spool to disk,
+    so in-memory buffer is given instead
+    :param spool: spool file object
+    :return: file object positioned as spool is
+    """
+    if isinstance(spool, tempfile.SpooledTemporaryFile) and isinstance(spool._file, io.BytesIO):
+        return spool._file
+
+    return spool
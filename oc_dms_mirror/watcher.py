@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+
+import structlog
+
+
+class FileWatcher:
+    """
+    Poll files modification time and size in a daemon thread, call back when any of them changes
+    """
+    def __init__(self, paths, callback, interval=10):
+        """
+        :param list paths: files to watch, missing files are watched for appearance
+        :param callback: function without arguments, called from the watcher thread
+        :param float interval: seconds between checks
+        """
+        self.paths = paths
+        self.callback = callback
+        self.interval = interval
+        self._stamp = self._get_stamp()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logger = structlog.get_logger()
+
+    def _get_stamp(self):
+        """
+        Return files state to compare with
+        :return tuple: (mtime, size) for each file, 'None' for missing ones
+        """
+        _stamp = list()
+
+        for _path in self.paths:
+            try:
+                _stat = os.stat(_path)
+                _stamp.append((_stat.st_mtime_ns, _stat.st_size))
+            except FileNotFoundError:
+                _stamp.append(None)
+
+        return tuple(_stamp)
+
+    def check(self):
+        """
+        Call back if files changed since the last check
+        A failed callback is not repeated until files change again, i.e. an invalid configuration is fixed
+        :return bool: whether files changed
+        """
+        _stamp = self._get_stamp()
+        if _stamp == self._stamp:
+            return False
+
+        self._stamp = _stamp
+        self.logger.info(f"Files changed: {self.paths}")
+
+        try:
+            self.callback()
+        except Exception as _e:
+            self.logger.error(f"Files change processing failed: {repr(_e)}")
+
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        Start watcher thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watcher thread
+        """
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None